@@ -0,0 +1,231 @@
+"""
+Batch AI Scoring for Smart Liquidity Monitor
+Packs many members into each structured-JSON Gemini request to produce the AI_Confidence column
+"""
+
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from llm_gateway import LLMGateway, get_llm_gateway
+from llm_router import ModelRouter
+from prompts import get_batch_scoring_prompt
+from tracing import record_span
+
+SCORING_COLUMNS: List[str] = ["member_id", "name", "cash_buffer_usd", "exposure_usd", "credit_headroom_usd", "risk_ratio"]
+
+
+class ScoreCache:
+    """Per-member scores, valid until that member's scoring inputs change"""
+
+    def __init__(self):
+        self._scores: Dict[object, Tuple[int, float, str]] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, member_id, row_hash: int) -> Optional[Tuple[float, str]]:
+        with self._lock:
+            entry = self._scores.get(member_id)
+        if entry is None or entry[0] != row_hash:
+            return None
+        return entry[1], entry[2]
+
+    def store(self, member_id, row_hash: int, confidence: float, reason: str) -> None:
+        with self._lock:
+            self._scores[member_id] = (row_hash, confidence, reason)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+def parse_scores(text: str, expected_ids: List[str]) -> Dict[str, Tuple[float, str]]:
+    """
+    Validate a batch response and keep only well-formed scores for requested members
+
+    Args:
+        text: Raw model output (a JSON array, possibly wrapped in a code fence)
+        expected_ids: member_id values (as strings) sent in the batch
+
+    Returns:
+        dict: member_id string -> (confidence clamped to 0-100, reason)
+    """
+    body = text.strip()
+    if body.startswith("```"):
+        body = body.strip("`")
+        body = body[body.find("\n") + 1:] if "\n" in body else body
+    start, end = body.find("["), body.rfind("]")
+    if start < 0 or end < start:
+        return {}
+    try:
+        items = json.loads(body[start:end + 1])
+    except ValueError:
+        return {}
+
+    expected = set(expected_ids)
+    scores: Dict[str, Tuple[float, str]] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        member_id = str(item.get("member_id", "")).strip()
+        try:
+            confidence = float(item.get("confidence"))
+        except (TypeError, ValueError):
+            continue
+        if member_id in expected and np.isfinite(confidence):
+            scores[member_id] = (min(100.0, max(0.0, confidence)), str(item.get("reason", ""))[:200])
+    return scores
+
+
+class BatchScorer:
+    """
+    Scores members in packed batches, concurrently, within the LLM gateway's limits
+
+    Args:
+        gateway: LLM gateway to send requests through (default: process-wide gateway)
+        model: Gemini model name (default: routed per batch as the "scoring" feature)
+        batch_size: Members packed into each request (default: 40)
+        max_parallel: Batches in flight at once (default: 4)
+        cache: Per-member score cache (default: process-wide cache)
+    """
+
+    def __init__(self, gateway: Optional[LLMGateway] = None, model: Optional[str] = None, batch_size: int = 40,
+                 max_parallel: int = 4, cache: Optional[ScoreCache] = None):
+        self.gateway = gateway
+        self.model = model
+        self.batch_size = batch_size
+        self.max_parallel = max_parallel
+        self.cache = cache if cache is not None else _score_cache
+
+    def _score_batch(self, batch: pd.DataFrame) -> Dict[str, Tuple[float, str]]:
+        gateway = self.gateway or get_llm_gateway()
+        prompt = get_batch_scoring_prompt(batch.to_csv(index=False, float_format="%.4g"))
+        route = ModelRouter(gateway).route(prompt, "scoring")
+        text = gateway.generate(self.model or route.model, prompt,
+                                config={"temperature": 0.0, "response_mime_type": "application/json"},
+                                hedge_after=None if self.model else route.hedge_after)
+        return parse_scores(text or "", batch["member_id"].astype(str).tolist())
+
+    def score(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, float]]:
+        """
+        Add AI_Confidence and AI_Reason columns to a member frame
+
+        Members whose scoring inputs are unchanged since they were last scored
+        are served from the cache; the rest are packed into batches. Members the
+        model skipped or answered invalidly get NaN.
+
+        Args:
+            df: DataFrame with member data and risk metrics (needs member_id)
+
+        Returns:
+            tuple: (frame with AI_Confidence / AI_Reason, throughput stats)
+        """
+        started = time.perf_counter()
+        out = df.copy()
+        cols = [c for c in SCORING_COLUMNS if c in out.columns]
+        inputs = out[cols]
+        row_hashes = pd.util.hash_pandas_object(inputs, index=False).to_numpy()
+        ids = out["member_id"].tolist()
+
+        confidence = np.full(len(out), np.nan)
+        reasons = [""] * len(out)
+        pending: List[int] = []
+        for pos, (member_id, row_hash) in enumerate(zip(ids, row_hashes)):
+            hit = self.cache.lookup(member_id, int(row_hash))
+            if hit is None:
+                pending.append(pos)
+            else:
+                confidence[pos], reasons[pos] = hit
+        cached = len(out) - len(pending)
+
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        failed_batches = 0
+        with ThreadPoolExecutor(max_workers=max(1, self.max_parallel)) as pool:
+            futures = [(positions, pool.submit(self._score_batch, inputs.iloc[positions])) for positions in batches]
+            for positions, future in futures:
+                try:
+                    scores = future.result()
+                except Exception:
+                    failed_batches += 1
+                    continue
+                for pos in positions:
+                    hit = scores.get(str(ids[pos]))
+                    if hit is None:
+                        continue
+                    confidence[pos], reasons[pos] = hit
+                    self.cache.store(ids[pos], int(row_hashes[pos]), *hit)
+
+        out["AI_Confidence"] = confidence
+        out["AI_Reason"] = reasons
+        elapsed = time.perf_counter() - started
+        scored = int(np.isfinite(confidence).sum()) - cached
+        stats = {
+            "members": len(out),
+            "cached": cached,
+            "scored": scored,
+            "unscored": len(out) - cached - scored,
+            "requests": len(batches),
+            "failed_requests": failed_batches,
+            "seconds": elapsed,
+            "members_per_sec": scored / elapsed if elapsed > 0 else 0.0,
+        }
+        record_span("ai.scoring", elapsed, error=f"{failed_batches} failed requests" if failed_batches else None,
+                    rows=len(out), cached=cached, requests=len(batches))
+        return out, stats
+
+
+_score_cache = ScoreCache()
+
+
+def score_members(df: pd.DataFrame, batch_size: int = 40, max_parallel: int = 4) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """Score members with the process-wide gateway and cache (see BatchScorer.score)"""
+    return BatchScorer(batch_size=batch_size, max_parallel=max_parallel).score(df)
+
+
+def _stub_scoring_responder(model: str, prompt: str) -> str:
+    """Stub model reply: a confidence per CSV row, derived from its risk_ratio"""
+    lines = [line.strip() for line in prompt.splitlines() if line.strip()]
+    header_pos = next(i for i, line in enumerate(lines) if line.startswith("member_id,"))
+    header = lines[header_pos].split(",")
+    results = []
+    for line in lines[header_pos + 1:]:
+        fields = line.split(",")
+        if len(fields) != len(header):
+            break
+        row = dict(zip(header, fields))
+        ratio = float(row.get("risk_ratio") or 0)
+        results.append({"member_id": row["member_id"], "confidence": round(min(99.0, ratio * 30), 1), "reason": "stub"})
+    return json.dumps(results)
+
+
+if __name__ == "__main__":
+    # Throughput check against the local stub model: python ai_scoring.py [members] [latency_s]
+    import os
+    import sys
+    from llm_stub import StubGeminiServer
+
+    n_members = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+    rng = np.random.default_rng(0)
+    book = pd.DataFrame({
+        "member_id": np.arange(n_members),
+        "name": [f"Member {i}" for i in range(n_members)],
+        "cash_buffer_usd": rng.uniform(1e6, 5e7, n_members),
+        "exposure_usd": rng.uniform(5e6, 1e8, n_members),
+    })
+    book["credit_headroom_usd"] = book["exposure_usd"]
+    book["risk_ratio"] = book["credit_headroom_usd"] / book["cash_buffer_usd"]
+
+    with StubGeminiServer(latency=latency, responder=_stub_scoring_responder) as stub:
+        os.environ["GEMINI_API_KEY"] = os.environ.get("GEMINI_API_KEY", "stub")
+        os.environ["GEMINI_BASE_URL"] = stub.base_url
+        gateway = LLMGateway(max_concurrency=8, rate_per_sec=1000, burst=1000)
+        for batch_size in (1, 10, 40, 100):
+            sample = book if batch_size > 1 else book.head(200)
+            scorer = BatchScorer(gateway=gateway, batch_size=batch_size, max_parallel=8, cache=ScoreCache())
+            _, stats = scorer.score(sample)
+            print(f"batch_size={batch_size:>3}: {stats['scored']} members in {stats['seconds']:.2f}s "
+                  f"({stats['members_per_sec']:.0f} members/s, {stats['requests']} requests)")
@@ -5,72 +5,184 @@ Helper functions for Gemini AI interactions
 
 import streamlit as st
 from google import genai
-import os
 import time
-from typing import Optional
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Union
 import pandas as pd
+from llm_cache import get_response_cache, make_cache_key
+from llm_gateway import GatewayConfigError, get_llm_gateway
+from llm_router import get_model_router
+from member_index import get_member_index
+from tracing import record_span
+
+# Latency of recent AI calls (time-to-first-token and total), newest last
+_call_log: deque = deque(maxlen=500)
+_call_log_lock = threading.Lock()
+
+def _record_call(model: str, ttft: Optional[float], total: float, streamed: bool, cached: bool, ok: bool) -> None:
+    """Append one AI call's latency record to the in-process call log (and the trace)"""
+    record_span("ai.call", total, error=None if ok else "failed", model=model, streamed=streamed,
+                cache_hit=cached, ttft_s=ttft)
+    with _call_log_lock:
+        _call_log.append({
+            "timestamp": time.time(),
+            "model": model,
+            "streamed": streamed,
+            "cached": cached,
+            "ok": ok,
+            "ttft_s": ttft,
+            "total_s": total,
+        })
+
+def get_ai_call_stats() -> List[Dict]:
+    """Return latency records for recent AI calls (oldest first)"""
+    with _call_log_lock:
+        return list(_call_log)
 
 def get_gemini_client() -> Optional[genai.Client]:
-    """Initialize and return Gemini AI client"""
-    gemini_api_key = os.environ.get("GEMINI_API_KEY")
-    if not gemini_api_key:
-        st.error("❌ Missing GEMINI_API_KEY environment variable.")
+    """Return the process-wide pooled Gemini AI client"""
+    try:
+        return get_llm_gateway().client
+    except GatewayConfigError as e:
+        st.error(f"❌ {e}")
         return None
-    return genai.Client(api_key=gemini_api_key)
 
-def get_ai_response(prompt: str, model: str = "gemini-2.5-flash", temperature: float = 0.3) -> Optional[str]:
+def get_ai_response(prompt: str, model: Optional[str] = None, temperature: float = 0.3,
+                    data_version: Optional[str] = None, use_cache: bool = True,
+                    feature: str = "general") -> Optional[str]:
     """
-    Centralized function for Gemini AI API calls with retry logic
+    Centralized function for Gemini AI API calls through the LLM gateway, with response caching
     
     Args:
         prompt: The prompt to send to Gemini AI
-        model: The Gemini model to use (default: gemini-2.5-flash)
+        model: The Gemini model to use (default: chosen by the model router)
         temperature: Temperature for response generation (default: 0.3)
+        data_version: Member snapshot version folded into the cache key (default: None)
+        use_cache: Serve and store answers through the response cache (default: True)
+        feature: Calling feature used for routing, e.g. "summary" or "filter" (default: "general")
     
     Returns:
         str: AI response text or None if error occurs
     """
-    client = get_gemini_client()
-    if not client:
+    started = time.perf_counter()
+    route = get_model_router().route(prompt, feature)
+    model = model or route.model
+    cache = get_response_cache() if use_cache else None
+    cache_key = make_cache_key(model, prompt, temperature, data_version)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            _record_call(model, elapsed, elapsed, streamed=False, cached=True, ok=True)
+            return cached
+    
+    if not get_gemini_client():
         return None
     
-    # Retry with exponential backoff
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.models.generate_content(
-                model=model,
-                contents=prompt
-            )
-            return response.text
-        except Exception as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                time.sleep(wait_time)
-            else:
-                st.error(f"❌ Error calling Gemini AI after {max_retries} attempts: {e}")
-                return None
+    # Retries, backoff, coalescing and rate limiting all happen inside the gateway
+    try:
+        call_started = time.perf_counter()
+        text = get_llm_gateway().generate(model, prompt, config={"temperature": temperature},
+                                          hedge_after=route.hedge_after if model == route.model else None)
+    except Exception as e:
+        _record_call(model, None, time.perf_counter() - started, streamed=False, cached=False, ok=False)
+        st.error(f"❌ Error calling Gemini AI: {e}")
+        return None
+    elapsed = time.perf_counter() - started
+    _record_call(model, elapsed, elapsed, streamed=False, cached=False, ok=True)
+    if cache is not None and text:
+        cache.set(cache_key, text, latency=time.perf_counter() - call_started)
+    return text
+
+def stream_ai_response(prompt: str, model: Optional[str] = None, temperature: float = 0.3,
+                       data_version: Optional[str] = None, use_cache: bool = True,
+                       feature: str = "general", raise_errors: bool = False) -> Iterator[str]:
+    """
+    Streaming variant of get_ai_response that yields text chunks as Gemini produces them
+    
+    Failures before the first chunk are retried by the LLM gateway; once text
+    has been shown, a failure ends the stream. Cached answers are yielded as a
+    single chunk.
+    
+    Args:
+        prompt: The prompt to send to Gemini AI
+        model: The Gemini model to use (default: chosen by the model router)
+        temperature: Temperature for response generation (default: 0.3)
+        data_version: Member snapshot version folded into the cache key (default: None)
+        use_cache: Serve and store answers through the response cache (default: True)
+        feature: Calling feature used for routing, e.g. "summary" or "aquamind" (default: "general")
+        raise_errors: Raise failures instead of showing them with st.error; set it when the
+            stream runs as a background job, which has no page to show them on (default: False)
+    
+    Yields:
+        str: Response text chunks
+    """
+    started = time.perf_counter()
+    model = model or get_model_router().route(prompt, feature, streaming=True).model
+    cache = get_response_cache() if use_cache else None
+    cache_key = make_cache_key(model, prompt, temperature, data_version)
+    if cache is not None:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            elapsed = time.perf_counter() - started
+            _record_call(model, elapsed, elapsed, streamed=True, cached=True, ok=True)
+            yield cached
+            return
+    
+    client = get_llm_gateway().client if raise_errors else get_gemini_client()
+    if not client:
+        return
+    
+    chunks: List[str] = []
+    first_chunk_at: Optional[float] = None
+    try:
+        for text in get_llm_gateway().stream(model, prompt, config={"temperature": temperature}):
+            if first_chunk_at is None:
+                first_chunk_at = time.perf_counter()
+            chunks.append(text)
+            yield text
+    except Exception as e:
+        ttft = first_chunk_at - started if first_chunk_at is not None else None
+        _record_call(model, ttft, time.perf_counter() - started, streamed=True, cached=False, ok=False)
+        if raise_errors:
+            raise
+        if first_chunk_at is None:
+            st.error(f"❌ Error calling Gemini AI: {e}")
+        else:
+            st.error(f"❌ Gemini AI stream interrupted: {e}")
+        return
+    
+    total = time.perf_counter() - started
+    ttft = first_chunk_at - started if first_chunk_at is not None else None
+    _record_call(model, ttft, total, streamed=True, cached=False, ok=True)
+    if cache is not None and chunks:
+        cache.set(cache_key, "".join(chunks), latency=total)
 
-def get_ai_response_with_retry(prompt: str, model: str = "gemini-2.5-flash", temperature: float = 0.3) -> Optional[str]:
+def get_ai_response_with_retry(prompt: str, model: Optional[str] = None, temperature: float = 0.3,
+                               data_version: Optional[str] = None) -> Optional[str]:
     """
     Alias for get_ai_response for backward compatibility
     """
-    return get_ai_response(prompt, model, temperature)
+    return get_ai_response(prompt, model, temperature, data_version=data_version)
 
-def run_liquidity_agent(df: pd.DataFrame, user_query: str, top_k: int = 5, model: str = "gemini-2.5-flash") -> Optional[str]:
+def run_liquidity_agent(df: pd.DataFrame, user_query: str, top_k: int = 5, model: Optional[str] = None,
+                        stream: bool = False) -> Optional[Union[str, Iterator[str]]]:
     """
     Simple retrieval + prompt agent:
-    - selects top_k rows by risk_ratio
+    - retrieves the top_k members relevant to the question from the member index
+      (named members, numeric/risk-level filters, text matches, then riskiest)
     - builds a concise context string and asks Gemini the user's question
     
     Args:
         df: DataFrame with member liquidity data
         user_query: User's natural language question
-        top_k: Number of top risky members to include in context (default: 5)
-        model: Gemini model to use (default: gemini-2.5-flash)
+        top_k: Number of relevant members to include in context (default: 5)
+        model: Gemini model to use (default: chosen by the model router)
+        stream: Return an iterator of response chunks instead of the full text (default: False)
     
     Returns:
-        str: AI text response or None on error
+        str: AI text response (or chunk iterator when stream=True), None on error
     """
     try:
         if df is None or df.empty:
@@ -88,8 +200,8 @@ def run_liquidity_agent(df: pd.DataFrame, user_query: str, top_k: int = 5, model
             else:
                 return "Dataset doesn't contain required columns for agent analysis."
 
-        # pick top K risky members
-        top_df = df.sort_values("risk_ratio", ascending=False).head(top_k)
+        # retrieve the K members relevant to the question (fixed prompt size)
+        top_df = get_member_index(df).search(user_query, k=top_k)
         
         # small context: keep only key columns to avoid giant prompt
         cols_for_prompt = ["member_id", "name", "cash_buffer_usd", "exposure_usd", "credit_headroom_usd", "risk_ratio", "updated_at"]
@@ -100,7 +212,7 @@ def run_liquidity_agent(df: pd.DataFrame, user_query: str, top_k: int = 5, model
         agent_prompt = f"""
 You are an expert financial risk advisor. The user asked: "{user_query}"
 
-Below is tabular context of the top {top_k} members by liquidity risk (CSV).
+Below is tabular context of the {len(top_df)} members most relevant to the question (CSV).
 Context:
 {context_csv}
 
@@ -112,7 +224,10 @@ Tasks:
 Respond in plain text with headings: "Answer:", "Recommended Actions:", "Confidence:".
 """
         # call existing wrapper
-        resp = get_ai_response(agent_prompt, model=model)
+        data_version = df.attrs.get("snapshot_version")
+        if stream:
+            return stream_ai_response(agent_prompt, model=model, data_version=data_version, feature="agent")
+        resp = get_ai_response(agent_prompt, model=model, data_version=data_version, feature="agent")
         return resp
     except Exception as e:
         st.error(f"❌ Agent error: {e}")
@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+from profiler import profile_page_run
 
 # ===============================
 #  🔧 PAGE CONFIGURATION
@@ -9,6 +10,7 @@ st.set_page_config(
     page_title="Smart Liquidity Monitor", 
     page_icon="💧"
 )
+profile_page_run("Home")
 
 # ===============================
 #  🎨 CUSTOM STYLING
@@ -0,0 +1,73 @@
+"""
+Export Benchmark for Smart Liquidity Monitor
+Time, peak memory (extra RSS, Linux) and file size per export format for a synthetic member book
+
+Usage: python benchmarks/export_benchmark.py [rows]   (default: 1,000,000; also 100k / 1m / 10m)
+"""
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exports import EXPORT_FORMATS, ExportStore  # noqa: E402
+from synthetic import parse_rows, synthetic_members  # noqa: E402
+
+
+def _rss_mb(field: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _child(run, results) -> None:
+    # Reset the peak-RSS watermark to the current RSS, so VmHWM - VmRSS is this run's extra memory
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    baseline = _rss_mb("VmRSS")
+    started = time.perf_counter()
+    run()
+    results.put((time.perf_counter() - started, _rss_mb("VmHWM") - baseline))
+
+
+def _measure(run) -> tuple:
+    """(seconds, peak extra RSS in MB) for one call, run in a forked child so peaks don't carry over"""
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    child = ctx.Process(target=_child, args=(run, results))
+    child.start()
+    outcome = results.get()
+    child.join()
+    return outcome
+
+
+def main(rows: int) -> None:
+    df = synthetic_members(rows)
+    print(f"{rows:,} rows, {df.memory_usage(deep=True).sum() / 1e6:.0f} MB in memory\n")
+    print(f"{'format':<28}{'seconds':>10}{'peak MB':>10}{'file MB':>10}")
+
+    seconds, peak = _measure(lambda: df.to_csv(index=False).encode("utf-8"))
+    print(f"{'df.to_csv() (old page)':<28}{seconds:>10.2f}{peak:>10.0f}{'-':>10}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for key, spec in EXPORT_FORMATS.items():
+            def run():
+                store = ExportStore(os.path.join(directory, f"run-{time.perf_counter_ns()}"))
+                return store.export(df, key)
+            seconds, peak = _measure(run)
+            size = os.path.getsize(ExportStore(os.path.join(directory, "sizes")).export(df, key)) / 1e6
+            print(f"{spec.label:<28}{seconds:>10.2f}{peak:>10.0f}{size:>10.1f}")
+
+        store = ExportStore(os.path.join(directory, "cached"))
+        store.export(df, "csv")
+        seconds, peak = _measure(lambda: store.export(df, "csv"))
+        print(f"{'CSV (cached, 2nd request)':<28}{seconds:>10.4f}{peak:>10.0f}{'-':>10}")
+
+
+if __name__ == "__main__":
+    main(parse_rows(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,79 @@
+"""
+Preferences Stress Test for Smart Liquidity Monitor
+Many processes hammer the local preferences file (no Redis) at once and the
+final file is checked for lost updates; also reports cached read latency
+
+Usage: python benchmarks/prefs_stress.py [processes] [writes per process]   (default: 8 200)
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from redis_cache import PrefFile  # noqa: E402
+
+
+def _worker(path: str, worker: int, writes: int, errors) -> None:
+    prefs = PrefFile(path)
+    for i in range(writes):
+        prefs.update({f"worker-{worker}": i, f"worker-{worker}-{i % 10}": i})
+        data = prefs.read()
+        if data.get(f"worker-{worker}") != i:
+            errors.put(f"worker {worker} read {data.get(f'worker-{worker}')} after writing {i}")
+        # Never a torn or half-merged value from another process
+        neighbour = data.get(f"worker-{(worker + 1) % 1000}")
+        if neighbour is not None and not isinstance(neighbour, int):
+            errors.put(f"worker {worker} saw a corrupt value {neighbour!r}")
+
+
+def main(processes: int = 8, writes: int = 200) -> int:
+    ctx = multiprocessing.get_context("fork")
+    errors = ctx.Queue()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "preferences.json")
+        started = time.perf_counter()
+        workers = [ctx.Process(target=_worker, args=(path, w, writes, errors)) for w in range(processes)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        with open(path, "r", encoding="utf-8") as f:
+            final = json.load(f)
+        for w in range(processes):
+            if final.get(f"worker-{w}") != writes - 1:
+                errors.put(f"lost update: worker-{w} = {final.get(f'worker-{w}')}, expected {writes - 1}")
+            for j in range(min(10, writes)):
+                expected = max(i for i in range(writes) if i % 10 == j)
+                if final.get(f"worker-{w}-{j}") != expected:
+                    errors.put(f"lost update: worker-{w}-{j} = {final.get(f'worker-{w}-{j}')}, expected {expected}")
+        leftovers = [name for name in os.listdir(tmp) if name.endswith(".tmp")]
+
+        prefs = PrefFile(path)
+        prefs.read()
+        reads = 100_000
+        read_started = time.perf_counter()
+        for _ in range(reads):
+            prefs.read()
+        read_us = (time.perf_counter() - read_started) / reads * 1e6
+
+    problems = []
+    while not errors.empty():
+        problems.append(errors.get())
+    problems += [f"leftover temp file {name}" for name in leftovers]
+    print(f"{processes} processes x {writes} writes: {processes * writes / elapsed:,.0f} writes/s, "
+          f"{len(final)} keys, cached read {read_us:.1f} us")
+    for problem in problems[:20]:
+        print("FAIL:", problem)
+    print("OK" if not problems else f"{len(problems)} problems")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(*(int(a) for a in sys.argv[1:3])))
@@ -0,0 +1,365 @@
+"""
+Benchmark Suite for Smart Liquidity Monitor
+Times the hot paths (risk metrics, filtering, top-K, Monte Carlo, forecast, PDF and
+CSV export, AI prompt building and batch scoring against the local stub model) on
+deterministic synthetic books, writes the results as JSON and compares them with a
+saved baseline
+
+Usage:
+    python benchmarks/run_benchmarks.py [--sizes 1k,100k,1m] [--cases risk_metrics,filter]
+        [--repeat 5] [--baseline PATH] [--save-baseline] [--threshold 0.25]
+
+Exits with status 1 when a case is slower than the baseline by more than the
+threshold (and by more than --min-delta seconds, so sub-millisecond noise does
+not fail a run). Baselines are machine specific and default to .cache/benchmarks.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import itertools
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Measure the code paths, not trace-file writes
+os.environ.setdefault("LR_TRACING", "0")
+
+import matplotlib  # noqa: E402
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from synthetic import parse_rows, synthetic_members  # noqa: E402
+
+from ai_scoring import BatchScorer, ScoreCache, _stub_scoring_responder  # noqa: E402
+from context_builder import build_portfolio_context  # noqa: E402
+from exports import ExportStore  # noqa: E402
+from liquidityradar import calculate_risk_metrics  # noqa: E402
+from llm_gateway import LLMGateway  # noqa: E402
+from llm_stub import StubGeminiServer  # noqa: E402
+from prompts import get_ai_summary_prompt, get_batch_scoring_prompt  # noqa: E402
+from reports import build_pdf_report  # noqa: E402
+from risk_index import get_risk_index  # noqa: E402
+from top_risk import top_risk_members  # noqa: E402
+from visualizations import create_liquidity_forecast, create_monte_carlo_simulation  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.environ.get("LR_BENCH_DIR", os.path.join(ROOT, ".cache", "benchmarks"))
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+DEFAULT_THRESHOLD = float(os.environ.get("LR_BENCH_THRESHOLD", 0.25))
+DEFAULT_SIZES = "1k,100k,1m"  # add 10m explicitly; it needs ~8 GB of RAM
+SCORING_SAMPLE = 2_000  # members sent to the stub model, whatever the book size
+THRESHOLDS = (1.0, 2.0)
+
+
+@dataclass
+class Case:
+    """
+    One benchmarked operation
+
+    ``setup(book, workdir)`` returns the zero-argument callable that is timed;
+    anything it does itself is not measured.
+    """
+    name: str
+    setup: Callable[[pd.DataFrame, str], Callable[[], object]]
+    scales: bool = True  # False: cost does not depend on book size, run on the smallest book only
+    max_rows: Optional[int] = None
+
+
+# ---------- cases ----------
+
+def _risk_metrics_cold(book, workdir):
+    raw = book[["member_id", "name", "cash_buffer_usd", "exposure_usd", "updated_at", "credit_headroom_usd"]]
+    runs = itertools.count()
+
+    def run():
+        df = raw.copy(deep=False)
+        df.attrs["snapshot_version"] = f"cold-{next(runs)}"  # new snapshot: the risk index is built from scratch
+        return calculate_risk_metrics(df, thresholds=THRESHOLDS)
+    return run
+
+
+def _risk_metrics_threshold_change(book, workdir):
+    df = book.copy(deep=False)
+    pairs = itertools.cycle([(1.2, 2.5), THRESHOLDS])
+    return lambda: calculate_risk_metrics(df, thresholds=next(pairs))
+
+
+def _filter_risk_index(book, workdir):
+    get_risk_index(book)
+
+    def run():
+        matches = get_risk_index(book).filter(1.5, ["MEDIUM", "HIGH"], *THRESHOLDS)
+        return book.iloc[matches.page(0, 100)]
+    return run
+
+
+def _filter_pandas_mask(book, workdir):
+    return lambda: book[(book["risk_ratio"] >= 1.5) & book["risk_level"].isin(["MEDIUM", "HIGH"])]
+
+
+def _top_risk(book, workdir):
+    top_risk_members(book, 50)
+    return lambda: top_risk_members(book, 50)
+
+
+def _monte_carlo(book, workdir):
+    return lambda: plt.close(create_monte_carlo_simulation(book))
+
+
+def _forecast(book, workdir):
+    member = book.iloc[0]
+    return lambda: plt.close(create_liquidity_forecast(member, member["name"]))
+
+
+def _pdf_report(book, workdir):
+    return lambda: build_pdf_report(book, charts=False)
+
+
+def _pdf_report_full_book(book, workdir):
+    return lambda: build_pdf_report(book, full_book=True, charts=False)
+
+
+def _export_csv(book, workdir):
+    runs = itertools.count()
+    # A fresh store per run, so every run builds the file instead of reusing the last one
+    return lambda: ExportStore(os.path.join(workdir, f"exports-{next(runs)}")).export(book, "csv")
+
+
+def _portfolio_prompt(book, workdir):
+    return lambda: get_ai_summary_prompt(build_portfolio_context(book))
+
+
+def _scoring_prompt(book, workdir):
+    batch = book[["member_id", "name", "cash_buffer_usd", "exposure_usd", "credit_headroom_usd", "risk_ratio"]].head(40)
+    return lambda: get_batch_scoring_prompt(batch.to_csv(index=False))
+
+
+def _scoring_stub(book, workdir):
+    sample = book.head(SCORING_SAMPLE)
+    gateway = LLMGateway(max_concurrency=8, rate_per_sec=10_000, burst=10_000)
+    # New cache per run: every member goes to the stub model
+    return lambda: BatchScorer(gateway=gateway, batch_size=40, max_parallel=8, cache=ScoreCache()).score(sample)
+
+
+CASES: List[Case] = [
+    Case("risk_metrics.cold", _risk_metrics_cold),
+    Case("risk_metrics.threshold_change", _risk_metrics_threshold_change),
+    Case("filter.risk_index_page", _filter_risk_index),
+    Case("filter.pandas_mask", _filter_pandas_mask),
+    Case("top_risk.top50", _top_risk),
+    Case("simulation.monte_carlo", _monte_carlo),
+    Case("forecast.arima", _forecast, scales=False),
+    Case("report.pdf", _pdf_report),
+    Case("report.pdf_full_book", _pdf_report_full_book, max_rows=100_000),
+    Case("export.csv", _export_csv),
+    Case("ai.portfolio_prompt", _portfolio_prompt),
+    Case("ai.scoring_prompt", _scoring_prompt, scales=False),
+    Case("ai.scoring_stub", _scoring_stub, scales=False),
+]
+
+
+# ---------- running ----------
+
+def time_case(run: Callable[[], object], repeat: int, budget: float) -> Dict[str, float]:
+    """
+    Time a callable after one warm-up call
+
+    Args:
+        run: Operation to time
+        repeat: Timed calls (fewer when they exceed ``budget`` seconds in total)
+        budget: Seconds after which no further repeats are started
+
+    Returns:
+        dict: median_s, min_s, max_s and runs
+    """
+    run()
+    timings: List[float] = []
+    started = time.perf_counter()
+    while len(timings) < repeat and (not timings or time.perf_counter() - started < budget):
+        t0 = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - t0)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "max_s": max(timings), "runs": len(timings)}
+
+
+def run_suite(sizes: List[int], case_filter: Optional[List[str]] = None, repeat: int = 5,
+              budget: float = 30.0, seed: int = 0) -> List[Dict]:
+    """
+    Run every selected case on a synthetic book of each size
+
+    Args:
+        sizes: Book sizes in rows
+        case_filter: Case name prefixes to run (default: all)
+        repeat: Timed calls per case
+        budget: Seconds per case after which no further repeats are started
+        seed: Synthetic book seed
+
+    Returns:
+        list: One result dict per (case, rows)
+    """
+    cases = [c for c in CASES if not case_filter or any(c.name.startswith(p) for p in case_filter)]
+    results = []
+    stub = StubGeminiServer(responder=_stub_scoring_responder).start()
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = stub.base_url
+    workdir = tempfile.mkdtemp(prefix="lr-bench-")
+    try:
+        for size_pos, rows in enumerate(sorted(sizes)):
+            t0 = time.perf_counter()
+            book = synthetic_members(rows, seed=seed)
+            print(f"\n{rows:,} rows (generated in {time.perf_counter() - t0:.1f}s)")
+            for case in cases:
+                if (not case.scales and size_pos > 0) or (case.max_rows is not None and rows > case.max_rows):
+                    continue
+                run = case.setup(book, workdir)
+                timing = time_case(run, repeat, budget)
+                measured_rows = min(rows, SCORING_SAMPLE) if case.name == "ai.scoring_stub" else rows
+                results.append({"case": case.name, "rows": measured_rows, **timing})
+                print(f"  {case.name:<32}{timing['median_s']:>12.4f}s  (min {timing['min_s']:.4f}s, {timing['runs']} runs)")
+                shutil.rmtree(workdir, ignore_errors=True)
+                os.makedirs(workdir, exist_ok=True)
+            del book
+    finally:
+        stub.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment() -> Dict[str, object]:
+    """Machine and library versions recorded with every result file"""
+    import numpy
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "pandas": pd.__version__,
+    }
+
+
+def compare(results: List[Dict], baseline: List[Dict], threshold: float, min_delta: float) -> List[Dict]:
+    """
+    Compare median timings with a baseline
+
+    Args:
+        results: Current results
+        baseline: Baseline results
+        threshold: Allowed slowdown as a fraction (0.25 = 25% slower)
+        min_delta: Slowdowns smaller than this many seconds never count as regressions
+
+    Returns:
+        list: Per (case, rows): baseline_s, current_s, ratio and status (ok / regression / improved / new)
+    """
+    previous = {(r["case"], r["rows"]): r for r in baseline}
+    rows = []
+    for r in results:
+        base = previous.get((r["case"], r["rows"]))
+        if base is None:
+            rows.append({"case": r["case"], "rows": r["rows"], "baseline_s": None, "current_s": r["median_s"],
+                         "ratio": None, "status": "new"})
+            continue
+        ratio = r["median_s"] / base["median_s"] if base["median_s"] > 0 else float("inf")
+        delta = r["median_s"] - base["median_s"]
+        if ratio > 1 + threshold and delta > min_delta:
+            status = "regression"
+        elif ratio < 1 / (1 + threshold) and -delta > min_delta:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"case": r["case"], "rows": r["rows"], "baseline_s": base["median_s"],
+                     "current_s": r["median_s"], "ratio": ratio, "status": status})
+    return rows
+
+
+def _write_json(path: str, payload: Dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Smart Liquidity Monitor benchmark suite")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated book sizes (1k,100k,1m,10m or row counts)")
+    parser.add_argument("--cases", default="", help="Comma-separated case name prefixes (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case (default: 5)")
+    parser.add_argument("--budget", type=float, default=30.0, help="Seconds per case before repeats stop (default: 30)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file (default: .cache/benchmarks/results-<timestamp>.json)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline file to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown vs the baseline as a fraction (default: LR_BENCH_THRESHOLD or 0.25)")
+    parser.add_argument("--min-delta", type=float, default=0.002,
+                        help="Ignore slowdowns smaller than this many seconds (default: 0.002)")
+    parser.add_argument("--list", action="store_true", help="List the cases and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for case in CASES:
+            limits = [] if case.scales else ["smallest book only"]
+            limits += [f"up to {case.max_rows:,} rows"] if case.max_rows else []
+            print(case.name + (f"  ({', '.join(limits)})" if limits else ""))
+        return 0
+
+    sizes = [parse_rows(s) for s in args.sizes.split(",") if s.strip()]
+    case_filter = [c.strip() for c in args.cases.split(",") if c.strip()]
+    results = run_suite(sizes, case_filter, repeat=args.repeat, budget=args.budget, seed=args.seed)
+    payload = {"environment": environment(), "sizes": sizes, "results": results}
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        payload["comparison"] = {
+            "baseline": args.baseline,
+            "baseline_environment": baseline.get("environment"),
+            "threshold": args.threshold,
+            "rows": compare(results, baseline.get("results", []), args.threshold, args.min_delta),
+        }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"results-{datetime.now():%Y%m%d-%H%M%S}.json")
+    _write_json(output, payload)
+    print(f"\nResults written to {output}")
+    if args.save_baseline:
+        _write_json(args.baseline, payload)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    comparison = payload["comparison"]["rows"]
+    print(f"\nCompared with {args.baseline} (threshold +{args.threshold:.0%}):")
+    print(f"  {'case':<32}{'rows':>12}{'baseline s':>13}{'current s':>13}{'ratio':>8}  status")
+    for row in comparison:
+        base = f"{row['baseline_s']:.4f}" if row["baseline_s"] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row["ratio"] is not None else "-"
+        print(f"  {row['case']:<32}{row['rows']:>12,}{base:>13}{row['current_s']:>13.4f}{ratio:>8}  {row['status']}")
+    regressions = [row for row in comparison if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above +{args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Synthetic Member Book for Smart Liquidity Monitor
+Deterministic frames shaped like AIX_SF_DB.PUBLIC.MEMBERS_NEW after query_member_data,
+for benchmarks and load tests without Snowflake
+
+Rows are generated in fixed-size chunks, each from its own seed, so a book is a
+prefix of every larger book with the same seed (the 1k book is the first 1k
+members of the 10M book).
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from liquidityradar import calculate_risk_metrics, compute_snapshot_version  # noqa: E402
+
+CHUNK_ROWS = 1_000_000
+BOOK_SIZES = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def parse_rows(value: str) -> int:
+    """Row count from "100k" / "1m" / "10m" style sizes or plain integers"""
+    value = value.strip().lower().replace("_", "").replace(",", "")
+    if value in BOOK_SIZES:
+        return BOOK_SIZES[value]
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def _chunk(start: int, rows: int, seed: int) -> pd.DataFrame:
+    # One stream per column, so a shorter chunk draws the same leading values as a full one
+    cash_rng, exposure_rng, time_rng = (np.random.default_rng(s) for s in
+                                        np.random.SeedSequence([seed, start // CHUNK_ROWS]).spawn(3))
+    member_id = np.arange(start, start + rows)
+    # Log-normal buffers and exposures give the long right tail of risk ratios real books have
+    cash_buffer = np.round(cash_rng.lognormal(np.log(2e7), 0.8, rows), 2)
+    exposure = np.round(cash_buffer * exposure_rng.lognormal(np.log(1.2), 0.6, rows), 2)
+    updated_at = pd.Timestamp("2026-01-01") + pd.to_timedelta(time_rng.integers(0, 90 * 86400, rows), unit="s")
+    return pd.DataFrame({
+        "member_id": member_id,
+        "name": "Member " + pd.Series(member_id).astype(str),
+        "cash_buffer_usd": cash_buffer,
+        "exposure_usd": exposure,
+        "updated_at": updated_at,
+    })
+
+
+def synthetic_members(rows: int, seed: int = 0, metrics: bool = True) -> pd.DataFrame:
+    """
+    Member frame shaped like the MEMBERS_NEW table (lowercase columns, credit_headroom_usd, snapshot version)
+
+    Args:
+        rows: Number of members
+        seed: Random seed; the same (rows, seed) always gives the same frame
+        metrics: Also add risk_ratio / risk_level / Risk Insights with the default thresholds (default: True)
+
+    Returns:
+        DataFrame: Member data tagged with its snapshot version
+    """
+    chunks = [_chunk(start, min(CHUNK_ROWS, rows - start), seed) for start in range(0, rows, CHUNK_ROWS)]
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else (chunks or [_chunk(0, 0, seed)])[0]
+    # Same post-processing as query_member_data
+    df["credit_headroom_usd"] = df["exposure_usd"]
+    df.attrs["snapshot_version"] = compute_snapshot_version(df)
+    if metrics:
+        df = calculate_risk_metrics(df, thresholds=(1.0, 2.0))
+    return df
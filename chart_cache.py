@@ -0,0 +1,218 @@
+"""
+Chart Raster Cache for Smart Liquidity Monitor
+Content-addressed PNG cache for visualizations.py charts: a chart is rendered
+once per distinct input (in parallel worker processes when several are
+missing) and reused by every report, page and session afterwards
+"""
+
+import io
+import os
+import glob
+import json
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from tracing import span
+
+CHART_CACHE_DIR = os.environ.get(
+    "LR_CHART_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "charts")
+)
+CHART_CACHE_MAX_ENTRIES = int(os.environ.get("LR_CHART_CACHE_MAX_ENTRIES", 500))
+CHART_WORKERS = int(os.environ.get("LR_CHART_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Bump when chart styling changes so stale rasters are not reused
+CHART_STYLE_VERSION = 2
+
+# Chart kind -> visualizations.py function
+CHART_KINDS: Dict[str, str] = {
+    "monte_carlo": "create_monte_carlo_simulation",
+    "forecast": "create_liquidity_forecast",
+    "confidence": "create_confidence_heatmap",
+}
+
+
+def _fingerprint(value: Any) -> Any:
+    """JSON-able stand-in for a chart input; frames and series are reduced to a content hash"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        digest = hashlib.sha1(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes()).hexdigest()
+        columns = list(map(str, value.columns)) if isinstance(value, pd.DataFrame) else str(value.name)
+        return {"frame": columns, "rows": len(value), "sha1": digest}
+    if isinstance(value, float):
+        return repr(value)
+    return value
+
+
+class ChartSpec:
+    """
+    One chart to rasterize: a visualizations.py chart kind plus its arguments
+
+    Pass only the inputs the chart actually reads (e.g. ``df[["risk_ratio"]]``);
+    they are hashed into the cache key and shipped to worker processes.
+    """
+
+    def __init__(self, kind: str, *args, **kwargs):
+        if kind not in CHART_KINDS:
+            raise ValueError(f"Unknown chart kind '{kind}'")
+        self.kind = kind
+        self.args = args
+        self.kwargs = kwargs
+
+    @property
+    def key(self) -> str:
+        payload = json.dumps(
+            [CHART_STYLE_VERSION, self.kind, [_fingerprint(a) for a in self.args],
+             {k: _fingerprint(v) for k, v in sorted(self.kwargs.items())}],
+            sort_keys=True, default=str,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _render_png(kind: str, args: tuple, kwargs: dict) -> bytes:
+    """Render a chart to RGB PNG bytes (FPDF 1.7 cannot embed PNGs with an alpha channel)"""
+    from PIL import Image
+    import visualizations
+
+    fig = getattr(visualizations, CHART_KINDS[kind])(*args, **kwargs)
+    raw = io.BytesIO(visualizations.figure_png(fig, dpi=100))
+    out = io.BytesIO()
+    Image.open(raw).convert("RGB").save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def _init_worker() -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+
+class ChartCache:
+    """
+    PNG files under ``directory`` named by the hash of the chart's inputs
+
+    Args:
+        directory: Cache directory (default: LR_CHART_CACHE_DIR or .cache/charts)
+        max_entries: Files kept before the least recently used are evicted (default: 500)
+        workers: Worker processes for rendering missing charts; 1 renders inline
+            (default: LR_CHART_WORKERS or min(4, CPU count))
+    """
+
+    def __init__(self, directory: str = CHART_CACHE_DIR, max_entries: int = CHART_CACHE_MAX_ENTRIES,
+                 workers: int = CHART_WORKERS):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def render(self, spec: ChartSpec) -> str:
+        """Return the PNG path for one chart, rendering it if it is not cached"""
+        return self.render_many([spec])[0]
+
+    def render_many(self, specs: List[ChartSpec]) -> List[str]:
+        """
+        Return PNG paths for several charts, rendering the missing ones in parallel
+
+        Args:
+            specs: Charts to rasterize (duplicates are rendered once)
+
+        Returns:
+            list: PNG file paths, in the order of ``specs``
+        """
+        keys = [spec.key for spec in specs]
+        missing: Dict[str, ChartSpec] = {}
+        for key, spec in zip(keys, specs):
+            path = self.path(key)
+            if os.path.exists(path):
+                self._touch(path)
+            elif key not in missing:
+                missing[key] = spec
+        with self._lock:
+            self.hits += len(specs) - len(missing)
+            self.misses += len(missing)
+
+        with span("chart.render", charts=len(specs), rendered=len(missing), cache_hit=not missing):
+            if missing:
+                for key, png in zip(missing, self._render_all(list(missing.values()))):
+                    self._write(self.path(key), png)
+                self._evict()
+        return [self.path(key) for key in keys]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(glob.glob(os.path.join(self.directory, "*.png")))}
+
+    # ---------- internals ----------
+
+    def _render_all(self, specs: List[ChartSpec]) -> List[bytes]:
+        if len(specs) == 1 or self.workers <= 1:
+            return [_render_png(s.kind, s.args, s.kwargs) for s in specs]
+        try:
+            futures = [self._get_pool().submit(_render_png, s.kind, s.args, s.kwargs) for s in specs]
+            return [f.result() for f in futures]
+        except BrokenProcessPool:
+            with self._lock:
+                self._pool = None
+            return [_render_png(s.kind, s.args, s.kwargs) for s in specs]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        # Spawned (not forked) workers: the app process is multi-threaded. The pool
+        # stays warm so matplotlib/statsmodels are imported once per worker.
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"),
+                                                 initializer=_init_worker)
+            return self._pool
+
+    @staticmethod
+    def _write(path: str, png: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        # Bump mtime so eviction is LRU rather than FIFO
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        paths = glob.glob(os.path.join(self.directory, "*.png"))
+        if len(paths) <= self.max_entries:
+            return
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(paths, key=mtime)[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+_chart_cache: Optional[ChartCache] = None
+_chart_cache_lock = threading.Lock()
+
+
+def get_chart_cache() -> ChartCache:
+    """Return the process-wide chart cache"""
+    global _chart_cache
+    with _chart_cache_lock:
+        if _chart_cache is None:
+            _chart_cache = ChartCache()
+        return _chart_cache
@@ -0,0 +1,175 @@
+"""
+Context Builder for Smart Liquidity Monitor
+Compact, token-budgeted portfolio summaries for Gemini prompts
+"""
+
+import os
+import math
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("LR_CONTEXT_TOKEN_BUDGET", 1500))
+
+OUTLIER_COLUMNS: List[str] = ["member_id", "name", "cash_buffer_usd", "exposure_usd", "risk_ratio", "risk_level"]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the Gemini token count of a text locally (no API call)
+
+    Uses the usual ~4 characters per token rule, floored by a per-word count so
+    number-heavy tables are not underestimated.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    return max(math.ceil(len(text) / 4), math.ceil(len(text.split()) * 1.3))
+
+
+def _fmt_usd(value: float) -> str:
+    if not np.isfinite(value):
+        return "n/a"
+    for unit, scale in (("B", 1e9), ("M", 1e6), ("K", 1e3)):
+        if abs(value) >= scale:
+            return f"${value / scale:,.2f}{unit}"
+    return f"${value:,.0f}"
+
+
+def _aggregates_section(df: pd.DataFrame, ratio: pd.Series) -> str:
+    lines = ["## Portfolio aggregates", f"members: {len(df)}"]
+    if "cash_buffer_usd" in df.columns:
+        lines.append(f"total_cash_buffer: {_fmt_usd(df['cash_buffer_usd'].sum())}")
+    if "exposure_usd" in df.columns:
+        lines.append(f"total_exposure: {_fmt_usd(df['exposure_usd'].sum())}")
+    if {"credit_headroom_usd", "cash_buffer_usd"}.issubset(df.columns):
+        cash_total = df["cash_buffer_usd"].sum()
+        if cash_total:
+            lines.append(f"portfolio_risk_ratio: {df['credit_headroom_usd'].sum() / cash_total:.2f}")
+    if len(ratio):
+        lines.append(f"risk_ratio mean/median/max: {ratio.mean():.2f} / {ratio.median():.2f} / {ratio.max():.2f}")
+    if "risk_level" in df.columns:
+        counts = df["risk_level"].value_counts()
+        lines.append("members by level: " + ", ".join(f"{lvl}={int(counts.get(lvl, 0))}" for lvl in ("HIGH", "MEDIUM", "LOW")))
+    if "updated_at" in df.columns:
+        lines.append(f"latest update: {df['updated_at'].max()}")
+    return "\n".join(lines)
+
+
+def _quantiles_section(df: pd.DataFrame, ratio: pd.Series) -> str:
+    if "risk_level" not in df.columns or not len(ratio):
+        return ""
+    lines = ["## Risk-bucket quantiles (risk_ratio p10 / p50 / p90, median cash buffer)"]
+    levels = df.loc[ratio.index, "risk_level"]
+    for level in ("HIGH", "MEDIUM", "LOW"):
+        bucket = ratio[levels == level]
+        if bucket.empty:
+            continue
+        p10, p50, p90 = bucket.quantile([0.1, 0.5, 0.9])
+        cash = df.loc[bucket.index, "cash_buffer_usd"].median() if "cash_buffer_usd" in df.columns else float("nan")
+        lines.append(f"{level} (n={len(bucket)}): {p10:.2f} / {p50:.2f} / {p90:.2f}, cash {_fmt_usd(cash)}")
+    return "\n".join(lines)
+
+
+def find_anomalies(df: pd.DataFrame, z_threshold: float = 3.0, stale_days: int = 30) -> List[str]:
+    """
+    Precompute data anomalies worth flagging to the model
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        z_threshold: Z-score (on log risk ratio) above which a member is an outlier (default: 3.0)
+        stale_days: Age in days, relative to the newest update, that counts as stale (default: 30)
+
+    Returns:
+        list: One human-readable line per anomaly, most important first
+    """
+    anomalies: List[str] = []
+    label = df["name"] if "name" in df.columns else df.get("member_id", pd.Series(df.index, index=df.index))
+
+    if "cash_buffer_usd" in df.columns:
+        no_buffer = df["cash_buffer_usd"].isna() | (df["cash_buffer_usd"] <= 0)
+        if no_buffer.any():
+            names = ", ".join(label[no_buffer].astype(str).head(5))
+            anomalies.append(f"{int(no_buffer.sum())} members with zero/missing cash buffer (e.g. {names})")
+
+    if "updated_at" in df.columns:
+        updated = pd.to_datetime(df["updated_at"], errors="coerce", utc=True)
+        if updated.notna().any():
+            stale = updated < updated.max() - pd.Timedelta(days=stale_days)
+            if stale.any():
+                anomalies.append(f"{int(stale.sum())} members not updated in the {stale_days} days before the latest snapshot")
+
+    if "name" in df.columns:
+        dupes = df["name"][df["name"].duplicated(keep=False)]
+        if not dupes.empty:
+            anomalies.append(f"{dupes.nunique()} member names appear more than once (e.g. {dupes.iloc[0]})")
+
+    if "risk_ratio" in df.columns:
+        ratio = df["risk_ratio"].replace([np.inf, -np.inf], np.nan)
+        log_ratio = np.log(ratio[ratio > 0])
+        if len(log_ratio) > 2 and log_ratio.std() > 0:
+            z = (log_ratio - log_ratio.mean()) / log_ratio.std()
+            extreme = z[z.abs() > z_threshold].sort_values(ascending=False)
+            for idx, score in extreme.head(10).items():
+                anomalies.append(f"extreme risk_ratio {df.at[idx, 'risk_ratio']:.2f} (z={score:.1f}) for {label.at[idx]}")
+
+    return anomalies
+
+
+def build_portfolio_context(df: pd.DataFrame, token_budget: Optional[int] = None, top_k: int = 25) -> str:
+    """
+    Build a compact, token-budgeted description of the member book for prompts
+
+    Sections are added in priority order: aggregates, risk-bucket quantiles,
+    anomalies, then the riskiest members row by row until the budget is used.
+    The size of the result depends on the budget, not the size of the book.
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        token_budget: Maximum estimated tokens (default: LR_CONTEXT_TOKEN_BUDGET or 1500)
+        top_k: Maximum number of outlier rows to include (default: 25)
+
+    Returns:
+        str: Prompt-ready context text
+    """
+    budget = token_budget or DEFAULT_TOKEN_BUDGET
+    if df is None or df.empty:
+        return "No member data available."
+
+    ratio = df["risk_ratio"].replace([np.inf, -np.inf], np.nan).dropna() if "risk_ratio" in df.columns else pd.Series(dtype=float)
+    sections = [s for s in (_aggregates_section(df, ratio), _quantiles_section(df, ratio)) if s]
+    context = "\n\n".join(sections)
+
+    anomalies = find_anomalies(df)
+    if anomalies:
+        header = "\n\n## Anomalies"
+        added = header
+        for line in anomalies:
+            candidate = added + f"\n- {line}"
+            if estimate_tokens(context + candidate) > budget:
+                break
+            added = candidate
+        if added != header:
+            context += added
+
+    if len(ratio):
+        cols = [c for c in OUTLIER_COLUMNS if c in df.columns]
+        top = df.loc[ratio.nlargest(top_k).index, cols]
+        header = f"\n\n## Riskiest members (by risk_ratio, CSV)\n{','.join(cols)}"
+        rows = top.to_csv(index=False, header=False, float_format="%.2f").splitlines()
+        added = header
+        for row in rows:
+            candidate = added + "\n" + row
+            if estimate_tokens(context + candidate) > budget:
+                break
+            added = candidate
+        if added != header:
+            context += added
+
+    return context
@@ -1,25 +1,26 @@
 """
 Data Management for Smart Liquidity Monitor
-Handles Snowflake connection and data processing
+Streamlit layer over the liquidityradar core: cached Snowflake connection and
+member snapshot, with errors shown in the UI
 """
 
 import streamlit as st
 import snowflake.connector
 import pandas as pd
-import os
-import time
-from typing import Dict, Optional
+from typing import Optional
 
-def get_snowflake_config() -> Dict[str, Optional[str]]:
-    """Get Snowflake configuration from environment variables"""
-    return {
-        "user": os.environ.get("SF_USER"),
-        "password": os.environ.get("SF_PASS"),
-        "account": os.environ.get("SF_ACCOUNT"),
-        "warehouse": os.environ.get("SF_WAREHOUSE", "AIX_SF_WH"),
-        "database": os.environ.get("SF_DB", "AIX_SF_DB"),
-        "schema": os.environ.get("SF_SCHEMA", "PUBLIC")
-    }
+from liquidityradar.ingest import (  # noqa: F401  (re-exported for the pages)
+    SnowflakeConfigError,
+    compute_snapshot_version,
+    connect_snowflake,
+    get_frame_version,
+    get_snapshot_version,
+    get_snowflake_config,
+    query_member_data,
+)
+from liquidityradar.metrics import calculate_risk_metrics  # noqa: F401
+from snapshot_cache import get_snapshot_cache
+from tracing import span
 
 @st.cache_resource
 def get_snowflake_connection() -> Optional[snowflake.connector.SnowflakeConnection]:
@@ -29,83 +30,43 @@ def get_snowflake_connection() -> Optional[snowflake.connector.SnowflakeConnecti
     Returns:
         Snowflake connection object or None if connection fails
     """
-    config = get_snowflake_config()
+    def warn_retry(attempt: int, wait_time: float, error: Exception) -> None:
+        st.warning(f"⚠️ Connection attempt {attempt} failed. Retrying in {wait_time}s...")
     
-    # Validate required credentials
-    if not all([config.get("user"), config.get("password"), config.get("account")]):
-        st.error("❌ Missing Snowflake credentials. Please set SF_USER, SF_PASS, and SF_ACCOUNT environment variables.")
-        return None
-    
-    # Retry connection with exponential backoff
     max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            conn = snowflake.connector.connect(**config)
-            return conn
-        except Exception as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt  # Exponential backoff: 1s, 2s, 4s
-                st.warning(f"⚠️ Connection attempt {attempt + 1} failed. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                st.error(f"❌ Failed to connect to Snowflake after {max_retries} attempts: {e}")
-                return None
+    try:
+        return connect_snowflake(max_retries, on_retry=warn_retry)
+    except SnowflakeConfigError as e:
+        st.error(f"❌ {e}")
+    except Exception as e:
+        st.error(f"❌ Failed to connect to Snowflake after {max_retries} attempts: {e}")
+    return None
 
 @st.cache_data(ttl=300)  # Cache for 5 minutes
 def fetch_member_data() -> Optional[pd.DataFrame]:
     """
-    Fetch member liquidity data from Snowflake with caching
+    Fetch member liquidity data from Snowflake with caching (shared across replicas via Redis when configured)
     
     Returns:
         DataFrame: Processed member data or None if fetch fails
     """
-    conn = get_snowflake_connection()
-    if conn is None:
-        st.error("❌ No database connection available.")
-        return None
+    def load_from_snowflake() -> Optional[pd.DataFrame]:
+        conn = get_snowflake_connection()
+        return query_member_data(conn) if conn is not None else None
     
     try:
-        query = "SELECT member_id, name, cash_buffer_usd, exposure_usd, updated_at FROM AIX_SF_DB.PUBLIC.MEMBERS_NEW;"
-        cursor = conn.cursor()
-        cursor.execute(query)
-        df = cursor.fetch_pandas_all()
-        
-        # Convert column names to lowercase for consistency
-        df.columns = df.columns.str.lower()
-        
-        # Map exposure_usd to credit_headroom_usd for compatibility
-        if 'exposure_usd' in df.columns and 'credit_headroom_usd' not in df.columns:
-            df['credit_headroom_usd'] = df['exposure_usd']
-        
+        # With REDIS_URL set, only one replica per TTL queries Snowflake; the rest read its snapshot
+        with span("fetch_member_data") as s:
+            df = get_snapshot_cache().load(load_from_snowflake)
+            s.set(rows=len(df) if df is not None else 0)
+        if df is None:
+            st.error("❌ No database connection available.")
         return df
     except Exception as e:
         st.error(f"❌ Error loading data: {e}")
         st.info("💡 Please check your Snowflake connection and table structure.")
         return None
 
-def calculate_risk_metrics(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate risk metrics for member data
-    
-    Args:
-        df: DataFrame with member data
-    
-    Returns:
-        DataFrame: Data with added risk metrics
-    """
-    # Risk Calculation
-    df["risk_ratio"] = df["credit_headroom_usd"] / df["cash_buffer_usd"]
-    df["risk_level"] = df["risk_ratio"].apply(
-        lambda x: "HIGH" if x > 2 else "MEDIUM" if x > 1 else "LOW")
-    
-    # Risk Emoji Mapping
-    def risk_emoji(level: str) -> str:
-        return "🔴 High Risk" if level == "HIGH" else "🟡 Medium Risk" if level == "MEDIUM" else "🟢 Low Risk"
-    
-    df["Risk Insights"] = df["risk_level"].apply(risk_emoji)
-    
-    return df
-
 def color_risk(val: str) -> str:
     """
     Return background color based on risk level (Dark theme compatible)
@@ -0,0 +1,167 @@
+"""
+Data Export for Smart Liquidity Monitor
+Builds member exports on request (chunked CSV, gzip/zstd CSV, Parquet, Arrow IPC)
+and keeps them on disk per member snapshot so repeat downloads are served from file
+"""
+
+import io
+import os
+import glob
+import gzip
+import shutil
+import threading
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from liquidityradar.ingest import get_frame_version
+from tracing import span
+
+EXPORT_DIR = os.environ.get(
+    "LR_EXPORT_DIR", os.path.join(os.path.dirname(__file__), ".cache", "exports")
+)
+EXPORT_KEEP_SNAPSHOTS = int(os.environ.get("LR_EXPORT_KEEP_SNAPSHOTS", 3))
+CHUNK_ROWS = 100_000
+
+
+class ExportFormat:
+    """File extension, MIME type and writer for one export format"""
+
+    def __init__(self, label: str, extension: str, mime: str, writer: Callable[[pd.DataFrame, str], None]):
+        self.label = label
+        self.extension = extension
+        self.mime = mime
+        self.writer = writer
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int = CHUNK_ROWS):
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _write_csv(df: pd.DataFrame, path: str, compression: Optional[str] = None) -> None:
+    """CSV written chunk by chunk (optionally through a gzip/zstd stream), never held as one string"""
+    if compression == "gzip":
+        raw = gzip.open(path, "wb", compresslevel=6)  # stdlib zlib at level 6 beats Arrow's default gzip level
+    elif compression:
+        raw = pa.CompressedOutputStream(path, compression)
+    else:
+        raw = open(path, "wb")
+    with raw, io.TextIOWrapper(raw, encoding="utf-8", newline="") as text:
+        for i, chunk in enumerate(_chunks(df)):
+            chunk.to_csv(text, index=False, header=i == 0)
+
+
+def _arrow_schema(df: pd.DataFrame) -> pa.Schema:
+    return pa.Schema.from_pandas(df.head(CHUNK_ROWS), preserve_index=False)
+
+
+def _write_parquet(df: pd.DataFrame, path: str) -> None:
+    """Parquet with one zstd-compressed row group per chunk"""
+    schema = _arrow_schema(df)
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+def _write_arrow(df: pd.DataFrame, path: str) -> None:
+    """Arrow IPC file (uncompressed, so readers can memory-map it), one record batch per chunk"""
+    schema = _arrow_schema(df)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for chunk in _chunks(df):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+
+
+EXPORT_FORMATS: Dict[str, ExportFormat] = {
+    "csv": ExportFormat("CSV", "csv", "text/csv", _write_csv),
+    "csv.gz": ExportFormat("CSV (gzip)", "csv.gz", "application/gzip",
+                           lambda df, path: _write_csv(df, path, "gzip")),
+    "csv.zst": ExportFormat("CSV (zstd)", "csv.zst", "application/zstd",
+                            lambda df, path: _write_csv(df, path, "zstd")),
+    "parquet": ExportFormat("Parquet", "parquet", "application/vnd.apache.parquet", _write_parquet),
+    "arrow": ExportFormat("Arrow IPC", "arrow", "application/vnd.apache.arrow.file", _write_arrow),
+}
+
+
+class ExportStore:
+    """
+    Export files under ``<directory>/<frame version>/members.<ext>``
+
+    Files are written to a temporary name and renamed into place, so a reader
+    never sees a partial export; only the newest ``keep_snapshots`` snapshot
+    directories are kept.
+    """
+
+    def __init__(self, directory: str = EXPORT_DIR, keep_snapshots: int = EXPORT_KEEP_SNAPSHOTS):
+        self.directory = directory
+        self.keep_snapshots = keep_snapshots
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def path(self, frame_version: str, fmt: str) -> str:
+        return os.path.join(self.directory, frame_version, f"members.{EXPORT_FORMATS[fmt].extension}")
+
+    def cached(self, df: pd.DataFrame, fmt: str) -> Optional[str]:
+        """Path of an already-built export of this frame version, or None"""
+        path = self.path(get_frame_version(df), fmt)
+        return path if os.path.exists(path) else None
+
+    def export(self, df: pd.DataFrame, fmt: str) -> str:
+        """
+        Return the export file for this snapshot and format, building it if needed
+
+        Args:
+            df: Member frame (its frame version, snapshot plus thresholds and rows, names the cache directory)
+            fmt: Key of EXPORT_FORMATS
+
+        Returns:
+            str: Path of the export file
+        """
+        version = get_frame_version(df)
+        path = self.path(version, fmt)
+        with self._locks_lock:
+            lock = self._locks.setdefault(path, threading.Lock())
+        # One builder per file; concurrent sessions wait and then reuse it
+        with span("export", format=fmt, rows=len(df)) as s, lock:
+            if os.path.exists(path):
+                s.set(cache_hit=True)
+                return path
+            s.set(cache_hit=False)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                EXPORT_FORMATS[fmt].writer(df, tmp_path)
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            s.set(bytes=os.path.getsize(path))
+        self._prune(keep=version)
+        return path
+
+    def _prune(self, keep: str) -> None:
+        snapshots = [d for d in glob.glob(os.path.join(self.directory, "*")) if os.path.isdir(d)]
+        snapshots.sort(key=os.path.getmtime, reverse=True)
+        for stale in snapshots[self.keep_snapshots:]:
+            if os.path.basename(stale) != keep:
+                shutil.rmtree(stale, ignore_errors=True)
+
+
+_store: Optional[ExportStore] = None
+_store_lock = threading.Lock()
+
+
+def get_export_store() -> ExportStore:
+    """Return the process-wide export store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ExportStore()
+        return _store
+
+
+def export_members(df: pd.DataFrame, fmt: str = "csv") -> str:
+    """Build (or reuse) the member export for this snapshot and return its path"""
+    return get_export_store().export(df, fmt)
@@ -0,0 +1,409 @@
+"""
+Background Job Queue for Smart Liquidity Monitor
+Runs long AI, forecast and report tasks on a worker pool so pages can poll for results
+"""
+
+import io
+import os
+import json
+import time
+import base64
+import pickle
+import hashlib
+import inspect
+import importlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from redis_cache import get_redis_client
+
+DEFAULT_WORKERS = int(os.environ.get("LR_JOB_WORKERS", 4))
+DEFAULT_RESULT_TTL = int(os.environ.get("LR_JOB_RESULT_TTL", 1800))
+MAX_PERSISTED_BYTES = 8 * 1024 * 1024
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+# Job functions a replica may re-run from a spec found in Redis; anything else is dropped
+RESUMABLE_JOBS = frozenset({
+    "ai_scoring.score_members",
+    "ai_utils.stream_ai_response",
+    "exports.export_members",
+    "reports.render_report",
+    "visualizations.render_liquidity_forecast",
+})
+
+
+class JobCancelled(Exception):
+    """Raised inside a streaming job when it has been cancelled"""
+
+
+class Job:
+    """
+    State of one background job
+
+    Generator jobs publish their chunks to ``partial`` as they are produced, so
+    a page can show progress (e.g. streamed AI text) before the job finishes.
+    Only those ``streaming`` jobs can be stopped once they are running.
+    """
+
+    def __init__(self, job_id: str, name: str, ttl: int):
+        self.id = job_id
+        self.name = name
+        self.ttl = ttl
+        self.status = QUEUED
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.partial: List[Any] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+        self.streaming = False
+        self.future: Optional[Future] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINISHED
+
+    @property
+    def expired(self) -> bool:
+        return self.finished_at is not None and time.time() - self.finished_at > self.ttl
+
+    @property
+    def elapsed(self) -> float:
+        start = self.started_at or self.created_at
+        return (self.finished_at or time.time()) - start
+
+    def to_record(self) -> dict:
+        """Serializable snapshot used by the Redis backend"""
+        return {
+            "id": self.id, "name": self.name, "ttl": self.ttl, "status": self.status,
+            "result": self.result, "error": self.error, "partial": self.partial,
+            "created_at": self.created_at, "started_at": self.started_at, "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_record(cls, record: dict) -> "Job":
+        job = cls(record["id"], record["name"], record["ttl"])
+        for field in ("status", "result", "error", "partial", "created_at", "started_at", "finished_at"):
+            setattr(job, field, record[field])
+        return job
+
+
+def make_job_id(name: str, args: tuple, kwargs: dict) -> str:
+    """Derive a job id from the task name and its inputs, so identical requests share one job"""
+    try:
+        payload = pickle.dumps((name, args, sorted(kwargs.items())), protocol=4)
+    except Exception:
+        payload = repr((name, args, sorted(kwargs.items()))).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:20]
+
+
+def _qualified_name(fn: Callable) -> str:
+    return f"{fn.__module__}.{fn.__qualname__}"
+
+
+def _encode_value(value: Any) -> Any:
+    """JSON fallback for the data types jobs take and return; frames travel as Parquet"""
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, pd.DataFrame):
+        buffer = io.BytesIO()
+        value.to_parquet(buffer)
+        return {"__frame__": base64.b64encode(buffer.getvalue()).decode("ascii")}
+    if isinstance(value, pd.Series):
+        return {"__series__": {"name": value.name, "index": value.index.tolist(), "values": value.tolist()}}
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not persistable")
+
+
+def _decode_value(obj: dict) -> Any:
+    if "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    if "__frame__" in obj:
+        return pd.read_parquet(io.BytesIO(base64.b64decode(obj["__frame__"])))
+    if "__series__" in obj:
+        series = obj["__series__"]
+        return pd.Series(series["values"], index=series["index"], name=series["name"], dtype=object)
+    return obj
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, default=_encode_value).encode("utf-8")
+
+
+def _loads(raw: bytes) -> Any:
+    return json.loads(raw, object_hook=_decode_value)
+
+
+class RedisJobStore:
+    """
+    Persists job records, results and resumable specs in Redis
+
+    A replica that starts after a restart can read finished results by job id
+    and re-run queued/running jobs whose owning replica's lease has lapsed.
+    Everything is stored as JSON (never pickle), and only RESUMABLE_JOBS
+    functions are re-run, so write access to Redis cannot run arbitrary code.
+    """
+
+    def __init__(self, client, prefix: str = "jobs:", lease_ttl: int = 30):
+        self.client = client
+        self.prefix = prefix
+        self.lease_ttl = lease_ttl
+
+    def save(self, job: Job) -> None:
+        try:
+            payload = _dumps(job.to_record())
+        except (TypeError, ValueError):
+            payload = None
+        if payload is None or len(payload) > MAX_PERSISTED_BYTES:
+            record = dict(job.to_record(), result=None, partial=[], error=job.error or "result too large to persist")
+            payload = _dumps(record)
+        ttl = job.ttl + (0 if job.done else 24 * 3600)
+        self.client.set(self.prefix + job.id, payload, ex=ttl)
+
+    def load(self, job_id: str) -> Optional[Job]:
+        raw = self.client.get(self.prefix + job_id)
+        return Job.from_record(_loads(raw)) if raw else None
+
+    def save_spec(self, job_id: str, fn: Callable, args: tuple, kwargs: dict, ttl: int) -> None:
+        name = _qualified_name(fn)
+        if name not in RESUMABLE_JOBS:
+            return
+        try:
+            spec = _dumps({"fn": name, "args": args, "kwargs": kwargs, "ttl": ttl})
+        except Exception:
+            return
+        if len(spec) <= MAX_PERSISTED_BYTES:
+            self.client.set(f"{self.prefix}{job_id}:spec", spec, ex=24 * 3600)
+            self.client.sadd(f"{self.prefix}pending", job_id)
+
+    def clear_spec(self, job_id: str) -> None:
+        self.client.delete(f"{self.prefix}{job_id}:spec")
+        self.client.srem(f"{self.prefix}pending", job_id)
+
+    def renew_lease(self, job_id: str) -> None:
+        self.client.set(f"{self.prefix}{job_id}:lease", os.getpid(), ex=self.lease_ttl)
+
+    def orphaned_specs(self) -> Iterator[tuple]:
+        """Yield (job_id, spec) for pending jobs whose owner is gone"""
+        for raw_id in self.client.smembers(f"{self.prefix}pending"):
+            job_id = raw_id.decode() if isinstance(raw_id, bytes) else raw_id
+            if self.client.exists(f"{self.prefix}{job_id}:lease"):
+                continue
+            raw = self.client.get(f"{self.prefix}{job_id}:spec")
+            try:
+                spec = _loads(raw) if raw is not None else None
+            except ValueError:
+                spec = None
+            if spec is None:
+                self.clear_spec(job_id)
+                continue
+            yield job_id, spec
+
+
+class JobQueue:
+    """
+    In-process job queue backed by a thread pool
+
+    Args:
+        workers: Worker thread count (default: LR_JOB_WORKERS or 4)
+        result_ttl: Seconds finished results are kept (default: LR_JOB_RESULT_TTL or 1800)
+        store: Optional RedisJobStore so results and pending jobs survive a restart
+    """
+
+    def __init__(self, workers: int = DEFAULT_WORKERS, result_ttl: int = DEFAULT_RESULT_TTL,
+                 store: Optional[RedisJobStore] = None):
+        self.workers = workers
+        self.result_ttl = result_ttl
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job-worker")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        if store is not None:
+            threading.Thread(target=self._heartbeat, name="job-lease-heartbeat", daemon=True).start()
+
+    def submit(self, fn: Callable, *args, name: Optional[str] = None, ttl: Optional[int] = None,
+               job_id: Optional[str] = None, **kwargs) -> str:
+        """
+        Queue ``fn(*args, **kwargs)`` unless an identical job is already pending or finished
+
+        Args:
+            fn: Task callable; if it returns an iterator, chunks are collected into
+                ``partial`` and the final result is the joined text (or list)
+            name: Task name used for deduplication (default: fn's qualified name)
+            ttl: Seconds to keep the result after completion (default: queue result_ttl)
+            job_id: Explicit job id (default: derived from name and inputs); pass one
+                built from the snapshot version when inputs are large frames
+
+        Returns:
+            str: Job id to poll with get()
+        """
+        name = name or _qualified_name(fn)
+        job_id = job_id or make_job_id(name, args, kwargs)
+        ttl = ttl or self.result_ttl
+        with self._lock:
+            self._sweep()
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.status != CANCELLED and existing.status != FAILED:
+                return job_id
+        if self.store is not None:
+            try:
+                stored = self.store.load(job_id)
+            except Exception:
+                stored = None
+            if stored is not None and stored.status == DONE and not stored.expired:
+                return job_id
+        with self._lock:
+            existing = self._jobs.get(job_id)
+            if existing is not None and existing.status != CANCELLED and existing.status != FAILED:
+                return job_id
+            job = Job(job_id, name, ttl)
+            job.streaming = inspect.isgeneratorfunction(fn)
+            self._jobs[job_id] = job
+        if self.store is not None:
+            self._safe_store(self.store.renew_lease, job_id)
+            self._safe_store(self.store.save, job)
+            self._safe_store(self.store.save_spec, job_id, fn, args, kwargs, ttl)
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def get(self, job_id: Optional[str]) -> Optional[Job]:
+        """Return a job by id (falling back to the Redis store), or None if unknown or expired"""
+        if not job_id:
+            return None
+        with self._lock:
+            self._sweep()
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            try:
+                job = self.store.load(job_id)
+            except Exception:
+                job = None
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued job, or ask a running streaming job to stop after its current chunk
+
+        Returns:
+            bool: False if the job is unknown, finished, or running and not interruptible
+        """
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        if job.future is not None and job.future.cancel():
+            job.cancel_requested = True
+            self._finish(job, CANCELLED)
+            return True
+        if not job.streaming:
+            return False
+        job.cancel_requested = True
+        return True
+
+    def resume_pending(self) -> List[str]:
+        """Re-queue jobs left unfinished by a replica that went away (Redis mode only)"""
+        if self.store is None:
+            return []
+        resumed = []
+        for job_id, spec in self.store.orphaned_specs():
+            if spec.get("fn") not in RESUMABLE_JOBS:
+                self.store.clear_spec(job_id)
+                continue
+            module_name, _, attr = spec["fn"].rpartition(".")
+            try:
+                fn = getattr(importlib.import_module(module_name), attr)
+            except Exception:
+                self.store.clear_spec(job_id)
+                continue
+            self.submit(fn, *spec["args"], ttl=spec["ttl"], job_id=job_id, **spec["kwargs"])
+            resumed.append(job_id)
+        return resumed
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    # ---------- internals ----------
+
+    def _safe_store(self, method: Callable, *args) -> None:
+        # A Redis hiccup must not fail the job itself
+        try:
+            method(*args)
+        except Exception:
+            pass
+
+    def _heartbeat(self) -> None:
+        """Keep leases alive for this replica's unfinished jobs so no other replica resumes them"""
+        while True:
+            with self._lock:
+                active = [job.id for job in self._jobs.values() if not job.done]
+            for job_id in active:
+                self._safe_store(self.store.renew_lease, job_id)
+            time.sleep(self.store.lease_ttl / 3)
+
+    def _sweep(self) -> None:
+        for job_id in [j.id for j in self._jobs.values() if j.expired]:
+            del self._jobs[job_id]
+
+    def _finish(self, job: Job, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = time.time()
+        if self.store is not None:
+            self._safe_store(self.store.save, job)
+            self._safe_store(self.store.clear_spec, job.id)
+
+    def _run(self, job: Job, fn: Callable, args: tuple, kwargs: dict) -> None:
+        if job.cancel_requested:
+            self._finish(job, CANCELLED)
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            result = fn(*args, **kwargs)
+            if isinstance(result, Iterator):
+                job.streaming = True
+                for chunk in result:
+                    if job.cancel_requested:
+                        raise JobCancelled()
+                    job.partial.append(chunk)
+                parts = job.partial
+                result = "".join(parts) if all(isinstance(p, str) for p in parts) else list(parts)
+            if job.cancel_requested:
+                # Cancelled after the last chunk: honour it rather than report a cancel that did not happen
+                raise JobCancelled()
+            self._finish(job, DONE, result=result)
+        except JobCancelled:
+            self._finish(job, CANCELLED)
+        except Exception as e:
+            self._finish(job, FAILED, error=str(e))
+
+
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue (Redis-backed when REDIS_URL is configured)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            client = get_redis_client()
+            store = RedisJobStore(client) if client is not None else None
+            _queue = JobQueue(store=store)
+            try:
+                _queue.resume_pending()
+            except Exception:
+                pass
+        return _queue
@@ -0,0 +1,43 @@
+"""
+Compute Core for Smart Liquidity Monitor
+Streamlit-free ingestion, risk metrics, forecasting and simulation, shared by the
+dashboard pages, the report scheduler and the ``liquidityradar`` batch CLI
+
+Reporting and exports (reports.py, exports.py, scheduler.py) build on this
+package and are Streamlit-free as well; the UI-only pieces (Streamlit caching,
+st.error messages, charts styling) stay in data.py, visualizations.py and pages/.
+"""
+
+from liquidityradar.forecast import forecast_liquidity, forecast_members
+from liquidityradar.ingest import (
+    SnowflakeConfigError,
+    compute_snapshot_version,
+    connect_snowflake,
+    get_frame_version,
+    get_snapshot_version,
+    get_snowflake_config,
+    load_members,
+    query_member_data,
+    read_members,
+)
+from liquidityradar.metrics import calculate_risk_metrics
+from liquidityradar.parallel import map_chunks
+from liquidityradar.simulation import simulate_portfolio, stress_members
+
+__all__ = [
+    "SnowflakeConfigError",
+    "calculate_risk_metrics",
+    "compute_snapshot_version",
+    "connect_snowflake",
+    "forecast_liquidity",
+    "forecast_members",
+    "get_frame_version",
+    "get_snapshot_version",
+    "get_snowflake_config",
+    "load_members",
+    "map_chunks",
+    "query_member_data",
+    "read_members",
+    "simulate_portfolio",
+    "stress_members",
+]
@@ -0,0 +1,5 @@
+import sys
+
+from liquidityradar.cli import main
+
+sys.exit(main())
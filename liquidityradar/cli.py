@@ -0,0 +1,226 @@
+"""
+Batch CLI for Smart Liquidity Monitor
+Whole-book risk scans, forecasts, stress tests and reports without the UI
+
+Usage:
+    liquidityradar scan --input members.parquet --output scored.parquet
+    liquidityradar forecast --top 500 --output forecasts.parquet
+    liquidityradar stress --shocks 1.0,1.5,2.0 --paths 2000 --output stress.arrow
+    liquidityradar report --output-dir reports/daily --segment-by region
+
+Without --input the book is read from Snowflake (SF_USER / SF_PASS / SF_ACCOUNT).
+Outputs are written by extension: .parquet, .arrow, .csv, .csv.gz or .csv.zst.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from liquidityradar.forecast import FORECAST_STEPS, forecast_members
+from liquidityradar.ingest import SnowflakeConfigError, load_members
+from liquidityradar.metrics import calculate_risk_metrics, risk_codes
+from liquidityradar.parallel import map_chunks
+from liquidityradar.simulation import stress_members
+from risk_index import RISK_INSIGHTS, RISK_LEVELS, get_risk_thresholds
+
+SCAN_CHUNK_ROWS = 500_000
+FORECAST_CHUNK_ROWS = 100  # ~50 ms of ARIMA fitting per member
+STRESS_CHUNK_ROWS = 5_000  # x paths x 8 bytes of simulated ratios per task
+
+
+def write_frame(df: pd.DataFrame, path: str) -> str:
+    """
+    Write a frame in the columnar/text format given by the file extension, atomically
+
+    Returns:
+        str: The format key used (see exports.EXPORT_FORMATS)
+    """
+    from exports import EXPORT_FORMATS
+
+    fmt = next((key for key, spec in sorted(EXPORT_FORMATS.items(), key=lambda item: -len(item[1].extension))
+                if path.endswith("." + spec.extension)), None)
+    if fmt is None:
+        raise ValueError(f"Unsupported output format for {path}; use one of: "
+                         + ", ".join("." + spec.extension for spec in EXPORT_FORMATS.values()))
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        EXPORT_FORMATS[fmt].writer(df, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return fmt
+
+
+# ---------- chunk workers (module level so the process pool can pickle them) ----------
+
+def _scan_chunk(chunk: pd.DataFrame, index: int, low: float, high: float) -> Tuple[np.ndarray, np.ndarray]:
+    return risk_codes(chunk["cash_buffer_usd"].to_numpy(), chunk["credit_headroom_usd"].to_numpy(), low, high)
+
+
+def _forecast_chunk(chunk: pd.DataFrame, index: int, steps: int) -> pd.DataFrame:
+    return forecast_members(chunk, steps)
+
+
+def _stress_chunk(chunk: pd.DataFrame, index: int, shocks: List[float], paths: int, high: float,
+                  seed: int) -> pd.DataFrame:
+    # Seeded per chunk, so results do not depend on the worker count
+    return stress_members(chunk, shocks, paths, high, seed=[seed, index])
+
+
+# ---------- commands ----------
+
+def _thresholds(args) -> Tuple[float, float]:
+    low, high = get_risk_thresholds()
+    low = args.low if args.low is not None else low
+    high = args.high if args.high is not None else high
+    if low > high:
+        raise ValueError("The low risk threshold must not be above the high risk threshold")
+    return low, high
+
+
+def scan_book(df: pd.DataFrame, low: float, high: float, workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Add risk_ratio / risk_level / Risk Insights to a whole book, classifying row chunks in parallel
+
+    Returns:
+        DataFrame: Same columns as calculate_risk_metrics produces
+    """
+    parts = map_chunks(_scan_chunk, df[["cash_buffer_usd", "credit_headroom_usd"]], SCAN_CHUNK_ROWS, workers,
+                       low=low, high=high)
+    ratio = np.concatenate([p[0] for p in parts])
+    codes = np.concatenate([p[1] for p in parts])
+    df["risk_ratio"] = ratio
+    df["risk_level"] = pd.Categorical.from_codes(codes, categories=RISK_LEVELS)
+    df.attrs["risk_thresholds"] = (low, high)
+    df["Risk Insights"] = pd.Categorical.from_codes(codes, categories=RISK_INSIGHTS)
+    return df
+
+
+def cmd_scan(args) -> int:
+    low, high = _thresholds(args)
+    df = scan_book(load_members(args.input), low, high, args.workers)
+    fmt = write_frame(df, args.output)
+    counts = df["risk_level"].value_counts()
+    print(f"{len(df):,} members (thresholds {low:g}/{high:g}): "
+          + ", ".join(f"{level} {int(counts.get(level, 0)):,}" for level in reversed(RISK_LEVELS))
+          + f" -> {args.output} ({fmt})")
+    return 0
+
+
+def cmd_forecast(args) -> int:
+    low, high = _thresholds(args)
+    df = calculate_risk_metrics(load_members(args.input), thresholds=(low, high))
+    if args.top:
+        df = df.nlargest(args.top, "risk_ratio")
+    forecasts = map_chunks(_forecast_chunk, df[["member_id", "cash_buffer_usd", "credit_headroom_usd"]],
+                           FORECAST_CHUNK_ROWS, args.workers, steps=args.steps)
+    out = pd.concat(forecasts, ignore_index=True)
+    write_frame(out, args.output)
+    print(f"{len(df):,} members x {args.steps} months -> {args.output}")
+    return 0
+
+
+def cmd_stress(args) -> int:
+    low, high = _thresholds(args)
+    df = calculate_risk_metrics(load_members(args.input), thresholds=(low, high))
+    shocks = [float(s) for s in args.shocks.split(",") if s.strip()]
+    parts = map_chunks(_stress_chunk, df[["member_id", "risk_ratio"]], STRESS_CHUNK_ROWS, args.workers,
+                       shocks=shocks, paths=args.paths, high=high, seed=args.seed)
+    out = pd.concat(parts, ignore_index=True)
+    write_frame(out, args.output)
+    summary = out.groupby("shock")["prob_high"].apply(lambda p: int((p >= 0.5).sum()))
+    print(f"{len(df):,} members x {len(shocks)} shocks x {args.paths} paths -> {args.output}")
+    for shock, breaching in summary.items():
+        print(f"  shock {shock:g}x: {breaching:,} members likely above the HIGH threshold ({high:g})")
+    return 0
+
+
+def cmd_report(args) -> int:
+    from query_engine import QueryEngineError
+    from scheduler import DEFAULT_SEGMENTS, run_batch
+
+    low, high = _thresholds(args)
+    df = scan_book(load_members(args.input), low, high, args.workers)
+    specs = DEFAULT_SEGMENTS
+    if args.segments:
+        with open(args.segments, "r", encoding="utf-8") as f:
+            specs = json.load(f)
+    try:
+        manifest = run_batch(df, args.output_dir, specs, args.segment_by, args.workers,
+                             args.full_book, args.top_n, args.force)
+    except QueryEngineError as e:
+        print(f"Invalid segment filter: {e}", file=sys.stderr)
+        return 2
+    if args.export:
+        write_frame(df, os.path.join(args.output_dir, f"members.{args.export}"))
+    statuses = [entry["status"] for entry in manifest["segments"].values()]
+    print(f"{statuses.count('rendered')} rendered, {statuses.count('skipped')} unchanged, "
+          f"{statuses.count('failed')} failed in {manifest['elapsed_seconds']:.1f}s -> {args.output_dir}")
+    return 1 if "failed" in statuses else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="liquidityradar", description="Smart Liquidity Monitor batch jobs")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--input", help="Member file (.parquet / .arrow / .csv) instead of Snowflake")
+    common.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    common.add_argument("--low", type=float, default=None, help="Low risk threshold (default: saved setting)")
+    common.add_argument("--high", type=float, default=None, help="High risk threshold (default: saved setting)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan = commands.add_parser("scan", parents=[common], help="Risk ratio and level for every member")
+    scan.add_argument("--output", default="members_scored.parquet")
+    scan.set_defaults(run=cmd_scan)
+
+    forecast = commands.add_parser("forecast", parents=[common], help="ARIMA liquidity forecast per member")
+    forecast.add_argument("--output", default="forecasts.parquet")
+    forecast.add_argument("--steps", type=int, default=FORECAST_STEPS, help="Months to forecast (default: 3)")
+    forecast.add_argument("--top", type=int, default=0, help="Only the N riskiest members (default: whole book)")
+    forecast.set_defaults(run=cmd_forecast)
+
+    stress = commands.add_parser("stress", parents=[common], help="Monte Carlo stress test per member")
+    stress.add_argument("--output", default="stress.parquet")
+    stress.add_argument("--shocks", default="1.0,1.5,2.0", help="Comma-separated shock multipliers")
+    stress.add_argument("--paths", type=int, default=1000, help="Simulated paths per member and shock")
+    stress.add_argument("--seed", type=int, default=0)
+    stress.set_defaults(run=cmd_stress)
+
+    report = commands.add_parser("report", parents=[common], help="PDF reports per member segment")
+    report.add_argument("--output-dir", default=os.environ.get("LR_REPORT_OUTPUT_DIR", "reports"))
+    report.add_argument("--segments", help="JSON file with [{\"name\": ..., \"filter\": ...}]")
+    report.add_argument("--segment-by", help="Column to split into one segment per value")
+    report.add_argument("--full-book", action="store_true")
+    report.add_argument("--top-n", type=int, default=10)
+    report.add_argument("--force", action="store_true", help="Re-render unchanged segments too")
+    report.add_argument("--export", choices=["parquet", "arrow", "csv", "csv.gz", "csv.zst"],
+                        help="Also write the scored book to the output directory")
+    report.set_defaults(run=cmd_report)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    try:
+        status = args.run(args)
+    except SnowflakeConfigError as e:
+        print(f"{e} Or pass --input with a member file.", file=sys.stderr)
+        return 2
+    except (OSError, ValueError) as e:
+        print(f"liquidityradar {args.command}: {e}", file=sys.stderr)
+        return 2
+    print(f"done in {time.perf_counter() - started:.1f}s")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
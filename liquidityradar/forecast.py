@@ -0,0 +1,82 @@
+"""
+Liquidity Forecasting for Smart Liquidity Monitor
+ARIMA(2,1,1) projections of a member's cash buffer and credit headroom
+"""
+
+import warnings
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from tracing import traced
+
+HISTORY_MONTHS = 12
+FORECAST_STEPS = 3
+ARIMA_ORDER = (2, 1, 1)
+
+
+def simulated_history(cash_buffer: float, credit_headroom: float, months: int = HISTORY_MONTHS,
+                      seed: int = 42) -> pd.DataFrame:
+    """
+    Simulate monthly history ending at the current values (trend plus noise)
+
+    The same seed always gives the same history, so a member's forecast is
+    reproducible across the dashboard, reports and batch runs.
+
+    Returns:
+        DataFrame: cash_buffer_usd and credit_headroom_usd, oldest month first
+    """
+    rng = np.random.RandomState(seed)
+    cash = [cash_buffer * (1 + 0.01 * i + rng.normal(0, 0.05)) for i in range(-months, 0)]
+    credit = [credit_headroom * (1 + 0.008 * i + rng.normal(0, 0.04)) for i in range(-months, 0)]
+    return pd.DataFrame({"cash_buffer_usd": cash, "credit_headroom_usd": credit})
+
+
+@traced("forecast.arima")
+def forecast_liquidity(cash_buffer: float, credit_headroom: float, steps: int = FORECAST_STEPS) -> Dict[str, List[float]]:
+    """
+    Forecast a member's cash buffer and credit headroom
+
+    Args:
+        cash_buffer: Current cash buffer (USD)
+        credit_headroom: Current credit headroom (USD)
+        steps: Months to forecast (default: 3)
+
+    Returns:
+        dict: cash_buffer_usd / credit_headroom_usd -> [current, month 1, ..., month steps]
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+
+    history = simulated_history(cash_buffer, credit_headroom)
+    result = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # ARIMA convergence warnings on short series
+        for column, current in (("cash_buffer_usd", cash_buffer), ("credit_headroom_usd", credit_headroom)):
+            model = ARIMA(history[column], order=ARIMA_ORDER).fit()
+            result[column] = [current] + list(model.forecast(steps=steps))
+    return result
+
+
+def forecast_members(members: pd.DataFrame, steps: int = FORECAST_STEPS) -> pd.DataFrame:
+    """
+    Forecast every member of a frame (one ARIMA fit per member and series)
+
+    Args:
+        members: Frame with member_id, cash_buffer_usd and credit_headroom_usd
+        steps: Months to forecast (default: 3)
+
+    Returns:
+        DataFrame: member_id, month (1..steps), cash_buffer_usd, credit_headroom_usd, risk_ratio
+    """
+    ids, months, cash, credit = [], [], [], []
+    for member_id, cash_now, credit_now in zip(members["member_id"], members["cash_buffer_usd"],
+                                                members["credit_headroom_usd"]):
+        forecast = forecast_liquidity(float(cash_now), float(credit_now), steps)
+        ids += [member_id] * steps
+        months += list(range(1, steps + 1))
+        cash += forecast["cash_buffer_usd"][1:]
+        credit += forecast["credit_headroom_usd"][1:]
+    out = pd.DataFrame({"member_id": ids, "month": months, "cash_buffer_usd": cash, "credit_headroom_usd": credit})
+    out["risk_ratio"] = out["credit_headroom_usd"] / out["cash_buffer_usd"]
+    return out
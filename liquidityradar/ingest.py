@@ -0,0 +1,189 @@
+"""
+Ingestion for Smart Liquidity Monitor
+Loads the member book from Snowflake or from CSV / Parquet / Arrow files and
+tags it with a content-hash snapshot version (no Streamlit calls)
+"""
+
+import os
+import time
+import json
+import hashlib
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from risk_index import rows_fingerprint
+from tracing import span
+
+MEMBERS_QUERY = "SELECT member_id, name, cash_buffer_usd, exposure_usd, updated_at FROM AIX_SF_DB.PUBLIC.MEMBERS_NEW;"
+
+
+class SnowflakeConfigError(RuntimeError):
+    """Raised when the Snowflake credentials are not set"""
+
+
+def get_snowflake_config() -> Dict[str, Optional[str]]:
+    """Get Snowflake configuration from environment variables"""
+    return {
+        "user": os.environ.get("SF_USER"),
+        "password": os.environ.get("SF_PASS"),
+        "account": os.environ.get("SF_ACCOUNT"),
+        "warehouse": os.environ.get("SF_WAREHOUSE", "AIX_SF_WH"),
+        "database": os.environ.get("SF_DB", "AIX_SF_DB"),
+        "schema": os.environ.get("SF_SCHEMA", "PUBLIC")
+    }
+
+
+def connect_snowflake(max_retries: int = 3, on_retry: Optional[Callable[[int, float, Exception], None]] = None):
+    """
+    Open a Snowflake connection, retrying with exponential backoff (1s, 2s, 4s, ...)
+
+    Args:
+        max_retries: Connection attempts before giving up (default: 3)
+        on_retry: Optional callback(attempt, wait_seconds, error) before each retry
+
+    Returns:
+        SnowflakeConnection: Open connection
+
+    Raises:
+        SnowflakeConfigError: If SF_USER, SF_PASS or SF_ACCOUNT is missing
+        Exception: The connector's error after the last failed attempt
+    """
+    import snowflake.connector
+
+    config = get_snowflake_config()
+    if not all([config.get("user"), config.get("password"), config.get("account")]):
+        raise SnowflakeConfigError(
+            "Missing Snowflake credentials. Please set SF_USER, SF_PASS, and SF_ACCOUNT environment variables.")
+    for attempt in range(max_retries):
+        try:
+            return snowflake.connector.connect(**config)
+        except Exception as e:
+            if attempt == max_retries - 1:
+                raise
+            wait_time = 2 ** attempt
+            if on_retry is not None:
+                on_retry(attempt + 1, wait_time, e)
+            time.sleep(wait_time)
+
+
+def normalize_members(df: pd.DataFrame) -> pd.DataFrame:
+    """Lowercase the MEMBERS_NEW columns, map exposure_usd to credit_headroom_usd and tag the snapshot version"""
+    # Convert column names to lowercase for consistency
+    df.columns = df.columns.str.lower()
+
+    # Map exposure_usd to credit_headroom_usd for compatibility
+    if 'exposure_usd' in df.columns and 'credit_headroom_usd' not in df.columns:
+        df['credit_headroom_usd'] = df['exposure_usd']
+
+    # Tag the frame with its snapshot version so downstream caches can key on it
+    df.attrs['snapshot_version'] = compute_snapshot_version(df)
+    return df
+
+
+def query_member_data(conn) -> pd.DataFrame:
+    """
+    Load the member table over an open connection
+
+    Args:
+        conn: Snowflake connection
+
+    Returns:
+        DataFrame: Member data tagged with its snapshot version
+    """
+    with span("snowflake.query") as s:
+        cursor = conn.cursor()
+        cursor.execute(MEMBERS_QUERY)
+        df = cursor.fetch_pandas_all()
+        s.set(rows=len(df))
+    return normalize_members(df)
+
+
+def read_members(path: str) -> pd.DataFrame:
+    """
+    Read a member file exported from MEMBERS_NEW (or by this app)
+
+    Args:
+        path: .csv / .csv.gz / .csv.zst, .parquet, or .arrow / .feather file
+
+    Returns:
+        DataFrame: Member data tagged with its snapshot version
+    """
+    with span("ingest.read_file", format=os.path.splitext(path)[1]) as s:
+        if path.endswith(".parquet"):
+            df = pd.read_parquet(path)
+        elif path.endswith((".arrow", ".feather")):
+            df = pd.read_feather(path)
+        else:
+            df = pd.read_csv(path)
+        s.set(rows=len(df), bytes=os.path.getsize(path))
+    return normalize_members(df)
+
+
+def load_members(input_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load the member book from a file or, by default, from Snowflake
+
+    Args:
+        input_path: Optional member file (see read_members)
+
+    Returns:
+        DataFrame: Member data tagged with its snapshot version (no risk metrics yet)
+    """
+    if input_path:
+        return read_members(input_path)
+    conn = connect_snowflake()
+    try:
+        return query_member_data(conn)
+    finally:
+        conn.close()
+
+
+def compute_snapshot_version(df: pd.DataFrame) -> str:
+    """
+    Compute a content hash identifying a member data snapshot
+
+    Args:
+        df: DataFrame with member data
+
+    Returns:
+        str: Short hex digest that changes whenever any member row changes
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(row_hashes.tobytes()).hexdigest()[:16]
+
+
+def get_snapshot_version(df: pd.DataFrame) -> str:
+    """
+    Return the snapshot version attached at load time (computed if missing)
+
+    Args:
+        df: DataFrame with member data
+
+    Returns:
+        str: Snapshot version string
+    """
+    version = df.attrs.get('snapshot_version')
+    if version is None:
+        version = compute_snapshot_version(df)
+        df.attrs['snapshot_version'] = version
+    return version
+
+
+def get_frame_version(df: pd.DataFrame) -> str:
+    """
+    Return a version for what a member frame shows: its snapshot, risk thresholds and rows
+
+    Key reports, exports and jobs on this rather than the snapshot version alone:
+    risk levels change with the thresholds, and filtered frames inherit their
+    snapshot's attrs.
+
+    Args:
+        df: DataFrame with member data (and risk metrics)
+
+    Returns:
+        str: Snapshot version plus a short digest of thresholds and rows (safe as a file name)
+    """
+    version = get_snapshot_version(df)
+    payload = json.dumps([df.attrs.get('risk_thresholds'), rows_fingerprint(df)], default=str)
+    return f"{version}-{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:8]}"
@@ -0,0 +1,54 @@
+"""
+Risk Metrics for Smart Liquidity Monitor
+Risk ratio and HIGH / MEDIUM / LOW classification of a member book
+"""
+
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from risk_index import RISK_INSIGHTS, RISK_LEVELS, classify_ratios, get_risk_index, get_risk_thresholds
+from tracing import span
+
+
+def calculate_risk_metrics(df: pd.DataFrame, thresholds: Optional[Tuple[float, float]] = None) -> pd.DataFrame:
+    """
+    Calculate risk metrics for member data
+
+    Args:
+        df: DataFrame with member data
+        thresholds: (low, high) risk-ratio cut-offs (default: the ones saved on the Settings page)
+
+    Returns:
+        DataFrame: Data with added risk metrics
+    """
+    with span("risk_metrics", rows=len(df)) as s:
+        # Risk Calculation
+        df["risk_ratio"] = df["credit_headroom_usd"] / df["cash_buffer_usd"]
+        low, high = thresholds if thresholds is not None else get_risk_thresholds()
+
+        # Snapshots keep a sorted risk-ratio index, so a threshold change only relabels the members that cross it
+        index = get_risk_index(df)
+        s.set(cache_hit=index is not None and index.thresholds is not None)
+        codes = index.classify(low, high) if index is not None else classify_ratios(df["risk_ratio"].to_numpy(), low, high)
+    df["risk_level"] = pd.Categorical.from_codes(codes, categories=RISK_LEVELS)
+    df.attrs["risk_thresholds"] = (low, high)
+
+    # Risk Emoji Mapping
+    df["Risk Insights"] = pd.Categorical.from_codes(codes, categories=RISK_INSIGHTS)
+
+    return df
+
+
+def risk_codes(cash_buffer: np.ndarray, credit_headroom: np.ndarray, low: float, high: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Risk ratios and level codes for raw columns (no frame, no index; used by parallel batch scans)
+
+    Returns:
+        tuple: (risk_ratio, int8 codes into RISK_LEVELS)
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.asarray(credit_headroom, dtype=float) / np.asarray(cash_buffer, dtype=float)
+    return ratio, classify_ratios(ratio, low, high)
+
@@ -0,0 +1,46 @@
+"""
+Parallel Book Processing for Smart Liquidity Monitor
+Splits a member frame into row chunks and maps a function over them on a process pool
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, TypeVar
+
+import pandas as pd
+
+T = TypeVar("T")
+
+
+def chunk_frame(df: pd.DataFrame, chunk_rows: int) -> List[pd.DataFrame]:
+    """Consecutive row slices of at most ``chunk_rows`` rows (at least one, possibly empty)"""
+    chunk_rows = max(1, chunk_rows)
+    return [df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows)] or [df]
+
+
+def map_chunks(fn: Callable[..., T], df: pd.DataFrame, chunk_rows: int, workers: Optional[int] = None,
+               **kwargs) -> List[T]:
+    """
+    Apply ``fn(chunk, chunk_index, **kwargs)`` to every row chunk, in chunk order
+
+    ``fn`` must be a module-level function (it is pickled to the workers). With
+    one worker, or a single chunk, everything runs in this process. Pass the
+    chunk index on to seeds so results do not depend on the worker count.
+
+    Args:
+        fn: Function of (chunk, chunk_index, **kwargs)
+        df: Member frame
+        chunk_rows: Rows per task
+        workers: Process count (default: CPU count)
+        **kwargs: Passed to every call
+
+    Returns:
+        list: fn results in chunk order
+    """
+    chunks = chunk_frame(df, chunk_rows)
+    workers = min(workers or os.cpu_count() or 1, len(chunks))
+    if workers <= 1:
+        return [fn(chunk, i, **kwargs) for i, chunk in enumerate(chunks)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(fn, chunk, i, **kwargs) for i, chunk in enumerate(chunks)]
+        return [f.result() for f in futures]
@@ -0,0 +1,184 @@
+"""
+LLM Response Cache for Smart Liquidity Monitor
+TTL + size-bounded cache for Gemini responses (disk locally, Redis when REDIS_URL is set)
+"""
+
+import os
+import json
+import time
+import glob
+import hashlib
+import threading
+from typing import Dict, Optional
+
+from redis_cache import get_redis_client
+
+CACHE_DIR = os.environ.get(
+    "LR_LLM_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "llm")
+)
+DEFAULT_TTL = int(os.environ.get("LR_LLM_CACHE_TTL", 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("LR_LLM_CACHE_MAX_ENTRIES", 500))
+
+
+def make_cache_key(model: str, prompt: str, temperature: float, data_version: Optional[str] = None) -> str:
+    """Hash model, prompt, temperature and member-snapshot version into a cache key"""
+    payload = json.dumps([model, prompt, float(temperature), data_version or ""], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCacheBackend:
+    """One JSON file per entry; least recently used files are evicted past max_entries"""
+
+    def __init__(self, directory: str = CACHE_DIR, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) < time.time():
+            self.delete(key)
+            return None
+        # Bump mtime so eviction is LRU rather than FIFO
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def set(self, key: str, entry: dict, ttl: int) -> None:
+        entry = dict(entry, expires_at=time.time() + ttl)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        paths = glob.glob(os.path.join(self.directory, "*.json"))
+        if len(paths) <= self.max_entries:
+            return
+        def mtime(path):
+            try:
+                return os.path.getmtime(path)
+            except OSError:
+                return 0
+        for path in sorted(paths, key=mtime)[:len(paths) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class RedisCacheBackend:
+    """Entries expire via Redis TTL; a sorted set of access times bounds the entry count"""
+
+    def __init__(self, client, prefix: str = "llmcache:", max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.client = client
+        self.prefix = prefix
+        self.max_entries = max_entries
+        self.lru_key = f"{prefix}__lru__"
+
+    def get(self, key: str) -> Optional[dict]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        self.client.zadd(self.lru_key, {key: time.time()})
+        return json.loads(raw)
+
+    def set(self, key: str, entry: dict, ttl: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + key, json.dumps(entry), ex=ttl)
+        pipe.zadd(self.lru_key, {key: time.time()})
+        pipe.zcard(self.lru_key)
+        size = pipe.execute()[-1]
+        if size > self.max_entries:
+            stale = self.client.zrange(self.lru_key, 0, size - self.max_entries - 1)
+            if stale:
+                stale = [k.decode() if isinstance(k, bytes) else k for k in stale]
+                pipe = self.client.pipeline()
+                pipe.delete(*[self.prefix + k for k in stale])
+                pipe.zrem(self.lru_key, *stale)
+                pipe.execute()
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+        self.client.zrem(self.lru_key, key)
+
+
+class ResponseCache:
+    """
+    Response cache in front of the Gemini API
+
+    Tracks hits, misses and the generation latency that cache hits avoided.
+    Backend errors are swallowed so a broken cache never breaks an AI call.
+    """
+
+    def __init__(self, backend, ttl: int = DEFAULT_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            entry = self.backend.get(key)
+        except Exception:
+            entry = None
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.latency_saved += float(entry.get("latency", 0.0))
+        return entry.get("text")
+
+    def set(self, key: str, text: str, latency: float = 0.0) -> None:
+        try:
+            self.backend.set(key, {"text": text, "latency": latency}, self.ttl)
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, float]:
+        """Hit rate and total latency saved (seconds) for this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "latency_saved_s": self.latency_saved,
+            }
+
+
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache (Redis-backed when REDIS_URL is configured)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            client = get_redis_client()
+            backend = RedisCacheBackend(client) if client is not None else DiskCacheBackend()
+            _cache = ResponseCache(backend)
+        return _cache
@@ -0,0 +1,525 @@
+"""
+LLM Gateway for Smart Liquidity Monitor
+Process-wide access point for Gemini calls: pooled client, request coalescing,
+concurrency and rate limiting, jittered retries, hedged requests, a circuit
+breaker and per-model latency histograms
+"""
+
+import os
+import json
+import time
+import queue
+import random
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from google import genai
+from google.genai import types
+
+from tracing import record_span
+
+
+class GatewayError(Exception):
+    """Base class for errors raised by the LLM gateway"""
+
+
+class GatewayConfigError(GatewayError):
+    """Raised when the Gemini client cannot be configured (e.g. missing API key)"""
+
+
+class CircuitOpenError(GatewayError):
+    """Raised when the circuit breaker is open and calls are being shed"""
+
+
+class DeadlineExceededError(GatewayError):
+    """Raised when a call cannot complete (or retry) within its deadline"""
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: ``rate`` tokens per second, bursts up to ``capacity``"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> bool:
+        """Take one token, waiting until one is available or the deadline passes"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after ``failure_threshold`` consecutive failures; after
+    ``reset_timeout`` seconds a single half-open probe decides whether to close again
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with percentile estimates
+
+    Counts decay exponentially with a ``half_life`` in seconds and are halved
+    whenever ``max_samples`` is reached, so the percentiles follow the
+    provider's current behaviour rather than all history, and a model that
+    stops receiving calls loses its old samples instead of keeping them forever.
+    """
+
+    BOUNDS: List[float] = [0.05 * 1.5 ** i for i in range(20)]  # 50ms .. ~110s
+
+    def __init__(self, max_samples: int = 2000, half_life: float = 300.0):
+        self.max_samples = max_samples
+        self.half_life = half_life
+        self._counts = [0.0] * (len(self.BOUNDS) + 1)
+        self._total = 0.0
+        self._sum = 0.0
+        self._decayed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _decay(self) -> None:
+        """Age the counts to now (caller holds the lock)"""
+        now = time.monotonic()
+        factor = 0.5 ** ((now - self._decayed_at) / self.half_life) if self.half_life else 1.0
+        self._decayed_at = now
+        if factor < 1.0:
+            self._counts = [c * factor for c in self._counts]
+            self._total *= factor
+            self._sum *= factor
+
+    def record(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.BOUNDS) if seconds <= bound), len(self.BOUNDS))
+        with self._lock:
+            self._decay()
+            self._counts[index] += 1
+            self._total += 1
+            self._sum += seconds
+            if self._total >= self.max_samples:
+                self._counts = [c / 2 for c in self._counts]
+                self._total /= 2
+                self._sum /= 2
+
+    @property
+    def count(self) -> int:
+        """Recent sample count (decayed, so it falls back towards zero without new calls)"""
+        with self._lock:
+            self._decay()
+            return int(self._total)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th percentile (0-100) by interpolating inside the bucket; None when empty"""
+        with self._lock:
+            self._decay()
+            counts, total = list(self._counts), self._total
+        if total == 0:
+            return None
+        target = total * q / 100
+        seen = 0.0
+        for i, c in enumerate(counts):
+            if c and seen + c >= target:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1] * 1.5
+                return lower + (upper - lower) * (target - seen) / c
+            seen += c
+        return self.BOUNDS[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Count, mean and p50/p95/p99 in seconds, plus the raw bucket counts"""
+        with self._lock:
+            self._decay()
+            total, total_sum, counts = self._total, self._sum, list(self._counts)
+        return {
+            "count": int(total),
+            "mean_s": total_sum / total if total else None,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+            "p99_s": self.percentile(99),
+            "buckets": list(zip(self.BOUNDS + [float("inf")], counts)),
+        }
+
+
+def default_client_factory() -> genai.Client:
+    """Build the Gemini client from GEMINI_API_KEY (and optional GEMINI_BASE_URL)"""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        raise GatewayConfigError("Missing GEMINI_API_KEY environment variable.")
+    base_url = os.environ.get("GEMINI_BASE_URL")
+    http_options = types.HttpOptions(base_url=base_url) if base_url else None
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+class LLMGateway:
+    """
+    Shared gateway in front of the Gemini API
+
+    All work runs on the gateway's worker pool, so retry backoff never sleeps on
+    a Streamlit script thread; callers only wait on a future (or a chunk queue
+    when streaming) up to their deadline. Identical in-flight ``generate`` calls
+    are coalesced into a single upstream request. Successful upstream calls are
+    recorded in per-model latency histograms (full response for ``generate``,
+    first chunk for ``stream``), which the model router reads.
+    """
+
+    def __init__(self, client_factory: Callable[[], Any] = default_client_factory,
+                 max_concurrency: int = 4, rate_per_sec: float = 2.0, burst: int = 5,
+                 max_retries: int = 3, base_backoff: float = 1.0, max_backoff: float = 8.0,
+                 deadline: float = 60.0, breaker: Optional[CircuitBreaker] = None):
+        self._client_factory = client_factory
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._bucket = TokenBucket(rate_per_sec, burst)
+        self._breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency * 4, thread_name_prefix="llm-gateway")
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self._latency: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._latency_lock = threading.Lock()
+        self._stats = {"requests": 0, "coalesced": 0, "upstream_calls": 0, "retries": 0, "failures": 0, "shed": 0,
+                       "hedges": 0, "hedge_wins": 0}
+        self._stats_lock = threading.Lock()
+
+    # ---------- public interface ----------
+
+    @property
+    def client(self):
+        """The pooled Gemini client, created once per process"""
+        with self._client_lock:
+            if self._client is None:
+                self._client = self._client_factory()
+            return self._client
+
+    @property
+    def breaker_state(self) -> str:
+        return self._breaker.state
+
+    def generate(self, model: str, prompt: str, config: Optional[dict] = None,
+                 timeout: Optional[float] = None, hedge_after: Optional[float] = None) -> str:
+        """
+        Generate a full response, coalescing identical concurrent requests
+
+        Args:
+            model: Gemini model name
+            prompt: Prompt text
+            config: Optional generation config (e.g. {"temperature": 0.3})
+            timeout: Seconds to wait for the result (default: gateway deadline)
+            hedge_after: Send a duplicate request if no answer arrives within this
+                many seconds and use whichever finishes first (default: no hedging)
+
+        Returns:
+            str: Response text
+
+        Raises:
+            GatewayError: On configuration errors, open circuit or exhausted deadline
+            Exception: The last upstream error once retries are exhausted
+        """
+        client = self.client
+        deadline = time.monotonic() + (timeout or self.deadline)
+        key = self._request_key(model, prompt, config)
+        self._count("requests")
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if not leader:
+                self._count("coalesced")
+            else:
+                if hedge_after:
+                    future = self._submit_hedged(client, model, prompt, config, deadline, hedge_after)
+                else:
+                    future = self._executor.submit(self._generate_with_retries, client, model, prompt, config, deadline)
+                self._inflight[key] = future
+        if leader:
+            # Outside the lock: an already finished future runs _forget right here
+            future.add_done_callback(lambda _f, k=key: self._forget(k, _f))
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except TimeoutError:
+            raise DeadlineExceededError(f"No response from {model} within {timeout or self.deadline:.0f}s")
+
+    def stream(self, model: str, prompt: str, config: Optional[dict] = None,
+               timeout: Optional[float] = None) -> Iterator[str]:
+        """
+        Stream response chunks; failures before the first chunk are retried
+
+        The deadline bounds the wait for the first chunk and each gap between
+        chunks, not the whole stream, so a long answer that keeps producing
+        text is never cut off.
+
+        Args:
+            model: Gemini model name
+            prompt: Prompt text
+            config: Optional generation config (e.g. {"temperature": 0.3})
+            timeout: Seconds to wait for the first chunk and for each next one (default: gateway deadline)
+
+        Yields:
+            str: Response text chunks
+        """
+        client = self.client
+        wait = timeout or self.deadline
+        deadline = time.monotonic() + wait
+        self._count("requests")
+        chunks: "queue.Queue" = queue.Queue()
+        done = object()
+        self._executor.submit(self._stream_with_retries, client, model, prompt, config, deadline, chunks, done)
+        started = False
+        while True:
+            try:
+                item = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                waited_for = "next chunk" if started else "first chunk"
+                raise DeadlineExceededError(f"No {waited_for} from {model} within {wait:.0f}s")
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            started = True
+            yield item
+            deadline = time.monotonic() + wait
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for requests, coalesced duplicates, upstream calls, retries and failures"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["breaker_state"] = self.breaker_state
+        return stats
+
+    def latency_histogram(self, model: str, kind: str = "generate") -> LatencyHistogram:
+        """Latency histogram for a model; ``kind`` is "generate" (full response) or "first_chunk" (streaming)"""
+        with self._latency_lock:
+            histogram = self._latency.get((model, kind))
+            if histogram is None:
+                histogram = self._latency[(model, kind)] = LatencyHistogram()
+            return histogram
+
+    def latency_snapshot(self) -> List[Dict[str, Any]]:
+        """One row per (model, kind) with count, mean and p50/p95/p99 latency in seconds"""
+        with self._latency_lock:
+            items = sorted(self._latency.items())
+        return [dict(model=model, kind=kind, **histogram.snapshot()) for (model, kind), histogram in items]
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _request_key(model: str, prompt: str, config: Optional[dict]) -> str:
+        payload = json.dumps([model, prompt, config or {}], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._inflight_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def _submit_hedged(self, client, model: str, prompt: str, config: Optional[dict],
+                       deadline: float, hedge_after: float) -> Future:
+        """
+        Start the request, and a duplicate if the first has not answered after
+        ``hedge_after`` seconds; the returned future takes the first success (or
+        the last failure). The losing call is left to finish in the background.
+        """
+        result: Future = Future()
+        attempts: List[Future] = []
+        lock = threading.Lock()
+
+        def settle(attempt: Future) -> None:
+            with lock:
+                if result.done():
+                    return
+                if attempt.exception() is None:
+                    if attempt is not attempts[0]:
+                        self._count("hedge_wins")
+                    result.set_result(attempt.result())
+                elif all(a.done() for a in attempts):
+                    result.set_exception(attempt.exception())
+
+        def hedge() -> None:
+            with lock:
+                if attempts[0].done() or result.done() or time.monotonic() >= deadline:
+                    return
+                self._count("hedges")
+                attempt = self._executor.submit(self._generate_with_retries, client, model, prompt, config, deadline)
+                attempts.append(attempt)
+            attempt.add_done_callback(settle)
+
+        primary = self._executor.submit(self._generate_with_retries, client, model, prompt, config, deadline)
+        attempts.append(primary)
+        timer = threading.Timer(hedge_after, hedge)
+        timer.daemon = True
+        timer.start()
+
+        def primary_done(attempt: Future) -> None:
+            timer.cancel()
+            settle(attempt)
+
+        primary.add_done_callback(primary_done)
+        return result
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[name] += n
+
+    def _backoff(self, attempt: int, deadline: float) -> None:
+        """Full-jitter exponential backoff that refuses to sleep past the deadline"""
+        delay = random.uniform(0, min(self.max_backoff, self.base_backoff * 2 ** attempt))
+        if time.monotonic() + delay >= deadline:
+            raise DeadlineExceededError("Retry backoff would exceed the request deadline")
+        self._count("retries")
+        time.sleep(delay)
+
+    def _admit(self, deadline: float) -> None:
+        """Wait for a rate token and a concurrency slot, then pass the circuit breaker"""
+        if not self._bucket.acquire(deadline):
+            raise DeadlineExceededError("Rate limit wait would exceed the request deadline")
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise DeadlineExceededError("No free LLM slot before the request deadline")
+        if not self._breaker.allow():
+            self._slots.release()
+            self._count("shed")
+            raise CircuitOpenError("Gemini circuit breaker is open; try again shortly")
+
+    @staticmethod
+    def _generation_config(config: Optional[dict]):
+        return types.GenerateContentConfig(**config) if config else None
+
+    def _generate_with_retries(self, client, model: str, prompt: str, config: Optional[dict],
+                               deadline: float) -> str:
+        for attempt in range(self.max_retries):
+            self._admit(deadline)
+            try:
+                # The slot is held for the upstream call only, never across the retry backoff
+                try:
+                    self._count("upstream_calls")
+                    call_started = time.monotonic()
+                    response = client.models.generate_content(
+                        model=model, contents=prompt, config=self._generation_config(config)
+                    )
+                finally:
+                    self._slots.release()
+            except Exception as e:
+                self._breaker.record_failure()
+                self._count("failures")
+                record_span("llm.upstream", time.monotonic() - call_started, error=type(e).__name__,
+                            model=model, attempt=attempt, streamed=False)
+                if attempt == self.max_retries - 1:
+                    raise
+                self._backoff(attempt, deadline)
+                continue
+            self._breaker.record_success()
+            elapsed = time.monotonic() - call_started
+            self.latency_histogram(model).record(elapsed)
+            record_span("llm.upstream", elapsed, model=model, attempt=attempt, streamed=False)
+            return response.text
+
+    def _stream_with_retries(self, client, model: str, prompt: str, config: Optional[dict],
+                             deadline: float, chunks: "queue.Queue", done: object) -> None:
+        try:
+            for attempt in range(self.max_retries):
+                self._admit(deadline)
+                started = False
+                try:
+                    try:
+                        self._count("upstream_calls")
+                        call_started = time.monotonic()
+                        for chunk in client.models.generate_content_stream(
+                            model=model, contents=prompt, config=self._generation_config(config)
+                        ):
+                            if chunk.text:
+                                if not started:
+                                    self.latency_histogram(model, "first_chunk").record(time.monotonic() - call_started)
+                                started = True
+                                chunks.put(chunk.text)
+                    finally:
+                        self._slots.release()
+                except Exception as e:
+                    self._breaker.record_failure()
+                    self._count("failures")
+                    record_span("llm.upstream", time.monotonic() - call_started, error=type(e).__name__,
+                                model=model, attempt=attempt, streamed=True)
+                    if started or attempt == self.max_retries - 1:
+                        raise
+                    self._backoff(attempt, deadline)
+                    continue
+                self._breaker.record_success()
+                record_span("llm.upstream", time.monotonic() - call_started, model=model, attempt=attempt, streamed=True)
+                return
+        except BaseException as e:
+            chunks.put(e)
+        finally:
+            chunks.put(done)
+
+_gateway: Optional[LLMGateway] = None
+_gateway_lock = threading.Lock()
+
+
+def get_llm_gateway() -> LLMGateway:
+    """Return the process-wide LLM gateway"""
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            _gateway = LLMGateway(
+                max_concurrency=int(os.environ.get("LR_LLM_MAX_CONCURRENCY", 4)),
+                rate_per_sec=float(os.environ.get("LR_LLM_RATE_PER_SEC", 2.0)),
+                burst=int(os.environ.get("LR_LLM_BURST", 5)),
+            )
+        return _gateway
@@ -0,0 +1,146 @@
+"""
+Model Router for Smart Liquidity Monitor
+Picks a Gemini model tier per call from the feature, the prompt size and the
+per-model latency histograms kept by the LLM gateway, and sets the hedge delay
+"""
+
+import os
+import random
+import threading
+from typing import Dict, List, Optional
+
+from context_builder import estimate_tokens
+from llm_gateway import LLMGateway, get_llm_gateway
+
+TIER_ORDER: List[str] = ["lite", "standard", "deep"]
+
+MODEL_TIERS: Dict[str, str] = {
+    "lite": os.environ.get("LR_LLM_MODEL_LITE", "gemini-2.5-flash-lite"),
+    "standard": os.environ.get("LR_LLM_MODEL_STANDARD", "gemini-2.5-flash"),
+    "deep": os.environ.get("LR_LLM_MODEL_DEEP", "gemini-2.5-pro"),
+}
+
+# Largest prompt (estimated tokens) each tier is trusted with before moving up a tier
+TIER_MAX_PROMPT_TOKENS: Dict[str, Optional[int]] = {"lite": 4000, "standard": 32000, "deep": None}
+
+# Default tier and p95 latency budget (seconds) per feature
+FEATURE_TIERS: Dict[str, str] = {
+    "filter": "lite",
+    "scoring": "lite",
+    "summary": "standard",
+    "agent": "standard",
+    "general": "standard",
+    # Prompts over the standard limit still move AquaMind up to deep; LR_LLM_AQUAMIND_TIER=deep opts in always
+    "aquamind": os.environ.get("LR_LLM_AQUAMIND_TIER", "standard"),
+}
+LATENCY_BUDGETS: Dict[str, float] = {
+    "filter": 5.0,
+    "scoring": 20.0,
+    "summary": 15.0,
+    "agent": 15.0,
+    "general": 20.0,
+    "aquamind": 45.0,
+}
+
+
+class Route:
+    """The routing decision for one call"""
+
+    def __init__(self, feature: str, tier: str, model: str, hedge_after: Optional[float], reason: str):
+        self.feature = feature
+        self.tier = tier
+        self.model = model
+        self.hedge_after = hedge_after
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return f"Route({self.feature} -> {self.model}, hedge_after={self.hedge_after}, {self.reason})"
+
+
+class ModelRouter:
+    """
+    Latency-aware model router
+
+    The feature picks the starting tier and a prompt too large for it moves the
+    call up. Once a model has ``min_samples`` recorded calls, a p95 above the
+    feature's latency budget steps the call down to the next faster tier that
+    is still within budget (or has no data yet). Full responses are hedged
+    after the chosen model's p95.
+
+    A demoted model would otherwise get no new samples and stay demoted, so a
+    ``probe_share`` of its calls still goes to it, and the gateway's histograms
+    decay over time; once its recent p95 is back within budget (or it has too
+    few recent samples to judge) the feature returns to its default tier.
+
+    Args:
+        gateway: Gateway whose latency histograms drive routing (default: process-wide gateway)
+        min_samples: Calls per model before its percentiles are trusted (default: 20)
+        min_hedge_delay: Lower bound on the hedge delay in seconds (default: 0.5)
+        probe_share: Share of a demoted feature's calls sent to its slow model (default: 0.05)
+    """
+
+    def __init__(self, gateway: Optional[LLMGateway] = None, min_samples: int = 20, min_hedge_delay: float = 0.5,
+                 probe_share: float = float(os.environ.get("LR_LLM_PROBE_SHARE", 0.05))):
+        self.gateway = gateway
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.probe_share = probe_share
+
+    def _p95(self, model: str, kind: str = "generate") -> Optional[float]:
+        histogram = (self.gateway or get_llm_gateway()).latency_histogram(model, kind)
+        return histogram.percentile(95) if histogram.count >= self.min_samples else None
+
+    def route(self, prompt: str, feature: str = "general", streaming: bool = False, probe: bool = True) -> Route:
+        """
+        Choose the model and hedge delay for a call
+
+        Args:
+            prompt: Prompt text (sized with context_builder.estimate_tokens)
+            feature: Calling feature, a key of FEATURE_TIERS (default: "general")
+            streaming: Route on time-to-first-chunk and skip hedging (default: False)
+            probe: Allow sending this call to a demoted model as a latency probe
+                (default: True; pass False to only inspect the current route)
+
+        Returns:
+            Route: Chosen tier, model, hedge delay (None = no hedge) and a short reason
+        """
+        feature = feature if feature in FEATURE_TIERS else "general"
+        kind = "first_chunk" if streaming else "generate"
+        budget = LATENCY_BUDGETS[feature]
+        tokens = estimate_tokens(prompt)
+
+        index = TIER_ORDER.index(FEATURE_TIERS[feature])
+        reason = "feature default"
+        while TIER_MAX_PROMPT_TOKENS[TIER_ORDER[index]] is not None and tokens > TIER_MAX_PROMPT_TOKENS[TIER_ORDER[index]]:
+            index += 1
+            reason = f"prompt ~{tokens} tokens"
+
+        p95 = self._p95(MODEL_TIERS[TIER_ORDER[index]], kind)
+        if p95 is not None and p95 > budget and index > 0:
+            faster = TIER_ORDER[index - 1]
+            limit = TIER_MAX_PROMPT_TOKENS[faster]
+            faster_p95 = self._p95(MODEL_TIERS[faster], kind)
+            if (limit is None or tokens <= limit) and (faster_p95 is None or faster_p95 <= budget):
+                if probe and random.random() < self.probe_share:
+                    reason = f"latency probe ({MODEL_TIERS[TIER_ORDER[index]]} p95 {p95:.1f}s over {budget:.0f}s budget)"
+                else:
+                    reason = f"{MODEL_TIERS[TIER_ORDER[index]]} p95 {p95:.1f}s over {budget:.0f}s budget"
+                    index -= 1
+                    p95 = faster_p95
+
+        tier = TIER_ORDER[index]
+        hedge_after = None if streaming or p95 is None else max(self.min_hedge_delay, p95)
+        return Route(feature, tier, MODEL_TIERS[tier], hedge_after, reason)
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide model router (reads the process-wide gateway's histograms)"""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
@@ -0,0 +1,156 @@
+"""
+Stub Gemini Server for Smart Liquidity Monitor
+Local HTTP server speaking the Gemini generateContent REST API, with injectable latency and errors
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:<port>/ (any GEMINI_API_KEY works):
+
+    python llm_stub.py --port 8765 --latency 0.5 --error-rate 0.2
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+_PATH_RE = re.compile(r"^/[^/]+/models/(?P<model>[^:/]+):(?P<method>generateContent|streamGenerateContent)")
+
+
+def _default_responder(model: str, prompt: str) -> str:
+    return f"[stub:{model}] received {len(prompt)} characters of prompt."
+
+
+class StubGeminiServer:
+    """
+    Threaded stub of the Gemini REST endpoints
+
+    Args:
+        host: Interface to bind (default: 127.0.0.1)
+        port: Port to bind, 0 picks a free port (default: 0)
+        latency: Seconds to wait before answering (default: 0.0)
+        jitter: Extra uniform random latency in seconds (default: 0.0)
+        error_rate: Probability of answering with HTTP 503 (default: 0.0)
+        chunk_delay: Seconds between streamed chunks (default: 0.0)
+        responder: Callable(model, prompt) -> response text
+        seed: Random seed so injected failures are reproducible
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, chunk_delay: float = 0.0,
+                 responder: Optional[Callable[[str, str], str]] = None, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.chunk_delay = chunk_delay
+        self.responder = responder or _default_responder
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "StubGeminiServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-gemini", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StubGeminiServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _should_fail(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        time.sleep(delay)
+        return fail
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload: dict) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                match = _PATH_RE.match(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not match:
+                    self._send_json(404, {"error": {"code": 404, "message": "not found", "status": "NOT_FOUND"}})
+                    return
+                if server._should_fail():
+                    self._send_json(503, {"error": {"code": 503, "message": "injected failure", "status": "UNAVAILABLE"}})
+                    return
+
+                prompt = "".join(
+                    part.get("text", "")
+                    for content in request.get("contents", [])
+                    for part in content.get("parts", [])
+                )
+                text = server.responder(match.group("model"), prompt)
+                if match.group("method") == "generateContent":
+                    self._send_json(200, _candidate(text))
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.end_headers()
+                words = text.split(" ")
+                for i, word in enumerate(words):
+                    piece = word if i == len(words) - 1 else word + " "
+                    self.wfile.write(f"data: {json.dumps(_candidate(piece))}\r\n\r\n".encode("utf-8"))
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+
+        return Handler
+
+
+def _candidate(text: str) -> dict:
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local stub Gemini server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubGeminiServer(args.host, args.port, args.latency, args.jitter, args.error_rate, args.chunk_delay)
+    print(f"Stub Gemini server listening on {stub.base_url}")
+    try:
+        stub._httpd.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,325 @@
+"""
+Member Retrieval Index for Smart Liquidity Monitor
+In-process lookup of the members relevant to a question: exact and fuzzy name
+matching, numeric-range predicates and TF-IDF over text fields
+"""
+
+import re
+import math
+import difflib
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from top_risk import top_risk_members
+
+TEXT_FIELDS: List[str] = ["name", "risk_level", "Risk Insights"]
+
+# Phrases users write for each numeric column, longest first so "credit headroom" wins over "headroom"
+NUMERIC_ALIASES: List[Tuple[str, str]] = [
+    ("credit headroom", "credit_headroom_usd"),
+    ("cash buffer", "cash_buffer_usd"),
+    ("risk ratio", "risk_ratio"),
+    ("headroom", "credit_headroom_usd"),
+    ("exposure", "exposure_usd"),
+    ("buffer", "cash_buffer_usd"),
+    ("ratio", "risk_ratio"),
+    ("cash", "cash_buffer_usd"),
+]
+
+_NUMBER = r"\$?(\d+(?:[.,]\d+)*)\s*(k|m|mm|b|bn|million|billion|thousand)?\b"
+_OPERATORS = [
+    (r"between\s+" + _NUMBER + r"\s+and\s+" + _NUMBER, "between"),
+    (r"(?:>=|at least|no less than)\s*" + _NUMBER, ">="),
+    (r"(?:<=|at most|no more than)\s*" + _NUMBER, "<="),
+    (r"(?:>|above|over|greater than|more than|exceeding)\s*" + _NUMBER, ">"),
+    (r"(?:<|below|under|less than|lower than)\s*" + _NUMBER, "<"),
+]
+_SCALE = {"k": 1e3, "thousand": 1e3, "m": 1e6, "mm": 1e6, "million": 1e6, "b": 1e9, "bn": 1e9, "billion": 1e9}
+_LEVEL_WORDS = {"high": "HIGH", "medium": "MEDIUM", "moderate": "MEDIUM", "low": "LOW"}
+_STOPWORDS = {
+    "the", "a", "an", "of", "for", "to", "in", "on", "and", "or", "is", "are", "which", "what", "who",
+    "members", "member", "with", "their", "its", "be", "will", "likely", "next", "quarter", "show", "me",
+    "how", "about", "does", "do", "has", "have", "by", "at", "than", "risk", "risky", "riskiest", "most",
+}
+# Name tokens shared by more than this share of members ("member", "capital") say nothing on their own
+COMMON_NAME_SHARE = 0.05
+
+
+def _tokenize(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9]+", str(text).lower())
+
+
+def _parse_number(digits: str, unit: Optional[str]) -> float:
+    return float(digits.replace(",", "")) * _SCALE.get((unit or "").lower(), 1.0)
+
+
+def parse_predicates(query: str) -> List[Tuple[str, str, Tuple[float, ...]]]:
+    """
+    Extract numeric-range predicates such as "cash buffer below 5m" or "risk ratio between 1 and 2"
+
+    Args:
+        query: Natural-language question
+
+    Returns:
+        list: (column, operator, values) tuples
+    """
+    text = query.lower()
+    predicates = []
+    for alias, column in NUMERIC_ALIASES:
+        for match in re.finditer(r"\b" + re.escape(alias) + r"\b", text):
+            tail = text[match.end():match.end() + 60]
+            for pattern, op in _OPERATORS:
+                found = re.match(r"\s*(?:is\s+|of\s+)?" + pattern, tail)
+                if not found:
+                    continue
+                groups = found.groups()
+                if op == "between":
+                    values = (_parse_number(groups[0], groups[1]), _parse_number(groups[2], groups[3]))
+                else:
+                    values = (_parse_number(groups[0], groups[1]),)
+                predicates.append((column, op, values))
+                break
+        # Blank out the matched alias so "buffer" does not re-match inside "cash buffer"
+        text = re.sub(r"\b" + re.escape(alias) + r"\b", " " * len(alias), text)
+    return predicates
+
+
+class MemberIndex:
+    """
+    Incrementally maintained retrieval index over the member book
+
+    ``refresh`` diffs a new snapshot against the indexed one by per-row hash
+    and re-indexes only added, changed or removed members. ``search`` returns a
+    fixed number of relevant rows for a question.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version: Optional[str] = None
+        self._frame = pd.DataFrame()
+        self._row_hash: Dict[object, int] = {}
+        self._doc_tokens: Dict[object, Counter] = {}
+        self._postings: Dict[str, Dict[object, int]] = defaultdict(dict)
+        self._names: Dict[str, Set[object]] = defaultdict(set)
+        self._name_postings: Dict[str, Set[object]] = defaultdict(set)
+        self._vocab_by_initial: Dict[str, Set[str]] = defaultdict(set)
+
+    # ---------- maintenance ----------
+
+    def refresh(self, df: pd.DataFrame, version: Optional[str] = None) -> int:
+        """
+        Bring the index up to date with a snapshot
+
+        Args:
+            df: DataFrame with member data and risk metrics
+            version: Snapshot version; an unchanged version is a no-op
+
+        Returns:
+            int: Number of members (re)indexed or removed
+        """
+        with self._lock:
+            if version is not None and version == self.version:
+                return 0
+            keys = df["member_id"] if "member_id" in df.columns else pd.Series(df.index, index=df.index)
+            frame = df.set_index(keys.to_numpy(), drop=False)
+            frame = frame[~frame.index.duplicated(keep="last")]
+            hashes = dict(zip(frame.index, pd.util.hash_pandas_object(frame, index=False).to_numpy().tolist()))
+
+            removed = set(self._row_hash) - set(hashes)
+            changed = [key for key, h in hashes.items() if self._row_hash.get(key) != h]
+            for key in removed:
+                self._unindex(key)
+            subset = frame.loc[changed]
+            fields = [subset[c].astype(str) for c in TEXT_FIELDS if c in subset.columns]
+            texts = fields[0].str.cat(fields[1:], sep=" ").tolist() if fields else [""] * len(changed)
+            names = subset["name"].astype(str).tolist() if "name" in subset.columns else [""] * len(changed)
+            for key, text, name in zip(changed, texts, names):
+                self._unindex(key)
+                self._index(key, text, name)
+
+            self._row_hash = hashes
+            self._frame = frame
+            self.version = version
+            return len(removed) + len(changed)
+
+    def _index(self, key, text: str, name: str) -> None:
+        tokens = Counter(_tokenize(text))
+        self._doc_tokens[key] = tokens
+        for token, tf in tokens.items():
+            self._postings[token][key] = tf
+            self._vocab_by_initial[token[0]].add(token)
+        if name:
+            name_tokens = _tokenize(name)
+            self._names[" ".join(name_tokens)].add(key)
+            for token in name_tokens:
+                self._name_postings[token].add(key)
+
+    def _unindex(self, key) -> None:
+        tokens = self._doc_tokens.pop(key, None)
+        if not tokens:
+            return
+        for token in tokens:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[token]
+                    self._vocab_by_initial[token[0]].discard(token)
+        if "name" in self._frame.columns and key in self._frame.index:
+            name_tokens = _tokenize(self._frame.at[key, "name"])
+            self._names.get(" ".join(name_tokens), set()).discard(key)
+            for token in name_tokens:
+                keys = self._name_postings.get(token)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._name_postings[token]
+
+    # ---------- lookups ----------
+
+    def _exact_names(self, words: List[str]) -> List[object]:
+        exact: List[object] = []
+        for size in range(min(6, len(words)), 0, -1):
+            for start in range(len(words) - size + 1):
+                exact.extend(self._names.get(" ".join(words[start:start + size]), ()))
+        return list(dict.fromkeys(exact))
+
+    def match_names(self, query: str, cutoff: float = 0.85) -> List[object]:
+        """
+        Members whose full name appears in the query, or whose name tokens fuzzily match it
+
+        Misspelled words are corrected to their closest name token and the full
+        names are looked up again, so "membr 4242" finds "Member 4242". Otherwise
+        fuzzy hits are weighted by IDF, and tokens shared by more than
+        COMMON_NAME_SHARE of the members are ignored.
+        """
+        words = _tokenize(query)
+        exact = self._exact_names(words)
+        if exact:
+            return exact
+
+        n_names = max(1, len(self._doc_tokens))
+        corrected = list(words)
+        fuzzy: Counter = Counter()
+        for i, word in enumerate(words):
+            if word in _STOPWORDS or word in _LEVEL_WORDS or len(word) < 4 or word.isdigit():
+                continue
+            # Only compare against tokens sharing the first letter to keep lookups fast on big books
+            vocabulary = [t for t in self._vocab_by_initial.get(word[0], ())
+                          if abs(len(t) - len(word)) <= 2 and t in self._name_postings]
+            matches = [t for t in difflib.get_close_matches(word, vocabulary, n=3, cutoff=cutoff) if t != word]
+            if not matches:
+                continue
+            if word not in self._name_postings:
+                corrected[i] = matches[0]
+            for token in matches:
+                keys = self._name_postings[token]
+                if len(keys) > COMMON_NAME_SHARE * n_names:
+                    continue
+                idf = math.log((n_names + 1) / (len(keys) + 1)) + 1
+                for key in keys:
+                    fuzzy[key] += idf
+        if corrected != words:
+            exact = self._exact_names(corrected)
+            if exact:
+                return exact
+        return [key for key, _ in fuzzy.most_common()]
+
+    def _tfidf_scores(self, tokens: List[str]) -> Counter:
+        n_docs = max(1, len(self._doc_tokens))
+        scores: Counter = Counter()
+        for token in tokens:
+            posting = self._postings.get(token)
+            if not posting:
+                continue
+            idf = math.log((n_docs + 1) / (len(posting) + 1)) + 1
+            for key, tf in posting.items():
+                scores[key] += (1 + math.log(tf)) * idf
+        return scores
+
+    def search(self, query: str, k: int = 5) -> pd.DataFrame:
+        """
+        Return the k members most relevant to a question
+
+        Named members come first; numeric predicates and risk-level words
+        restrict the candidates, named members included; TF-IDF ranks text matches; remaining slots are
+        filled with the riskiest candidates by risk_ratio.
+
+        Args:
+            query: Natural-language question
+            k: Number of rows to return (default: 5)
+
+        Returns:
+            DataFrame: Up to k member rows
+        """
+        with self._lock:
+            frame = self._frame
+            if frame.empty:
+                return frame
+
+            mask = np.ones(len(frame), dtype=bool)
+            predicates = parse_predicates(query)
+            for column, op, values in predicates:
+                if column not in frame.columns:
+                    continue
+                col = frame[column].to_numpy(dtype=float)
+                if op == "between":
+                    lo, hi = sorted(values)
+                    mask &= (col >= lo) & (col <= hi)
+                elif op == ">":
+                    mask &= col > values[0]
+                elif op == ">=":
+                    mask &= col >= values[0]
+                elif op == "<":
+                    mask &= col < values[0]
+                else:
+                    mask &= col <= values[0]
+
+            words = _tokenize(query)
+            levels = {_LEVEL_WORDS[w] for w in words if w in _LEVEL_WORDS}
+            if levels and "risk_level" in frame.columns:
+                mask &= frame["risk_level"].isin(levels).to_numpy()
+            candidates = frame.index[mask]
+
+            ranked: List[object] = self.match_names(query)
+            content = [w for w in words if w not in _STOPWORDS and w not in _LEVEL_WORDS and not w.isdigit()]
+            scores = self._tfidf_scores(content)
+            if len(candidates) < len(frame):
+                allowed = set(candidates)
+                ranked = [key for key in ranked if key in allowed]
+                scores = Counter({key: s for key, s in scores.items() if key in allowed})
+            ranked.extend(key for key, _ in scores.most_common(k))
+            ranked = list(dict.fromkeys(ranked))[:k]
+
+            if len(ranked) < k and "risk_ratio" in frame.columns and len(candidates):
+                wanted = k + len(ranked)
+                if not predicates and (not levels or "risk_level" in frame.columns):
+                    # Candidates are the whole book or whole levels: per-level top lists answer in O(k)
+                    tops = ([top_risk_members(frame, wanted, level) for level in sorted(levels)] if levels
+                            else [top_risk_members(frame, wanted)])
+                    riskiest = pd.concat(tops)["risk_ratio"].sort_values(ascending=False, kind="stable").index[:wanted]
+                else:
+                    riskiest = frame.loc[candidates, "risk_ratio"].nlargest(wanted).index
+                ranked = list(dict.fromkeys(ranked + list(riskiest)))[:k]
+            return frame.loc[ranked]
+
+
+_index: Optional[MemberIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_member_index(df: pd.DataFrame) -> MemberIndex:
+    """Return the process-wide member index, refreshed to the given snapshot"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MemberIndex()
+    version = df.attrs.get("snapshot_version")
+    if version is not None and "risk_thresholds" in df.attrs:
+        version = f"{version}:{df.attrs['risk_thresholds']}"  # risk_level text changes with the thresholds
+    _index.refresh(df, version)
+    return _index
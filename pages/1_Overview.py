@@ -1,9 +1,14 @@
 
 import streamlit as st, os
 from data import fetch_member_data, calculate_risk_metrics
-from visualizations import create_liquidity_forecast
+from risk_index import get_risk_index
+from visualizations import render_liquidity_forecast
 from redis_cache import get_pref
+from job_queue import get_job_queue
+from ui_helpers import paginated_table, wait_for_job
+from profiler import profile_page_run
 st.set_page_config(layout="wide")
+profile_page_run()
 # Background and Lottie header
 css_path = os.path.join(os.path.dirname(__file__), "..", "assets", "style.css")
 if os.path.exists(css_path):
@@ -30,7 +35,8 @@ display_limit = get_pref('display_limit', 50)
 st.subheader("📈 Key Metrics")
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Total Members", len(df))
-col2.metric("High Risk", int((df['risk_level']=='HIGH').sum() if 'risk_level' in df.columns else 0))
+risk_index = get_risk_index(df)
+col2.metric("High Risk", risk_index.counts()['HIGH'] if risk_index is not None else int((df['risk_level']=='HIGH').sum()))
 col3.metric("Avg Risk Ratio", f"{df['risk_ratio'].mean():.2f}" if 'risk_ratio' in df.columns else "N/A")
 col4.metric("Updated At", str(df['updated_at'].max()) if 'updated_at' in df.columns else "N/A")
 
@@ -49,7 +55,7 @@ if 'name' in cols and 'Risk Insights' in cols:
     df_display = df[cols]
 else:
     df_display = df
-st.dataframe(df_display.head(display_limit), width='stretch')
+paginated_table(df_display, key='overview_members', page_size=display_limit)
 
 st.markdown("---")
 
@@ -78,10 +84,29 @@ if st.checkbox("Show Liquidity Forecast", value=False, key="show_forecast_sectio
         col2.metric("Current Credit Headroom", f"${selected_member_data['credit_headroom_usd']:,.0f}")
         col3.metric("Current Risk Ratio", f"{selected_member_data.get('risk_ratio', 0):.2f}")
         
-        # Generate and display forecast
-        with st.spinner("Generating ARIMA forecast..."):
-            fig = create_liquidity_forecast(selected_member_data, selected_member_name)
-            st.pyplot(fig)
+        # Fit the forecast on the background worker pool when the selected member changes; a finished,
+        # failed or cancelled job is left alone until then (or until "Run forecast again")
+        job_queue = get_job_queue()
+        if (st.session_state.get('forecast_job_member') != selected_member_name
+                or job_queue.get(st.session_state.get('forecast_job')) is None):
+            st.session_state['forecast_job_member'] = selected_member_name
+            st.session_state['forecast_job'] = job_queue.submit(
+                render_liquidity_forecast, selected_member_data, selected_member_name
+            )
+        forecast_job = wait_for_job('forecast_job', "Generating ARIMA forecast...")
+        if forecast_job is not None:
+            if forecast_job.status == 'done':
+                st.image(forecast_job.result, width='stretch')
+            else:
+                if forecast_job.status == 'failed':
+                    st.error(f"❌ Error generating forecast: {forecast_job.error}")
+                else:
+                    st.info("Forecast cancelled.")
+                if st.button("Run forecast again", key='forecast_retry'):
+                    st.session_state['forecast_job'] = job_queue.submit(
+                        render_liquidity_forecast, selected_member_data, selected_member_name
+                    )
+                    st.rerun()
         
         # Model Information (displayed directly without expander)
         st.caption("ℹ️ **About ARIMA Forecasting:** AutoRegressive Integrated Moving Average (2,1,1) model using 12 months of historical patterns to forecast 3 months ahead.")
@@ -2,10 +2,14 @@
 import streamlit as st
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import LogisticRegression
-from data import fetch_member_data, calculate_risk_metrics, color_risk
+from data import fetch_member_data, calculate_risk_metrics
+from risk_model import get_risk_model
+from risk_index import get_risk_index
+from ui_helpers import paginated_table
+from profiler import profile_page_run
 
 st.set_page_config(layout='wide')
+profile_page_run()
 st.title('Risk Analysis')
 st.markdown('Detailed table, heatmap and filters')
 
@@ -15,14 +19,23 @@ if df is None or df.empty:
     st.stop()
 df = calculate_risk_metrics(df)
 
-with st.expander('Filters'):
-    min_ratio = st.slider('Minimum risk ratio', 0.0, 10.0, 0.0)
-    show_level = st.multiselect('Show risk levels', ['LOW','MEDIUM','HIGH'], default=['HIGH','MEDIUM','LOW'])
+@st.fragment
+def member_filters(df: pd.DataFrame) -> None:
+    """Filters and the paged member table; moving a slider or paging reruns only this block"""
+    with st.expander('Filters'):
+        min_ratio = st.slider('Minimum risk ratio', 0.0, 10.0, 0.0)
+        show_level = st.multiselect('Show risk levels', ['LOW','MEDIUM','HIGH'], default=['HIGH','MEDIUM','LOW'])
 
-filtered = df[df['risk_ratio'] >= min_ratio] if 'risk_ratio' in df.columns else df
-filtered = filtered[filtered.get('risk_level', []).isin(show_level)] if 'risk_level' in filtered.columns else filtered
+    # Filters resolve as ranges of the snapshot's sorted risk-ratio index; only the visible page is sent
+    risk_index = get_risk_index(df)
+    if risk_index is not None:
+        matches = risk_index.filter(min_ratio, show_level, *df.attrs['risk_thresholds'])
+    else:
+        matches = np.flatnonzero(((df['risk_ratio'] >= min_ratio) & df['risk_level'].isin(show_level)).to_numpy())
 
-st.dataframe(filtered.style.map(color_risk, subset=['risk_level']) if 'risk_level' in filtered.columns else filtered, width='stretch')
+    paginated_table(df, key='risk_members', rows=matches, page_size=100)
+
+member_filters(df)
 
 # ===============================
 #  🧠 PREDICTIVE EARLY WARNING SYSTEM (Using scikit-learn)
@@ -32,71 +45,71 @@ st.subheader("🧠 Predictive Early Warning System")
 
 st.markdown("""
 This machine learning model predicts future liquidity risk based on historical patterns.
-The model is trained on historical data and provides probability scores for each member.
+The model learns incrementally from each data snapshot and provides probability scores for each member.
 """)
 
+PREDICTION_LABELS = ['✅ Stable', '⚠️ Possible Medium Risk', '🚨 Likely High Risk']
+
+@st.fragment
+def prediction_results(df: pd.DataFrame, model) -> None:
+    """Paged ML predictions, probability histogram and label counts; paging reruns only this block"""
+    try:
+        # Make Predictions on Current Data
+        X_current = df[['cash_buffer_usd', 'credit_headroom_usd']]
+        predicted_probabilities = model.predict_proba(X_current)
+
+        # Find the index for the 'HIGH' risk class
+        high_risk_index = np.where(model.classes_ == 'HIGH')[0][0]
+        probability = predicted_probabilities[:, high_risk_index]
+
+        # Label by probability: > 0.7 likely high, > 0.4 possible medium, otherwise stable
+        codes = (probability > 0.4).astype(np.int8) + (probability > 0.7)
+        predictions = pd.DataFrame({
+            'name': df['name'].to_numpy(),
+            'Predicted_Risk_Label': pd.Categorical.from_codes(codes, PREDICTION_LABELS),
+            'cash_buffer_usd': df['cash_buffer_usd'].to_numpy(),
+            'credit_headroom_usd': df['credit_headroom_usd'].to_numpy(),
+            'Predicted_Risk_Probability': probability,
+        })
+        if df.attrs.get('snapshot_version') is not None:
+            # Sort orders are cached per version, and the probabilities change with the model
+            predictions.attrs['snapshot_version'] = f"{df.attrs['snapshot_version']}:model-{model.version}"
+
+        # Display the Results (most likely high risk first, one page at a time)
+        st.markdown("#### 📊 ML Prediction Results")
+        paginated_table(predictions, key='risk_predictions', page_size=50, default_sort='Predicted_Risk_Probability')
+
+        # Visualization: members per probability bucket, not one bar per member
+        st.markdown("#### 📈 Risk Probability Distribution")
+        counts, edges = np.histogram(probability, bins=20, range=(0.0, 1.0))
+        st.bar_chart(pd.Series(counts, index=[f"{lo:.2f}–{hi:.2f}" for lo, hi in zip(edges[:-1], edges[1:])],
+                               name='Members'))
+
+        # Summary Statistics
+        col1, col2, col3 = st.columns(3)
+        stable_count, medium_risk_count, high_risk_count = np.bincount(codes, minlength=3)
+        
+        col1.metric("🚨 Likely High Risk", int(high_risk_count))
+        col2.metric("⚠️ Possible Medium Risk", int(medium_risk_count))
+        col3.metric("✅ Stable", int(stable_count))
+    except Exception as e:
+        st.error(f"❌ Error running predictive model: {e}")
+
 try:
-    # Simulate Historical Data for Training
-    np.random.seed(42)
-    historical_size = 500
-    historical_cash = np.random.uniform(1_000_000, 50_000_000, historical_size)
-    historical_credit = np.random.uniform(5_000_000, 100_000_000, historical_size)
-    historical_risk_ratio = historical_credit / historical_cash
-    historical_risk_level = pd.Series(historical_risk_ratio).apply(
-        lambda x: 'HIGH' if x > 2 else 'MEDIUM' if x > 1 else 'LOW'
-    )
-    X_train = pd.DataFrame({
-        'cash_buffer_usd': historical_cash,
-        'credit_headroom_usd': historical_credit
-    })
-    y_train = historical_risk_level
-
-    # Train the Classification Model
-    model = LogisticRegression(max_iter=1000)
-    model.fit(X_train, y_train)
-
-    # Make Predictions on Current Data
-    X_current = df[['cash_buffer_usd', 'credit_headroom_usd']]
-    predicted_probabilities = model.predict_proba(X_current)
-
-    # Find the index for the 'HIGH' risk class
-    high_risk_index = np.where(model.classes_ == 'HIGH')[0][0]
-    df['Predicted_Risk_Probability'] = predicted_probabilities[:, high_risk_index]
-
-    # Create a more meaningful label based on the probability
-    df['Predicted_Risk_Label'] = df['Predicted_Risk_Probability'].apply(
-        lambda x: '🚨 Likely High Risk' if x > 0.7 else '⚠️ Possible Medium Risk' if x > 0.4 else '✅ Stable'
-    )
-
-    # Display the Results
-    st.markdown("#### 📊 ML Prediction Results")
-    st.dataframe(
-        df[['name', 'Predicted_Risk_Label', 'cash_buffer_usd', 'credit_headroom_usd', 'Predicted_Risk_Probability']],
-        width='stretch'
-    )
-
-    # Visualization
-    st.markdown("#### 📈 Risk Probability Distribution")
-    st.bar_chart(df.set_index('name')['Predicted_Risk_Probability'])
-
-    # Summary Statistics
-    col1, col2, col3 = st.columns(3)
-    high_risk_count = len(df[df['Predicted_Risk_Label'] == '🚨 Likely High Risk'])
-    medium_risk_count = len(df[df['Predicted_Risk_Label'] == '⚠️ Possible Medium Risk'])
-    stable_count = len(df[df['Predicted_Risk_Label'] == '✅ Stable'])
-    
-    col1.metric("🚨 Likely High Risk", high_risk_count)
-    col2.metric("⚠️ Possible Medium Risk", medium_risk_count)
-    col3.metric("✅ Stable", stable_count)
+    # Online model: predictions come from the last published version while
+    # this snapshot is learned on a background thread (never blocks the page)
+    model = get_risk_model()
+    model.submit_batch(df)
+    prediction_results(df, model)
 
     # Model Information
     with st.expander("ℹ️ Model Information"):
         st.markdown(f"""
-        **Model Type:** Logistic Regression
-        **Training Data:** {historical_size} simulated historical records
+        **Model Type:** Online Logistic Regression (SGD, partial_fit)
+        **Training Data:** {model.samples_seen} records across {model.version} snapshot updates
         **Features Used:** Cash Buffer (USD), Credit Headroom (USD)
         **Risk Classes:** {', '.join(model.classes_)}
-        **Model Accuracy:** Trained on historical liquidity patterns
+        **Validation Accuracy:** {f"{model.validation_score:.1%}" if model.validation_score is not None else "N/A"} ({model.rollbacks} updates rolled back)
         
         **Interpretation:**
         - **Probability > 0.7:** Likely High Risk - Immediate attention required
@@ -1,9 +1,22 @@
 
 import streamlit as st
-from data import fetch_member_data, calculate_risk_metrics
-from ai_utils import run_liquidity_agent, get_ai_response_with_retry
+import pandas as pd
+from data import fetch_member_data, calculate_risk_metrics, get_frame_version, get_snapshot_version
+from ai_utils import run_liquidity_agent, stream_ai_response, get_ai_call_stats
 from prompts import get_ai_summary_prompt
+from context_builder import build_portfolio_context
+from llm_cache import get_response_cache
+from llm_gateway import get_llm_gateway
+from llm_router import FEATURE_TIERS, LATENCY_BUDGETS, get_model_router
+from query_engine import get_query_engine, QueryEngineError
+from ai_scoring import score_members
+from job_queue import get_job_queue
+from ui_helpers import wait_for_job
+from top_risk import top_risk_members
+from visualizations import create_confidence_heatmap
+from profiler import profile_page_run
 st.set_page_config(layout='wide')
+profile_page_run()
 st.title('AI Insights')
 
 df = fetch_member_data()
@@ -15,19 +28,90 @@ df = calculate_risk_metrics(df)
 st.subheader('AI Summary (Quick)')
 if st.button('Generate AI Summary'):
     st.info('Calling AI model...')
-    df_string = df.head(50).to_csv(index=False)
-    prompt = get_ai_summary_prompt(df_string)
-    resp = get_ai_response_with_retry(prompt)
-    st.code(resp or 'No response from AI.')
+    prompt = get_ai_summary_prompt(build_portfolio_context(df))
+    resp = st.write_stream(stream_ai_response(prompt, data_version=get_snapshot_version(df), feature='summary'))
+    if not resp:
+        st.code('No response from AI.')
 
 st.markdown('---')
 st.subheader('Liquidity Advisor (Ask a question)')
 query = st.text_input('Ask the Liquidity Advisor', value='Which members are likely to be high risk next quarter?')
 if st.button('Run Agent'):
-    with st.spinner('Running agent...'):
-        resp = run_liquidity_agent(df, query, top_k=5)
-        if resp:
-            st.markdown('**Agent Response**')
-            st.write(resp)
+    st.markdown('**Agent Response**')
+    resp = run_liquidity_agent(df, query, top_k=5, stream=True)
+    if isinstance(resp, str):
+        st.write(resp)
+    elif resp is None or not st.write_stream(resp):
+        st.error('Agent returned no response.')
+
+st.markdown('---')
+st.subheader('Natural Language Filter')
+filter_query = st.text_input('Describe the members you want to see', value='High risk members with cash buffer below 5 million')
+if st.button('Run Filter'):
+    engine = get_query_engine()
+    try:
+        with st.spinner('Compiling filter...'):
+            result, plan, elapsed = engine.run(filter_query, df)
+        st.code(plan.expression, language='python')
+        st.caption(f"{len(result)} of {len(df)} members matched in {elapsed * 1000:.1f} ms "
+                   f"(plan cache: {engine.hits} hits / {engine.misses} misses)")
+        st.dataframe(result.head(200), width='stretch')
+    except QueryEngineError as e:
+        st.error(f"❌ {e}")
+
+st.markdown('---')
+st.subheader('AI Confidence Scoring')
+score_count = st.number_input('Riskiest members to score', min_value=5, max_value=100, value=25, step=5)
+if st.button('Score Members'):
+    riskiest = top_risk_members(df, int(score_count))
+    st.session_state['scoring_job'] = get_job_queue().submit(
+        score_members, riskiest, job_id=f"ai-scoring-{get_frame_version(df)}-{int(score_count)}"
+    )
+scoring_job = wait_for_job('scoring_job', 'Scoring members in batches...')
+if scoring_job is not None:
+    if scoring_job.status == 'done':
+        scored, scoring_stats = scoring_job.result
+        st.caption(
+            f"🧮 {scoring_stats['scored']} scored, {scoring_stats['cached']} from cache, "
+            f"{scoring_stats['unscored']} without a valid score in {scoring_stats['requests']} requests "
+            f"({scoring_stats['seconds']:.1f}s, {scoring_stats['members_per_sec']:.0f} members/s)"
+        )
+        valid = scored.dropna(subset=['AI_Confidence'])
+        if valid.empty:
+            st.error('❌ The AI model returned no valid scores.')
         else:
-            st.error('Agent returned no response.')
+            st.pyplot(create_confidence_heatmap(valid), clear_figure=True)
+            st.dataframe(valid[['name', 'risk_ratio', 'AI_Confidence', 'AI_Reason']], width='stretch')
+    else:
+        st.error(f"❌ Scoring {scoring_job.status}: {scoring_job.error or ''}")
+
+st.markdown('---')
+cache_stats = get_response_cache().stats()
+st.caption(
+    f"⚡ AI response cache ({cache_stats['backend']}): "
+    f"{cache_stats['hit_rate']:.0%} hit rate, {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+    f"{cache_stats['latency_saved_s']:.1f}s of generation time saved"
+)
+recent_calls = get_ai_call_stats()
+if recent_calls:
+    last_call = recent_calls[-1]
+    ttft = f"{last_call['ttft_s']:.2f}s" if last_call['ttft_s'] is not None else "n/a"
+    st.caption(f"⏱️ Last AI call ({last_call['model']}): first token {ttft}, total {last_call['total_s']:.2f}s")
+
+with st.expander('⏱️ Model routing & latency'):
+    gateway_stats = get_llm_gateway().stats()
+    st.caption(
+        f"{gateway_stats['upstream_calls']} upstream calls, {gateway_stats['hedges']} hedged "
+        f"({gateway_stats['hedge_wins']} hedge wins), circuit {gateway_stats['breaker_state']}"
+    )
+    latency_rows = [{k: v for k, v in row.items() if k != 'buckets'} for row in get_llm_gateway().latency_snapshot()]
+    if latency_rows:
+        st.dataframe(pd.DataFrame(latency_rows), width='stretch', hide_index=True)
+    else:
+        st.caption('No model latency recorded yet.')
+    router = get_model_router()
+    st.dataframe(pd.DataFrame([
+        {'feature': feature, 'budget_s': LATENCY_BUDGETS[feature], 'model': route.model,
+         'hedge_after_s': route.hedge_after, 'reason': route.reason}
+        for feature, route in ((f, router.route('', f, probe=False)) for f in FEATURE_TIERS)
+    ]), width='stretch', hide_index=True)
@@ -2,13 +2,18 @@
 import streamlit as st
 import re
 import numpy as np
-import matplotlib.pyplot as plt
-from data import fetch_member_data, calculate_risk_metrics
-from visualizations import create_monte_carlo_simulation
-from ai_utils import get_ai_response
+from matplotlib.figure import Figure
+from data import fetch_member_data, calculate_risk_metrics, get_snapshot_version
+from chart_cache import ChartSpec, get_chart_cache
+from ai_utils import stream_ai_response
 from prompts import get_aquamind_agent_prompt
+from context_builder import build_portfolio_context
+from job_queue import get_job_queue
+from ui_helpers import wait_for_job
+from profiler import profile_page_run
 
 st.set_page_config(layout='wide')
+profile_page_run()
 st.title('Stress Tests & Scenarios')
 
 df = fetch_member_data()
@@ -21,8 +26,8 @@ st.markdown('Simulate shocks to liquidity buffers and view Monte Carlo outcomes.
 shock = st.slider('Stress shock multiplier', 0.5, 3.0, 1.2)
 if st.button('Run Stress Simulation'):
     st.info('Running simulation...')
-    fig = create_monte_carlo_simulation(df, shock)
-    st.pyplot(fig)
+    # Rasterized once per (risk ratios, shock) and shared with PDF reports and other sessions
+    st.image(get_chart_cache().render(ChartSpec('monte_carlo', df[['risk_ratio']], shock_multiplier=shock)))
     st.caption(f"Simulation run with shock multiplier: {shock}")
 
 # 🤖 AQUAMIND AI AGENT
@@ -36,39 +41,48 @@ It continuously scans financial data, detects risks, and provides proactive insi
 """)
 
 if st.button("🚀 Activate AquaMind Agent"):
-    with st.spinner("AquaMind is analyzing your liquidity landscape..."):
-        try:
-            df_string = df.to_string(index=False)
-            agent_prompt = get_aquamind_agent_prompt(df_string)
-            ai_agent_output = get_ai_response(agent_prompt)
+    agent_prompt = get_aquamind_agent_prompt(build_portfolio_context(df))
+    st.session_state['aquamind_job'] = get_job_queue().submit(
+        stream_ai_response, agent_prompt, data_version=get_snapshot_version(df), feature='aquamind',
+        raise_errors=True
+    )
 
-            if ai_agent_output:
-                st.success("✅ AquaMind Agent Report Ready")
-                st.markdown(ai_agent_output)
+# The analysis runs on the background worker pool; streamed text is shown while it arrives
+aquamind_job = wait_for_job('aquamind_job', "AquaMind is analyzing your liquidity landscape...")
+if aquamind_job is not None:
+    try:
+        ai_agent_output = aquamind_job.result if aquamind_job.status == 'done' else None
 
-                # Extract confidence for visualization
-                match = re.search(r"(\d{2,3})\s*%|confidence[:\s]+(\d{1,3})",
-                                  ai_agent_output.lower())
-                confidence_score = int(match.group(1) or match.group(2)) if match else 85
-                st.progress(confidence_score / 100)
-                st.caption(f"🧭 AquaMind Confidence Level: {confidence_score}%")
+        if ai_agent_output:
+            st.success("✅ AquaMind Agent Report Ready")
+            st.markdown(ai_agent_output)
 
-                # Optional: auto-generate quick Monte Carlo visualization
-                st.subheader("🎲 Monte Carlo Liquidity Stress Snapshot")
-                sims = np.random.normal(df["risk_ratio"].mean(), 0.5, 5000)
-                fig, ax = plt.subplots()
-                ax.hist(sims, bins=40, color="skyblue", edgecolor="black")
-                ax.axvline(2,
-                           color="red",
-                           linestyle="--",
-                           label="High Risk Threshold (2x)")
-                ax.set_title("Monte Carlo Simulated Risk Ratios")
-                ax.set_xlabel("Simulated Risk Ratio")
-                ax.set_ylabel("Frequency")
-                ax.legend()
-                st.pyplot(fig)
-            else:
-                st.error("❌ AquaMind could not generate a response.")
+            # Extract confidence for visualization
+            match = re.search(r"(\d{2,3})\s*%|confidence[:\s]+(\d{1,3})",
+                              ai_agent_output.lower())
+            confidence_score = int(match.group(1) or match.group(2)) if match else 85
+            st.progress(confidence_score / 100)
+            st.caption(f"🧭 AquaMind Confidence Level: {confidence_score}%")
 
-        except Exception as e:
-            st.error(f"❌ Error running AquaMind Agent: {e}")
+            # Optional: auto-generate quick Monte Carlo visualization
+            st.subheader("🎲 Monte Carlo Liquidity Stress Snapshot")
+            sims = np.random.normal(df["risk_ratio"].mean(), 0.5, 5000)
+            fig = Figure()
+            ax = fig.subplots()
+            ax.hist(sims, bins=40, color="skyblue", edgecolor="black")
+            ax.axvline(2,
+                       color="red",
+                       linestyle="--",
+                       label="High Risk Threshold (2x)")
+            ax.set_title("Monte Carlo Simulated Risk Ratios")
+            ax.set_xlabel("Simulated Risk Ratio")
+            ax.set_ylabel("Frequency")
+            ax.legend()
+            st.pyplot(fig, clear_figure=True)
+        elif aquamind_job.status == 'failed':
+            st.error(f"❌ Error running AquaMind Agent: {aquamind_job.error}")
+        elif aquamind_job.status != 'cancelled':
+            st.error("❌ AquaMind could not generate a response.")
+
+    except Exception as e:
+        st.error(f"❌ Error running AquaMind Agent: {e}")
@@ -2,11 +2,15 @@
 import streamlit as st
 import os
 from datetime import datetime
-from io import BytesIO
-from fpdf import FPDF
-from data import fetch_member_data, calculate_risk_metrics
+from data import fetch_member_data, calculate_risk_metrics, get_frame_version
+from reports import render_report
+from exports import EXPORT_FORMATS, export_members, get_export_store
+from job_queue import get_job_queue
+from ui_helpers import wait_for_job
+from profiler import profile_page_run
 
 st.set_page_config(layout='wide')
+profile_page_run()
 st.title('Reports & Export')
 
 df = fetch_member_data()
@@ -24,111 +28,62 @@ with col1:
     st.markdown('#### 📄 PDF Report')
     st.markdown('Generate a comprehensive liquidity risk report in PDF format.')
     
+    full_book = st.checkbox(f'Include full member table ({len(df):,} members)', value=False)
+    top_n = st.slider('Top high-risk members to list', min_value=5, max_value=50, value=10, step=5)
+    
+    job_queue = get_job_queue()
     if st.button('Generate PDF Report', type='primary'):
-        try:
-            # Create PDF
-            pdf = FPDF()
-            pdf.add_page()
-            
-            # Title
-            pdf.set_font('Arial', 'B', 20)
-            pdf.set_text_color(0, 120, 215)
-            pdf.cell(0, 10, 'Smart Liquidity Monitor Report', ln=True, align='C')
-            pdf.ln(5)
-            
-            # Timestamp
-            pdf.set_font('Arial', '', 10)
-            pdf.set_text_color(100, 100, 100)
-            pdf.cell(0, 10, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', ln=True, align='C')
-            pdf.ln(10)
-            
-            # Summary Statistics
-            pdf.set_font('Arial', 'B', 14)
-            pdf.set_text_color(0, 0, 0)
-            pdf.cell(0, 10, 'Executive Summary', ln=True)
-            pdf.ln(3)
-            
-            pdf.set_font('Arial', '', 11)
-            total_members = len(df)
-            high_risk = len(df[df['risk_level'] == 'High Risk'])
-            medium_risk = len(df[df['risk_level'] == 'Medium Risk'])
-            low_risk = len(df[df['risk_level'] == 'Low Risk'])
-            
-            pdf.cell(0, 8, f'Total Members Monitored: {total_members}', ln=True)
-            pdf.cell(0, 8, f'High Risk Members: {high_risk} ({high_risk/total_members*100:.1f}%)', ln=True)
-            pdf.cell(0, 8, f'Medium Risk Members: {medium_risk} ({medium_risk/total_members*100:.1f}%)', ln=True)
-            pdf.cell(0, 8, f'Low Risk Members: {low_risk} ({low_risk/total_members*100:.1f}%)', ln=True)
-            pdf.ln(10)
-            
-            # Top 10 High Risk Members
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, 'Top 10 High Risk Members', ln=True)
-            pdf.ln(3)
-            
-            # Table header
-            pdf.set_font('Arial', 'B', 9)
-            pdf.set_fill_color(0, 120, 215)
-            pdf.set_text_color(255, 255, 255)
-            pdf.cell(60, 8, 'Member Name', 1, 0, 'C', True)
-            pdf.cell(35, 8, 'Cash Buffer', 1, 0, 'C', True)
-            pdf.cell(35, 8, 'Exposure', 1, 0, 'C', True)
-            pdf.cell(30, 8, 'Risk Ratio', 1, 0, 'C', True)
-            pdf.cell(30, 8, 'Risk Level', 1, 1, 'C', True)
-            
-            # Table data
-            pdf.set_font('Arial', '', 8)
-            pdf.set_text_color(0, 0, 0)
-            
-            top_risk = df.nlargest(10, 'risk_ratio')
-            for _, row in top_risk.iterrows():
-                pdf.cell(60, 7, str(row['name'])[:25], 1, 0, 'L')
-                pdf.cell(35, 7, f"${row['cash_buffer_usd']:,.0f}", 1, 0, 'R')
-                pdf.cell(35, 7, f"${row['exposure_usd']:,.0f}", 1, 0, 'R')
-                pdf.cell(30, 7, f"{row['risk_ratio']:.2f}", 1, 0, 'C')
-                pdf.cell(30, 7, str(row['risk_level']), 1, 1, 'C')
-            
-            pdf.ln(10)
-            
-            # Recommendations
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, 'Key Recommendations', ln=True)
-            pdf.ln(3)
-            
-            pdf.set_font('Arial', '', 11)
-            if high_risk > 0:
-                pdf.multi_cell(0, 7, f'- {high_risk} members require immediate attention due to high risk ratios')
-            if medium_risk > 5:
-                pdf.multi_cell(0, 7, f'- Monitor {medium_risk} medium-risk members for potential escalation')
-            pdf.multi_cell(0, 7, '- Consider implementing automated alerts for members crossing risk thresholds')
-            pdf.multi_cell(0, 7, '- Review liquidity policies and credit limits for high-risk members')
-            
-            # Save PDF to bytes using BytesIO
-            pdf_bytes = BytesIO()
-            pdf_output = pdf.output(dest='S')
-            if isinstance(pdf_output, str):
-                pdf_bytes.write(pdf_output.encode('latin-1'))
-            else:
-                pdf_bytes.write(pdf_output)
-            pdf_data = pdf_bytes.getvalue()
-            
+        st.session_state['pdf_report_job'] = job_queue.submit(
+            render_report, df, full_book=full_book, top_n=top_n,
+            job_id=f"pdf-report-{get_frame_version(df)}-{int(full_book)}-{top_n}"
+        )
+    
+    # Built on the background worker pool and cached on disk per snapshot and options,
+    # so other sessions asking for the same report get the stored PDF
+    pdf_job = wait_for_job('pdf_report_job', 'Building PDF report in the background...')
+    if pdf_job is not None:
+        if pdf_job.status == 'done':
             st.success('✅ PDF Report generated successfully!')
             st.download_button(
                 label='📥 Download PDF Report',
-                data=pdf_data,
+                data=pdf_job.result,
                 file_name=f'liquidity_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
                 mime='application/pdf'
             )
-        except Exception as e:
-            st.error(f'❌ Error generating PDF: {str(e)}')
+        elif pdf_job.status == 'failed':
+            st.error(f'❌ Error generating PDF: {pdf_job.error}')
 
 with col2:
-    st.markdown('#### 📊 CSV Export')
-    st.markdown('Export raw data for further analysis in spreadsheet applications.')
+    st.markdown('#### 📊 Data Export')
+    st.markdown('Export raw data for further analysis in spreadsheet applications or data tools.')
     
-    csv = df.to_csv(index=False)
-    st.download_button(
-        label='📥 Download CSV Data',
-        data=csv,
-        file_name=f'liquidity_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv',
-        mime='text/csv'
+    export_format = st.selectbox(
+        'Format', list(EXPORT_FORMATS), format_func=lambda key: EXPORT_FORMATS[key].label
     )
+    export_spec = EXPORT_FORMATS[export_format]
+    
+    # The file is built on the worker pool only when asked for, then reused from disk for this snapshot
+    export_job_id = f"export-{get_frame_version(df)}-{export_format}"
+    export_path = get_export_store().cached(df, export_format)
+    if export_path is None:
+        if st.button(f'⚙️ Prepare {export_spec.label} export'):
+            st.session_state['export_job'] = job_queue.submit(
+                export_members, df, export_format, job_id=export_job_id
+            )
+        export_job = wait_for_job('export_job', 'Building export in the background...')
+        if export_job is not None and export_job.id == export_job_id:
+            if export_job.status == 'done':
+                export_path = export_job.result
+            elif export_job.status == 'failed':
+                st.error(f'❌ Error building export: {export_job.error}')
+    
+    if export_path is not None and os.path.exists(export_path):
+        with open(export_path, 'rb') as export_file:
+            st.download_button(
+                label=f'📥 Download {export_spec.label}',
+                data=export_file,
+                file_name=f'liquidity_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{export_spec.extension}',
+                mime=export_spec.mime
+            )
+        st.caption(f'⚡ Served from the export cache for this data snapshot '
+                   f'({os.path.getsize(export_path) / 1e6:.1f} MB)')
@@ -1,16 +1,20 @@
 
 import streamlit as st, os
-from redis_cache import get_pref, set_pref
+from redis_cache import get_prefs, set_prefs
+from risk_index import DEFAULT_THRESHOLDS
+from profiler import PROFILE_DIR, profile_page_run, request_profile
 
 st.set_page_config(layout='wide')
+profile_page_run()
 st.title('Settings & Configuration')
 st.markdown('Configure environment variables and thresholds (local settings only).')
 st.info('Important: Do NOT store secrets in repo. Use environment variables in deployment.')
 
-# Load persisted prefs (or defaults)
-high_risk_default = get_pref('high_risk_threshold', 2.0)
-low_risk_default = get_pref('low_risk_threshold', 0.8)
-display_limit_default = get_pref('display_limit', 50)
+# Load persisted prefs (or defaults) in one round trip
+prefs = get_prefs({**DEFAULT_THRESHOLDS, 'display_limit': 50})
+high_risk_default = prefs['high_risk_threshold']
+low_risk_default = prefs['low_risk_threshold']
+display_limit_default = prefs['display_limit']
 
 col1, col2 = st.columns(2)
 with col1:
@@ -22,11 +26,26 @@ with col2:
     st.text('SF_USER: ' + (os.environ.get('SF_USER') or 'not set'))
 
 if st.button('Save Settings'):
-    set_pref('high_risk_threshold', float(high_risk))
-    set_pref('low_risk_threshold', float(low_risk))
-    set_pref('display_limit', int(display_limit))
-    st.success('Settings saved.')
-    st.rerun()
+    if low_risk > high_risk:
+        st.error('❌ The low risk threshold must not be above the high risk threshold.')
+        st.stop()
+    saved = set_prefs({
+        'high_risk_threshold': float(high_risk),
+        'low_risk_threshold': float(low_risk),
+        'display_limit': int(display_limit),
+    })
+    if saved:
+        st.success('Settings saved.')
+        st.rerun()
+    else:
+        st.error('❌ Could not save settings to Redis. Please try again.')
+
+st.markdown('---')
+st.subheader('Profiling')
+st.write('Run the next page you open (or rerun) under the sampling profiler. You can also add `?profile=1` to any page URL.')
+if st.button('🔬 Profile next page run'):
+    request_profile()
+    st.success(f'The next page run will be profiled; results are saved to `{PROFILE_DIR}` and listed on the Performance page.')
 
 st.markdown('---')
 st.write('Note: Preferences are persisted to Redis when REDIS_URL is configured; otherwise persisted to a local file `assets/preferences.json`.')
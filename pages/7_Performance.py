@@ -0,0 +1,89 @@
+import os
+import streamlit as st
+import pandas as pd
+from tracing import TRACE_FILE, TRACING_ENABLED, get_tracer
+from snapshot_cache import get_snapshot_cache
+from chart_cache import get_chart_cache
+from profiler import PROFILE_DIR, list_profiles, profile_page_run
+
+st.set_page_config(layout='wide')
+profile_page_run()
+st.title('Performance')
+st.markdown('Latency of traced operations in this process: data loading, risk metrics, forecasting, simulation, rendering and AI calls.')
+
+tracer = get_tracer()
+summary = pd.DataFrame(tracer.summary())
+if not TRACING_ENABLED:
+    st.info('Tracing is disabled (LR_TRACING=0).')
+elif summary.empty:
+    st.info('No spans recorded yet. Open the other pages to generate some traffic.')
+else:
+    col1, col2, col3 = st.columns(3)
+    col1.metric('Traced operations', f"{int(summary['count'].sum()):,}")
+    col2.metric('Errors', f"{int(summary['errors'].sum()):,}")
+    col3.metric('Slowest p95', f"{summary['p95_s'].max():.3f}s", help=summary.loc[summary['p95_s'].idxmax(), 'span'])
+
+    st.subheader('Span summary')
+    st.dataframe(
+        summary,
+        width='stretch',
+        hide_index=True,
+        column_config={
+            'mean_s': st.column_config.NumberColumn('mean (s)', format='%.4f'),
+            'p50_s': st.column_config.NumberColumn('p50 (s)', format='%.4f'),
+            'p95_s': st.column_config.NumberColumn('p95 (s)', format='%.4f'),
+            'p99_s': st.column_config.NumberColumn('p99 (s)', format='%.4f'),
+            'total_s': st.column_config.NumberColumn('total (s)', format='%.2f'),
+            'cache_hit_rate': st.column_config.ProgressColumn('cache hit rate', min_value=0.0, max_value=1.0, format='percent'),
+        },
+    )
+    st.bar_chart(summary.set_index('span')['p95_s'], y_label='p95 seconds', horizontal=True)
+
+    st.subheader('Recent spans')
+    recent = pd.DataFrame(tracer.recent(200))
+    if not recent.empty:
+        recent['start'] = pd.to_datetime(recent['start'], unit='s')
+        st.dataframe(recent, width='stretch', hide_index=True, height=320)
+
+    with st.expander('Caches'):
+        st.json({'snapshot_cache': get_snapshot_cache().stats(), 'chart_cache': get_chart_cache().stats()})
+
+    st.subheader('Export')
+    col1, col2 = st.columns(2)
+    col1.download_button('📈 Prometheus metrics', tracer.prometheus_text(), file_name='liquidity_radar_metrics.prom', mime='text/plain')
+    if os.path.exists(TRACE_FILE):
+        with open(TRACE_FILE, 'rb') as f:
+            col2.download_button('🧾 JSONL trace file', f.read(), file_name='spans.jsonl', mime='application/x-ndjson')
+    else:
+        col2.caption('The trace file is written shortly after the first spans finish.')
+    st.caption(f'Trace file: `{TRACE_FILE}`. Set LR_PROMETHEUS_TEXTFILE to also write the metrics for a node_exporter textfile collector.')
+
+st.markdown('---')
+st.subheader('🔬 Page profiles')
+profiles = list_profiles()
+if not profiles:
+    st.caption(f'No profiles yet. Add `?profile=1` to a page URL or use "Profile next page run" in Settings; results are saved to `{PROFILE_DIR}`.')
+else:
+    labels = {
+        p['path']: f"{pd.Timestamp(p['started_at'], unit='s'):%Y-%m-%d %H:%M:%S} · {p['page']} · {p['duration_s']:.2f}s · {p['samples']} samples"
+        for p in profiles
+    }
+    selected = st.selectbox('Profile', list(labels), format_func=labels.get)
+    profile = next(p for p in profiles if p['path'] == selected)
+    st.dataframe(
+        pd.DataFrame(profile['hot_functions']),
+        width='stretch',
+        hide_index=True,
+        column_config={
+            'self_pct': st.column_config.NumberColumn('self %', format='%.1f'),
+            'total_pct': st.column_config.NumberColumn('total %', format='%.1f'),
+        },
+    )
+    col1, col2 = st.columns(2)
+    collapsed_path = os.path.join(os.path.dirname(selected), profile['collapsed_file'])
+    if os.path.exists(collapsed_path):
+        with open(collapsed_path, 'rb') as f:
+            col1.download_button('🔥 Collapsed stacks (flamegraph.pl / speedscope)', f.read(),
+                                 file_name=profile['collapsed_file'], mime='text/plain')
+    with open(selected, 'rb') as f:
+        col2.download_button('📋 Hot functions (JSON)', f.read(), file_name=os.path.basename(selected), mime='application/json')
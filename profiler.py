@@ -0,0 +1,210 @@
+"""
+Page Profiler for Smart Liquidity Monitor
+On-demand sampling profiler for one page run: collapsed stacks (flamegraph /
+speedscope compatible) plus the top hot functions, saved under .cache/profiles
+"""
+
+import os
+import sys
+import json
+import time
+import glob
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import streamlit as st
+
+PROFILE_DIR = os.environ.get("LR_PROFILE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "profiles"))
+PROFILE_INTERVAL = float(os.environ.get("LR_PROFILE_INTERVAL", 0.005))  # seconds between samples
+PROFILE_MAX_SECONDS = float(os.environ.get("LR_PROFILE_MAX_SECONDS", 300))
+PROFILE_TOP_N = int(os.environ.get("LR_PROFILE_TOP_N", 30))
+PROFILE_KEEP = int(os.environ.get("LR_PROFILE_KEEP", 50))
+
+_STDLIB = os.path.dirname(os.__file__)
+
+QUERY_PARAM = "profile"
+SESSION_FLAG = "profile_next_run"
+
+
+def _frame_label(code) -> str:
+    path = code.co_filename
+    root = os.path.dirname(os.path.abspath(__file__))
+    if path.startswith(root + os.sep):
+        path = os.path.relpath(path, root)
+    elif "site-packages" in path:
+        path = path.split("site-packages" + os.sep, 1)[1]
+    elif path.startswith(_STDLIB + os.sep):
+        path = os.path.relpath(path, _STDLIB)
+    return f"{code.co_name} ({path}:{code.co_firstlineno})"
+
+
+class PageSampler:
+    """
+    Samples the stack of one script thread until its page frame returns
+
+    A daemon thread reads ``sys._current_frames()`` every ``interval`` seconds;
+    the profiled thread itself runs untouched (no sys.setprofile hooks), so the
+    cost is the sampler's share of the GIL. Stacks are cut at the page's module
+    frame, which hides the Streamlit runtime underneath it.
+
+    Args:
+        page: Page name used in the output file names
+        page_frame: The page script's module frame; sampling stops once it leaves the stack
+        interval: Seconds between samples (default: LR_PROFILE_INTERVAL)
+    """
+
+    def __init__(self, page: str, page_frame, interval: float = PROFILE_INTERVAL,
+                 directory: str = PROFILE_DIR, max_seconds: float = PROFILE_MAX_SECONDS):
+        self.page = page
+        self.interval = interval
+        self.directory = directory
+        self.max_seconds = max_seconds
+        self.started_at = time.time()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.result_path: Optional[str] = None
+        self._page_frame = page_frame
+        self._thread_id = threading.get_ident()
+        self._labels: Dict[object, str] = {}
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{page}", daemon=True)
+
+    def start(self) -> "PageSampler":
+        self._thread.start()
+        return self
+
+    def _sample(self) -> bool:
+        frame = sys._current_frames().get(self._thread_id)
+        stack = []
+        while frame is not None:
+            if frame is self._page_frame:
+                stack.append(frame.f_code)
+                self.stacks[tuple(reversed(stack))] += 1
+                self.samples += 1
+                return True
+            stack.append(frame.f_code)
+            frame = frame.f_back
+        return False  # The page run finished (or the thread moved on to another script)
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        try:
+            while True:
+                time.sleep(self.interval)
+                if time.monotonic() >= deadline or not self._sample():
+                    break
+        finally:
+            self._page_frame = None
+            try:
+                self.result_path = self.save()
+            except OSError:
+                pass
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = _frame_label(code)
+        return label
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format ("outer;inner;leaf count" per line)"""
+        lines = [";".join(self._label(code).replace(";", ",") for code in stack) + f" {count}"
+                 for stack, count in self.stacks.most_common()]
+        return "\n".join(lines) + "\n"
+
+    def hot_functions(self, top_n: int = PROFILE_TOP_N) -> List[Dict]:
+        """Functions by self samples (leaf) with their inclusive samples, hottest first"""
+        own: Counter = Counter()
+        total: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for code in set(stack):
+                total[code] += count
+        ranked = sorted(total, key=lambda code: (own[code], total[code]), reverse=True)[:top_n]
+        samples = max(self.samples, 1)
+        return [{
+            "function": self._label(code),
+            "self_samples": own[code],
+            "total_samples": total[code],
+            "self_pct": 100 * own[code] / samples,
+            "total_pct": 100 * total[code] / samples,
+        } for code in ranked]
+
+    def save(self) -> str:
+        """Write ``<stamp>-<page>.collapsed`` and ``.json`` (summary + hot functions); returns the JSON path"""
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = datetime.fromtimestamp(self.started_at).strftime("%Y%m%d-%H%M%S-%f")
+        base = os.path.join(self.directory, f"{stamp}-{os.getpid()}-{_safe_name(self.page)}")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+        summary = {
+            "page": self.page,
+            "started_at": self.started_at,
+            "duration_s": time.time() - self.started_at,
+            "samples": self.samples,
+            "interval_s": self.interval,
+            "collapsed_file": os.path.basename(base + ".collapsed"),
+            "hot_functions": self.hot_functions(),
+        }
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        _prune(self.directory)
+        return base + ".json"
+
+
+def _safe_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+
+
+def _prune(directory: str) -> None:
+    summaries = sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime, reverse=True)
+    for stale in summaries[PROFILE_KEEP:]:
+        for path in (stale, stale[:-len(".json")] + ".collapsed"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[Dict]:
+    """Saved profile summaries, newest first (each with its ``path``)"""
+    profiles = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.json")), key=os.path.getmtime, reverse=True):
+        try:
+            with open(path, encoding="utf-8") as f:
+                profiles.append(dict(json.load(f), path=path))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def request_profile() -> None:
+    """Profile the next page run of this session"""
+    st.session_state[SESSION_FLAG] = True
+
+
+def profile_page_run(page: Optional[str] = None) -> Optional[PageSampler]:
+    """
+    Start sampling this page run if ``?profile=1`` is in the URL or profiling was requested in Settings
+
+    Call it at the top of a page script. When no profile is requested this is a
+    query-param and session-state lookup and nothing else. The flag is consumed,
+    so only one run is profiled.
+
+    Args:
+        page: Page name for the output files (default: the calling script's file name)
+
+    Returns:
+        PageSampler: The running sampler, or None when not profiling
+    """
+    requested = st.session_state.pop(SESSION_FLAG, False)
+    if st.query_params.get(QUERY_PARAM) not in (None, "", "0"):
+        del st.query_params[QUERY_PARAM]
+        requested = True
+    if not requested:
+        return None
+    page_frame = sys._getframe(1)
+    page = page or os.path.splitext(os.path.basename(page_frame.f_code.co_filename))[0]
+    st.caption(f"🔬 Profiling this run of **{page}**; the result will be listed on the Performance page.")
+    return PageSampler(page, page_frame).start()
@@ -3,38 +3,48 @@ AI Prompt Templates for Smart Liquidity Monitor
 Centralized prompts for Gemini AI interactions
 """
 
-from typing import List
+from typing import Dict
 
-def get_ai_summary_prompt(df_string: str) -> str:
-    """Generate prompt for AI liquidity risk summary"""
+def get_ai_summary_prompt(context: str) -> str:
+    """Generate prompt for AI liquidity risk summary (context from context_builder)"""
     return f"""
     You are a financial risk analyst. Summarize which members are most at liquidity risk
     and give 2 recommendations to reduce exposure.
-    Data:
-    {df_string}
+    Portfolio context:
+    {context}
     """
 
-def get_natural_language_query_prompt(query_input: str, columns: List[str]) -> str:
-    """Generate prompt for converting natural language to pandas filter"""
+def get_natural_language_query_prompt(query_input: str, schema: Dict[str, str]) -> str:
+    """Generate prompt for converting natural language to a restricted DataFrame.query filter"""
+    columns = "\n".join(f"    - {name} ({kind})" for name, kind in schema.items())
     return f"""
-    Convert the following query into a pandas filter expression for df:
+    Convert the following question into a single pandas DataFrame.query filter expression:
     '{query_input}'
-    DataFrame columns: {columns}
-    Return only the valid Python code to filter the dataframe.
+    Columns (type):
+{columns}
+    Rules:
+    - Use only the column names above, numbers, quoted strings, comparison operators
+      (==, !=, <, <=, >, >=, in, not in), arithmetic (+, -, *, /), and/or/not, and parentheses.
+    - No function calls, attribute access, indexing, variables or the name df.
+    - Write money amounts as plain numbers in USD (5 million -> 5000000).
+    - risk_level values are 'HIGH', 'MEDIUM' and 'LOW'.
+    - If the question cannot be expressed as a filter on these columns, return NONE.
+    Return only the expression on one line, with no explanation or code fences.
+    Example: risk_level == 'HIGH' and cash_buffer_usd < 5000000
     """
 
-def get_optimization_plan_prompt(df_string: str) -> str:
-    """Generate prompt for AI liquidity optimization plan"""
+def get_optimization_plan_prompt(context: str) -> str:
+    """Generate prompt for AI liquidity optimization plan (context from context_builder)"""
     return f"""
     You are an expert liquidity strategist.
     Given the following data, propose a 3-step action plan to lower risk ratios below 1.5
     while maintaining minimum cash buffers. Include confidence score (0–100%).
-    Data:
-    {df_string}
+    Portfolio context:
+    {context}
     """
 
-def get_aquamind_agent_prompt(df_string: str) -> str:
-    """Generate prompt for AquaMind AI Agent analysis"""
+def get_aquamind_agent_prompt(context: str) -> str:
+    """Generate prompt for AquaMind AI Agent analysis (context from context_builder)"""
     return f"""
     You are AquaMind, an autonomous AI liquidity agent.
     Your job is to:
@@ -43,8 +53,8 @@ def get_aquamind_agent_prompt(df_string: str) -> str:
     3. Provide actionable recommendations with confidence scores.
     4. Suggest any stress scenarios that could impact stability.
 
-    Data:
-    {df_string}
+    Portfolio context (aggregates, risk-bucket quantiles, anomalies and riskiest members):
+    {context}
 
     Respond concisely in the following format:
     **Detected Risks:** ...
@@ -52,3 +62,14 @@ def get_aquamind_agent_prompt(df_string: str) -> str:
     **Recommended Actions:** ...
     **Confidence:** (as %)
     """
+
+def get_batch_scoring_prompt(members_csv: str) -> str:
+    """Generate prompt for scoring a batch of members in one structured-JSON request"""
+    return f"""
+    You are a liquidity risk model. For every member in the CSV below, estimate your
+    confidence (0-100) that the member will be HIGH liquidity risk next quarter.
+    Members (CSV):
+    {members_csv}
+    Respond with JSON only: an array with exactly one object per member, in the form
+    [{{"member_id": <member_id from the CSV>, "confidence": <0-100>, "reason": "<max 12 words>"}}]
+    """
@@ -0,0 +1,218 @@
+"""
+Natural-Language Filter Engine for Smart Liquidity Monitor
+Turns English questions into validated, vectorized DataFrame.query plans,
+cached by normalized question text so repeated questions skip the LLM
+"""
+
+import re
+import ast
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+from prompts import get_natural_language_query_prompt
+
+try:
+    import numexpr  # noqa: F401
+    QUERY_ENGINE = "numexpr"
+except Exception:
+    QUERY_ENGINE = "python"
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.BitAnd, ast.BitOr,
+    ast.Compare, ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.List, ast.Tuple,
+)
+
+
+class QueryEngineError(ValueError):
+    """Raised when a question cannot be turned into a valid filter"""
+
+
+class FilterPlan:
+    """A validated filter expression ready to run with DataFrame.query"""
+
+    def __init__(self, question: str, expression: str, columns: List[str]):
+        self.question = question
+        self.expression = expression
+        self.columns = columns
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Run the plan against a member frame (vectorized via numexpr when installed)"""
+        return df.query(self.expression, engine=QUERY_ENGINE)
+
+    def __repr__(self) -> str:
+        return f"FilterPlan({self.expression!r})"
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so trivially different phrasings share a plan"""
+    return " ".join(re.sub(r"[^\w\s.<>=%$]", " ", question.lower()).split())
+
+
+def member_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """Queryable columns and their kind ('number' or 'text'); columns that are not identifiers are skipped"""
+    return {
+        col: "number" if is_numeric_dtype(df[col]) else "text"
+        for col in df.columns
+        if _IDENTIFIER.match(str(col))
+    }
+
+
+def _strip_llm_wrapping(text: str) -> str:
+    """Reduce common LLM answer shapes (code fences, df[...] masks, df['col']) to a bare expression"""
+    expr = text.strip()
+    expr = re.sub(r"^```(?:python)?\s*|\s*```$", "", expr).strip()
+    expr = expr.splitlines()[-1].strip() if "\n" in expr else expr
+    expr = re.sub(r"^(?:result|filtered|df)\s*=\s*", "", expr)
+    expr = re.sub(r"^(?:df)?\.query\(\s*(['\"])(.*)\1\s*\)$", r"\2", expr)
+    if expr.startswith("df[") and expr.endswith("]"):
+        expr = expr[3:-1]
+    expr = re.sub(r"df\[\s*(['\"])(\w+)\1\s*\]", r"\2", expr)
+    expr = re.sub(r"\bdf\.(\w+)\b", r"\1", expr)
+    return expr.strip()
+
+
+def validate_expression(expression: str, schema: Dict[str, str]) -> List[str]:
+    """
+    Check that an expression only uses the restricted filter grammar and known columns
+
+    Args:
+        expression: Candidate filter expression
+        schema: Column name -> kind mapping from member_schema
+
+    Returns:
+        list: Column names referenced by the expression
+
+    Raises:
+        QueryEngineError: If the expression is not a safe, schema-valid filter
+    """
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise QueryEngineError(f"Not a valid filter expression: {e.msg}")
+
+    columns: List[str] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise QueryEngineError(f"'{type(node).__name__}' is not allowed in filters")
+        if isinstance(node, ast.Name):
+            if node.id not in schema:
+                raise QueryEngineError(f"Unknown column '{node.id}'")
+            columns.append(node.id)
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float, str, bool)):
+            raise QueryEngineError("Only numbers, strings and booleans are allowed as literals")
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+            kinds = {schema.get(o.id) for o in operands if isinstance(o, ast.Name)}
+            literals = [o for o in operands if isinstance(o, ast.Constant)]
+            if "number" in kinds and any(isinstance(o.value, str) for o in literals):
+                raise QueryEngineError("Numeric columns cannot be compared with text")
+    if not columns:
+        raise QueryEngineError("Filter does not reference any column")
+    return list(dict.fromkeys(columns))
+
+
+class QueryEngine:
+    """
+    Natural-language filter engine with a plan cache
+
+    Args:
+        llm: Callable(prompt) -> response text (default: ai_utils.get_ai_response)
+        max_plans: Number of compiled plans kept in memory (default: 256)
+    """
+
+    def __init__(self, llm: Optional[Callable[[str], Optional[str]]] = None, max_plans: int = 256):
+        self._llm = llm
+        self.max_plans = max_plans
+        self._plans: "OrderedDict[Tuple[str, Tuple[str, ...]], FilterPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ask_llm(self, prompt: str) -> Optional[str]:
+        if self._llm is not None:
+            return self._llm(prompt)
+        from ai_utils import get_ai_response
+        return get_ai_response(prompt, temperature=0.0, feature="filter")
+
+    def compile(self, question: str, df: pd.DataFrame) -> FilterPlan:
+        """
+        Get the filter plan for a question, asking the LLM only on a cache miss
+
+        Args:
+            question: English question, e.g. "high risk members with cash below 5m"
+            df: Member frame whose schema the plan must satisfy
+
+        Returns:
+            FilterPlan: Validated plan
+
+        Raises:
+            QueryEngineError: If the LLM gives no usable expression
+        """
+        schema = member_schema(df)
+        key = (normalize_question(question), tuple(sorted(schema.items())))
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans.move_to_end(key)
+                self.hits += 1
+                return plan
+            self.misses += 1
+
+        response = self._ask_llm(get_natural_language_query_prompt(question, schema))
+        if not response:
+            raise QueryEngineError("The AI model returned no filter expression.")
+        expression = _strip_llm_wrapping(response)
+        if expression.upper() == "NONE":
+            raise QueryEngineError("This question cannot be answered with a member filter.")
+        plan = FilterPlan(question, expression, validate_expression(expression, schema))
+
+        with self._lock:
+            self._plans[key] = plan
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+        return plan
+
+    def forget(self, question: str) -> None:
+        """Drop every cached plan for a question (e.g. after it failed to run)"""
+        normalized = normalize_question(question)
+        with self._lock:
+            for key in [k for k in self._plans if k[0] == normalized]:
+                del self._plans[key]
+
+    def run(self, question: str, df: pd.DataFrame) -> Tuple[pd.DataFrame, FilterPlan, float]:
+        """
+        Compile (or reuse) the plan for a question and apply it
+
+        Returns:
+            tuple: (filtered frame, plan, seconds spent applying the plan)
+        """
+        plan = self.compile(question, df)
+        started = time.perf_counter()
+        try:
+            result = plan.apply(df)
+        except Exception as e:
+            self.forget(question)
+            raise QueryEngineError(f"Filter '{plan.expression}' failed: {e}")
+        return result, plan, time.perf_counter() - started
+
+
+_engine: Optional[QueryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_query_engine() -> QueryEngine:
+    """Return the process-wide query engine (plans are shared across sessions)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = QueryEngine()
+        return _engine
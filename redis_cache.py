@@ -1,55 +1,239 @@
+"""
+Preferences Store for Smart Liquidity Monitor
+User preferences in Redis (pooled client, batched reads/writes, in-process
+read-through cache invalidated over pub/sub), with a local JSON file fallback
+"""
 
-import os, json
+import os, json, time, threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 try:
     import redis
 except Exception:
     redis = None
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, atomic rename only
+    fcntl = None
 
 FALLBACK_FILE = os.path.join(os.path.dirname(__file__), "assets", "preferences.json")
+INVALIDATION_CHANNEL = os.environ.get("LR_PREFS_CHANNEL", "prefs:invalidate")
+MAX_CONNECTIONS = int(os.environ.get("LR_REDIS_MAX_CONNECTIONS", 20))
+
+_ABSENT = object()  # cached marker for keys that are not set in Redis
+
+class PrefFile:
+    """
+    Preferences in a local JSON file, safe across threads and processes
+
+    Writes take an exclusive flock on ``<path>.lock``, re-read the file, merge
+    and rename a fsynced temporary file into place, so concurrent sessions never
+    lose each other's keys or see a torn file. Reads are served from memory and
+    only re-parse the file when its (inode, mtime, size) signature changes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data: Dict[str, Any] = {}
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _refresh(self, signature) -> None:
+        # Caller holds self._lock
+        if signature == self._signature:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        except FileNotFoundError:
+            self._data = {}
+        except ValueError:
+            # Hand-edited into invalid JSON: keep serving the last good copy
+            pass
+        self._signature = signature
+
+    def read(self) -> Dict[str, Any]:
+        """Current preferences (a copy), re-loaded only if the file changed"""
+        signature = self._stat_signature()
+        with self._lock:
+            self._refresh(signature)
+            return dict(self._data)
 
-def _read_fallback():
-    try:
-        with open(FALLBACK_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    def update(self, values: Dict[str, Any]) -> None:
+        """Merge ``values`` into the file under the cross-process lock"""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path + ".lock", "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)  # released when lock_file closes
+            self._refresh(self._stat_signature())
+            data = dict(self._data, **values)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._data, self._signature = data, self._stat_signature()
 
-def _write_fallback(data):
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(FALLBACK_FILE), exist_ok=True)
-    with open(FALLBACK_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+
+_pref_file = PrefFile(FALLBACK_FILE)
+
+_client = None
+_client_lock = threading.Lock()
 
 def get_redis_client():
+    """Return the process-wide Redis client (one blocking connection pool), or None without REDIS_URL"""
+    global _client
     url = os.environ.get("REDIS_URL")
-    if url and redis is not None:
-        return redis.Redis.from_url(url)
-    return None
+    if not url or redis is None:
+        return None
+    with _client_lock:
+        if _client is None:
+            pool = redis.BlockingConnectionPool.from_url(url, max_connections=MAX_CONNECTIONS, timeout=5)
+            _client = redis.Redis(connection_pool=pool)
+        return _client
 
-def get_pref(key, default=None):
+
+class PrefCache:
+    """
+    In-process read-through cache of preference values
+
+    A daemon thread subscribes to INVALIDATION_CHANNEL; every write (from any
+    replica) publishes the changed keys there and they are evicted here. The
+    cache is only used while the subscription is live, and a generation
+    counter stops a read that raced an invalidation from caching a stale value.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._values: Dict[str, Any] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = threading.Event()
+        threading.Thread(target=self._listen, name="prefs-invalidation", daemon=True).start()
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def lookup(self, keys: Iterable[str]) -> Tuple[Dict[str, Any], List[str]]:
+        """Split keys into (cached values, keys that must be read from Redis)"""
+        if not self._listening.is_set():
+            return {}, list(keys)
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                if key in self._values:
+                    found[key] = self._values[key]
+                else:
+                    missing.append(key)
+        return found, missing
+
+    def store(self, values: Dict[str, Any], generation: int) -> None:
+        with self._lock:
+            if self._listening.is_set() and generation == self._generation:
+                self._values.update(values)
+
+    def evict(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                self._values.pop(key, None)
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                self._listening.set()
+                for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.evict(json.loads(message["data"]))
+            except Exception:
+                pass
+            # Missed invalidations are possible while disconnected: drop everything
+            self._listening.clear()
+            with self._lock:
+                self._generation += 1
+                self._values.clear()
+            time.sleep(1)
+
+
+_pref_cache: Optional[PrefCache] = None
+
+def _get_pref_cache(client) -> PrefCache:
+    global _pref_cache
+    with _client_lock:
+        if _pref_cache is None:
+            _pref_cache = PrefCache(client)
+        return _pref_cache
+
+def get_prefs(defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Read several preferences at once (one MGET for whatever is not cached locally)
+
+    Args:
+        defaults: Preference key -> value returned when the key is not set
+
+    Returns:
+        dict: Preference key -> stored value (or its default)
+    """
     client = get_redis_client()
     if client:
         try:
-            v = client.get(key)
-            if v is None:
-                return default
-            return json.loads(v)
+            cache = _get_pref_cache(client)
+            found, missing = cache.lookup(defaults)
+            if missing:
+                generation = cache.generation
+                fetched = {
+                    key: json.loads(raw) if raw is not None else _ABSENT
+                    for key, raw in zip(missing, client.mget(missing))
+                }
+                cache.store(fetched, generation)
+                found.update(fetched)
+            return {key: default if found[key] is _ABSENT else found[key] for key, default in defaults.items()}
         except Exception:
-            return default
+            return dict(defaults)
     else:
-        data = _read_fallback()
-        return data.get(key, default)
+        data = _pref_file.read()
+        return {key: data.get(key, default) for key, default in defaults.items()}
 
-def set_pref(key, value):
+def set_prefs(values: Dict[str, Any]) -> bool:
+    """
+    Write several preferences in one pipeline and tell every replica to drop its cached copies
+
+    Args:
+        values: Preference key -> JSON-serializable value
+
+    Returns:
+        bool: True if the values were stored
+    """
     client = get_redis_client()
     if client:
         try:
-            client.set(key, json.dumps(value))
+            pipe = client.pipeline()
+            pipe.mset({key: json.dumps(value) for key, value in values.items()})
+            pipe.publish(INVALIDATION_CHANNEL, json.dumps(list(values)))
+            pipe.execute()
+            _get_pref_cache(client).evict(values)
             return True
         except Exception:
             return False
     else:
-        data = _read_fallback()
-        data[key] = value
-        _write_fallback(data)
-        return True
+        try:
+            _pref_file.update(values)
+            return True
+        except OSError:
+            return False
+
+def get_pref(key, default=None):
+    return get_prefs({key: default})[key]
+
+def set_pref(key, value):
+    return set_prefs({key: value})
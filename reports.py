@@ -0,0 +1,405 @@
+"""
+Report Generation for Smart Liquidity Monitor
+PDF report building shared by the Reports page and background jobs, with
+rendered reports cached on disk per member snapshot and report options
+"""
+
+import os
+import glob
+import json
+import zlib
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+from fpdf.php import UTF8ToUTF16BE
+
+from chart_cache import ChartSpec, get_chart_cache
+from liquidityradar.ingest import get_frame_version
+from top_risk import top_risk_members
+from tracing import span, traced
+
+REPORT_CACHE_DIR = os.environ.get(
+    "LR_REPORT_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".cache", "reports")
+)
+REPORT_CACHE_MAX_ENTRIES = int(os.environ.get("LR_REPORT_CACHE_MAX_ENTRIES", 20))
+
+RISK_LEVELS = ("HIGH", "MEDIUM", "LOW")
+
+# Member table layout: (header, width, align)
+_TABLE_COLUMNS = [("Member Name", 60, "L"), ("Cash Buffer", 35, "R"), ("Exposure", 35, "R"),
+                  ("Risk Ratio", 30, "C"), ("Risk Level", 30, "C")]
+_TABLE_CHUNK_ROWS = 2000
+
+
+class _PageBuffer:
+    """Append-only text buffer; FPDF's ``str +=`` page and document buffers are quadratic on big reports"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def __iadd__(self, text: str) -> "_PageBuffer":
+        self.parts.append(text)
+        self.size += len(text)
+        return self
+
+    def __len__(self) -> int:
+        return self.size
+
+    def getvalue(self) -> str:
+        return "".join(self.parts)
+
+
+class _ReportPDF(FPDF):
+    """
+    FPDF that compresses each page as soon as it is finished and repeats the
+    member-table header on every page, so a full-book report keeps only
+    compressed page streams in memory while it is written
+
+    Overrides FPDF 1.7.2's private page methods, so fpdf is pinned to that
+    release; pages still holding the page-count alias are packed in _putpages
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.buffer = _PageBuffer()
+        self.table_header = False
+        self._packed: Dict[int, bytes] = {}
+
+    def header(self):
+        if self.table_header:
+            _table_header(self)
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font('Arial', '', 8)
+        self.set_text_color(100, 100, 100)
+        self.cell(0, 8, f'Page {self.page_no()}', 0, 0, 'C')
+
+    def _beginpage(self, orientation):
+        super()._beginpage(orientation)
+        self.pages[self.page] = _PageBuffer()
+
+    def _endpage(self):
+        super()._endpage()
+        content = self.pages[self.page].getvalue()
+        self.pages[self.page] = ""
+        if self._aliased(content):
+            # The page count is only known in _putpages; keep this page as text until then
+            self._packed[self.page] = content
+            return
+        content = content.encode("latin1")
+        self._packed[self.page] = zlib.compress(content) if self.compress else content
+
+    def _aliased(self, content: str) -> bool:
+        alias = getattr(self, "str_alias_nb_pages", None)
+        return bool(alias) and (alias in content or UTF8ToUTF16BE(alias, False) in content)
+
+    def _page_content(self, n: int, nb: int) -> bytes:
+        content = self._packed.pop(n)
+        if isinstance(content, bytes):
+            return content
+        alias = self.str_alias_nb_pages
+        content = content.replace(UTF8ToUTF16BE(alias, False), UTF8ToUTF16BE(str(nb), False))
+        content = content.replace(alias, str(nb)).encode("latin1")
+        return zlib.compress(content) if self.compress else content
+
+    def _putpages(self):
+        # FPDF 1.7.2's _putpages (pinned in pyproject), reading the page streams packed in _endpage
+        nb = self.page
+        if self.def_orientation == 'P':
+            w_pt, h_pt = self.fw_pt, self.fh_pt
+        else:
+            w_pt, h_pt = self.fh_pt, self.fw_pt
+        stream_filter = "/Filter /FlateDecode " if self.compress else ""
+        for n in range(1, nb + 1):
+            self._newobj()
+            self._out("<</Type /Page")
+            self._out("/Parent 1 0 R")
+            if n in self.orientation_changes:
+                self._out(f"/MediaBox [0 0 {h_pt:.2f} {w_pt:.2f}]")
+            self._out("/Resources 2 0 R")
+            if self.page_links and n in self.page_links:
+                annots = "/Annots ["
+                for x, y, w, h, link in self.page_links[n]:
+                    rect = f"{x:.2f} {y:.2f} {x + w:.2f} {y - h:.2f}"
+                    annots += f"<</Type /Annot /Subtype /Link /Rect [{rect}] /Border [0 0 0] "
+                    if isinstance(link, str):
+                        annots += f"/A <</S /URI /URI {self._textstring(link)}>>>>"
+                    else:
+                        page, top = self.links[link]
+                        page_h = w_pt if page in self.orientation_changes else h_pt
+                        annots += f"/Dest [{1 + 2 * page} 0 R /XYZ 0 {page_h - top * self.k:.2f} null]>>"
+                self._out(annots + "]")
+            if self.pdf_version > "1.3":
+                self._out("/Group <</Type /Group /S /Transparency /CS /DeviceRGB>>")
+            self._out(f"/Contents {self.n + 1} 0 R>>")
+            self._out("endobj")
+            content = self._page_content(n, nb)
+            self._newobj()
+            self._out(f"<<{stream_filter}/Length {len(content)}>>")
+            self._putstream(content)
+            self._out("endobj")
+        self.offsets[1] = len(self.buffer)
+        self._out("1 0 obj")
+        self._out("<</Type /Pages")
+        self._out("/Kids [" + "".join(f"{3 + 2 * i} 0 R " for i in range(nb)) + "]")
+        self._out(f"/Count {nb}")
+        self._out(f"/MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}]")
+        self._out(">>")
+        self._out("endobj")
+
+    def to_bytes(self) -> bytes:
+        if self.state < 3:
+            self.close()
+        return self.buffer.getvalue().encode("latin1")
+
+
+def _table_header(pdf: FPDF) -> None:
+    pdf.set_font('Arial', 'B', 9)
+    pdf.set_fill_color(0, 120, 215)
+    pdf.set_text_color(255, 255, 255)
+    for i, (title, width, _) in enumerate(_TABLE_COLUMNS):
+        pdf.cell(width, 8, title, 1, 1 if i == len(_TABLE_COLUMNS) - 1 else 0, 'C', True)
+    pdf.set_font('Arial', '', 8)
+    pdf.set_text_color(0, 0, 0)
+
+
+def _table_rows(pdf: FPDF, rows: pd.DataFrame, row_height: float, order: Optional[np.ndarray] = None) -> None:
+    """Write member rows (in ``order`` positions if given) chunk by chunk, formatting cells from column arrays"""
+    last = len(_TABLE_COLUMNS) - 1
+    order = np.arange(len(rows)) if order is None else order
+    for start in range(0, len(order), _TABLE_CHUNK_ROWS):
+        chunk = rows.iloc[order[start:start + _TABLE_CHUNK_ROWS]]
+        columns = [
+            [str(name)[:25].encode("latin-1", "replace").decode("latin-1") for name in chunk['name']],
+            [f"${v:,.0f}" for v in chunk['cash_buffer_usd'].to_numpy()],
+            [f"${v:,.0f}" for v in chunk['exposure_usd'].to_numpy()],
+            [f"{v:.2f}" for v in chunk['risk_ratio'].to_numpy()],
+            chunk['risk_level'].astype(str).tolist(),
+        ]
+        for values in zip(*columns):
+            for i, ((_, width, align), value) in enumerate(zip(_TABLE_COLUMNS, values)):
+                pdf.cell(width, row_height, value, 1, 1 if i == last else 0, align)
+
+
+def risk_level_counts(df: pd.DataFrame) -> Dict[str, int]:
+    """Members per risk level (HIGH / MEDIUM / LOW) as produced by calculate_risk_metrics"""
+    counts = df['risk_level'].value_counts()
+    return {level: int(counts.get(level, 0)) for level in RISK_LEVELS}
+
+
+def report_chart_specs(df: pd.DataFrame, forecast_members: int = 3) -> Dict[str, List[ChartSpec]]:
+    """
+    Charts embedded in the report, by section: Monte Carlo stress at 1.0x and 1.5x
+    shocks, and ARIMA forecasts for the riskiest members
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        forecast_members: Riskiest members to chart forecasts for (default: 3)
+
+    Returns:
+        dict: Section title -> chart specs
+    """
+    if df.empty:
+        return {}
+    risk = df[['risk_ratio']]
+    riskiest = top_risk_members(df, forecast_members)
+    return {
+        'Stress Scenarios': [ChartSpec('monte_carlo', risk, shock_multiplier=shock) for shock in (1.0, 1.5)],
+        'Liquidity Outlook (Riskiest Members)': [
+            ChartSpec('forecast', row[['cash_buffer_usd', 'credit_headroom_usd']].astype(float), str(row['name']))
+            for _, row in riskiest.iterrows()
+        ],
+    }
+
+
+@traced("report.pdf", result_attributes=lambda pdf: {"bytes": len(pdf)})
+def build_pdf_report(df: pd.DataFrame, full_book: bool = False, top_n: int = 10, charts: bool = True) -> bytes:
+    """
+    Build the liquidity risk PDF report
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        full_book: Append every member, riskiest first, as a multi-page table (default: False)
+        top_n: Members in the "Top High Risk Members" table (default: 10)
+        charts: Embed Monte Carlo and forecast charts from the chart raster cache (default: True)
+
+    Returns:
+        bytes: PDF document
+    """
+    # Create PDF
+    pdf = _ReportPDF()
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.add_page()
+
+    # Title
+    pdf.set_font('Arial', 'B', 20)
+    pdf.set_text_color(0, 120, 215)
+    pdf.cell(0, 10, 'Smart Liquidity Monitor Report', ln=True, align='C')
+    pdf.ln(5)
+
+    # Timestamp
+    pdf.set_font('Arial', '', 10)
+    pdf.set_text_color(100, 100, 100)
+    pdf.cell(0, 10, f'Generated: {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}', ln=True, align='C')
+    pdf.ln(10)
+
+    # Summary Statistics
+    pdf.set_font('Arial', 'B', 14)
+    pdf.set_text_color(0, 0, 0)
+    pdf.cell(0, 10, 'Executive Summary', ln=True)
+    pdf.ln(3)
+
+    pdf.set_font('Arial', '', 11)
+    total_members = len(df)
+    counts = risk_level_counts(df)
+    high_risk, medium_risk, low_risk = counts['HIGH'], counts['MEDIUM'], counts['LOW']
+
+    def share(n: int) -> float:
+        return n / total_members * 100 if total_members else 0.0
+
+    pdf.cell(0, 8, f'Total Members Monitored: {total_members}', ln=True)
+    pdf.cell(0, 8, f'High Risk Members: {high_risk} ({share(high_risk):.1f}%)', ln=True)
+    pdf.cell(0, 8, f'Medium Risk Members: {medium_risk} ({share(medium_risk):.1f}%)', ln=True)
+    pdf.cell(0, 8, f'Low Risk Members: {low_risk} ({share(low_risk):.1f}%)', ln=True)
+    pdf.ln(10)
+
+    # Top N High Risk Members
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, f'Top {top_n} High Risk Members', ln=True)
+    pdf.ln(3)
+    _table_header(pdf)
+    _table_rows(pdf, top_risk_members(df, top_n), 7)
+    pdf.ln(10)
+
+    # Recommendations
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, 'Key Recommendations', ln=True)
+    pdf.ln(3)
+
+    pdf.set_font('Arial', '', 11)
+    if high_risk > 0:
+        pdf.multi_cell(0, 7, f'- {high_risk} members require immediate attention due to high risk ratios')
+    if medium_risk > 5:
+        pdf.multi_cell(0, 7, f'- Monitor {medium_risk} medium-risk members for potential escalation')
+    pdf.multi_cell(0, 7, '- Consider implementing automated alerts for members crossing risk thresholds')
+    pdf.multi_cell(0, 7, '- Review liquidity policies and credit limits for high-risk members')
+
+    # Charts come from the content-addressed raster cache; only unseen inputs are rendered
+    if charts:
+        sections = report_chart_specs(df)
+        all_specs = [spec for specs in sections.values() for spec in specs]
+        paths = iter(get_chart_cache().render_many(all_specs))
+        for title, specs in sections.items():
+            pdf.add_page()
+            pdf.set_font('Arial', 'B', 14)
+            pdf.set_text_color(0, 0, 0)
+            pdf.cell(0, 10, title, ln=True)
+            pdf.ln(2)
+            for _ in specs:
+                if pdf.get_y() > 180:
+                    pdf.add_page()
+                pdf.image(next(paths), x=15, w=180)
+                pdf.ln(4)
+
+    # Full member book, riskiest first; the column header repeats on every page
+    if full_book:
+        pdf.add_page()
+        pdf.set_font('Arial', 'B', 14)
+        pdf.cell(0, 10, f'Member Book ({total_members} members)', ln=True)
+        pdf.ln(3)
+        _table_header(pdf)
+        pdf.table_header = True
+        order = np.argsort(-df['risk_ratio'].to_numpy(), kind='stable')
+        _table_rows(pdf, df, 6, order)
+        pdf.table_header = False
+
+    return pdf.to_bytes()
+
+
+class ReportCache:
+    """
+    Rendered PDFs on disk, keyed by frame version (snapshot, thresholds, rows) and report options
+
+    Files outlive the process, so every session (and a restarted app) reuses a
+    report already built for the same snapshot; the oldest files are evicted
+    past ``max_entries``.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_entries: int = REPORT_CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(frame_version: str, options: dict) -> str:
+        payload = json.dumps([frame_version, options], sort_keys=True)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, pdf_bytes: bytes) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        with self._lock:
+            paths = sorted(glob.glob(os.path.join(self.directory, "*.pdf")), key=os.path.getmtime)
+            for stale in paths[:max(0, len(paths) - self.max_entries)]:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+
+_report_cache: Optional[ReportCache] = None
+_report_cache_lock = threading.Lock()
+
+
+def get_report_cache() -> ReportCache:
+    """Return the process-wide report cache"""
+    global _report_cache
+    with _report_cache_lock:
+        if _report_cache is None:
+            _report_cache = ReportCache()
+        return _report_cache
+
+
+def render_report(df: pd.DataFrame, full_book: bool = False, top_n: int = 10, charts: bool = True) -> bytes:
+    """
+    Return the PDF report for this member snapshot, building it only on a cache miss
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        full_book: Append the full multi-page member table (default: False)
+        top_n: Members in the "Top High Risk Members" table (default: 10)
+        charts: Embed cached chart images (default: True)
+
+    Returns:
+        bytes: PDF document
+    """
+    cache = get_report_cache()
+    key = cache.make_key(get_frame_version(df), {"full_book": full_book, "top_n": top_n, "charts": charts})
+    with span("report.render", rows=len(df)) as s:
+        pdf_bytes = cache.get(key)
+        s.set(cache_hit=pdf_bytes is not None)
+        if pdf_bytes is None:
+            pdf_bytes = build_pdf_report(df, full_book=full_book, top_n=top_n, charts=charts)
+            cache.set(key, pdf_bytes)
+    return pdf_bytes
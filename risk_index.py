@@ -0,0 +1,246 @@
+"""
+Risk Classification Index for Smart Liquidity Monitor
+Sorted risk-ratio index per member snapshot: HIGH / MEDIUM / LOW labels follow
+the thresholds saved on the Settings page, a threshold change only moves the
+boundaries (searchsorted) and relabels the members that cross them, and
+ratio/level filters resolve to ranges of the sorted permutation
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from redis_cache import get_prefs
+
+# Defaults match the original hard-coded cut-offs: HIGH above 2, MEDIUM above 1
+DEFAULT_THRESHOLDS: Dict[str, float] = {"high_risk_threshold": 2.0, "low_risk_threshold": 1.0}
+
+RISK_LEVELS = ["LOW", "MEDIUM", "HIGH"]  # category order = label code
+RISK_INSIGHTS = ["🟢 Low Risk", "🟡 Medium Risk", "🔴 High Risk"]
+_LOW, _MEDIUM, _HIGH = 0, 1, 2
+
+MAX_INDEXED_SNAPSHOTS = 4
+
+
+def get_risk_thresholds() -> Tuple[float, float]:
+    """
+    Return the persisted (low, high) risk-ratio thresholds
+
+    Returns:
+        tuple: (low, high); a ratio above high is HIGH, above low is MEDIUM, otherwise LOW
+    """
+    prefs = get_prefs(DEFAULT_THRESHOLDS)
+    try:
+        low, high = float(prefs["low_risk_threshold"]), float(prefs["high_risk_threshold"])
+    except (TypeError, ValueError):
+        low, high = DEFAULT_THRESHOLDS["low_risk_threshold"], DEFAULT_THRESHOLDS["high_risk_threshold"]
+    return min(low, high), high
+
+
+def classify_ratios(ratio: np.ndarray, low: float, high: float) -> np.ndarray:
+    """One-off vectorized label codes for frames without a snapshot version (NaN counts as LOW)"""
+    codes = np.full(len(ratio), _LOW, dtype=np.int8)
+    codes[ratio > low] = _MEDIUM
+    codes[ratio > high] = _HIGH
+    return codes
+
+
+class RiskIndex:
+    """
+    Risk ratios of one snapshot sorted once, with label codes kept per threshold pair
+
+    ``order`` is the stable argsort of the ratios (NaN last, always LOW).
+    Members with a ratio <= low are ``order[:low_pos]``, <= high are
+    ``order[:high_pos]``; moving a threshold is a binary search plus a relabel of
+    the members between the old and the new position.
+    """
+
+    def __init__(self, ratio: np.ndarray):
+        ratio = np.asarray(ratio, dtype=float)
+        self.size = len(ratio)
+        self.order = np.argsort(ratio, kind="stable")
+        self.sorted_ratio = ratio[self.order]
+        self.valid = self.size - int(np.isnan(ratio).sum())
+        self.codes = np.full(self.size, _LOW, dtype=np.int8)
+        self.thresholds: Optional[Tuple[float, float]] = None
+        self._low_pos = self._high_pos = self.valid
+        self._lock = threading.Lock()
+
+    def _position(self, threshold: float) -> int:
+        # Members at or below the threshold come before this position
+        return int(np.searchsorted(self.sorted_ratio[:self.valid], threshold, side="right"))
+
+    def _relabel(self, start: int, stop: int, low_pos: int, high_pos: int) -> None:
+        # Recompute the codes of sorted positions [start, stop) for the new boundaries
+        positions = np.arange(start, stop)
+        self.codes[self.order[start:stop]] = np.where(
+            positions < low_pos, _LOW, np.where(positions < high_pos, _MEDIUM, _HIGH))
+
+    def classify(self, low: float, high: float) -> np.ndarray:
+        """
+        Bring the label codes up to date with the thresholds (O(log N + members that change level))
+
+        Args:
+            low: MEDIUM above this ratio
+            high: HIGH above this ratio
+
+        Returns:
+            ndarray: int8 codes into RISK_LEVELS, in snapshot row order (a copy)
+        """
+        with self._lock:
+            if self.thresholds != (low, high):
+                low_pos, high_pos = self._position(low), self._position(high)
+                # Only members between an old and a new boundary change level
+                for old, new in ((self._low_pos, low_pos), (self._high_pos, high_pos)):
+                    self._relabel(min(old, new), max(old, new), low_pos, high_pos)
+                self._low_pos, self._high_pos = low_pos, high_pos
+                self.thresholds = (low, high)
+            return self.codes.copy()
+
+    def counts(self) -> Dict[str, int]:
+        """Members per level for the current thresholds (O(1))"""
+        with self._lock:
+            return {"HIGH": self.valid - self._high_pos,
+                    "MEDIUM": self._high_pos - self._low_pos,
+                    "LOW": self._low_pos + self.size - self.valid}
+
+
+    def level_ranges(self, low: float, high: float) -> Dict[str, Tuple[int, int]]:
+        """Sorted-position range of each level's members for these thresholds (NaN ratios excluded)"""
+        low_pos, high_pos = self._position(low), self._position(high)
+        return {"LOW": (0, low_pos), "MEDIUM": (low_pos, high_pos), "HIGH": (high_pos, self.valid)}
+
+    def level_rows(self, level: str, low: float, high: float) -> np.ndarray:
+        """Row positions of one level's members, ascending by risk ratio (a view, no scan)"""
+        start, stop = self.level_ranges(low, high)[level]
+        return self.order[start:stop]
+
+    def filter(self, min_ratio: float, levels, low: float, high: float) -> "FilterResult":
+        """
+        Members with risk_ratio >= min_ratio in any of ``levels``, as sorted-position ranges
+
+        Every level is a contiguous run of the sorted ratios, so the filter is a
+        few binary searches and range intersections, independent of book size.
+
+        Args:
+            min_ratio: Minimum risk ratio (inclusive)
+            levels: Risk levels to keep
+            low: Threshold the frame was classified with (MEDIUM above it)
+            high: Threshold the frame was classified with (HIGH above it)
+
+        Returns:
+            FilterResult: Matching members, pageable without materializing the full selection
+        """
+        floor = int(np.searchsorted(self.sorted_ratio[:self.valid], min_ratio, side="left"))
+        ranges = []
+        for level, (start, stop) in self.level_ranges(low, high).items():
+            start = max(start, floor)
+            if level in levels and start < stop:
+                ranges.append((start, stop))
+        return FilterResult(self.order, sorted(ranges))
+
+
+class FilterResult:
+    """
+    Disjoint ranges of sorted positions matched by RiskIndex.filter
+
+    ``page`` slices row positions straight out of the index's permutation, so a
+    page costs O(page size) whatever the number of matches.
+    """
+
+    def __init__(self, order: np.ndarray, ranges):
+        self._order = order
+        self.ranges = ranges
+
+    def __len__(self) -> int:
+        return sum(stop - start for start, stop in self.ranges)
+
+    def positions(self) -> np.ndarray:
+        """Row positions of every match, ascending by risk ratio"""
+        parts = [self._order[start:stop] for start, stop in self.ranges]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self._order.dtype)
+
+    def page(self, page: int, page_size: int, descending: bool = True) -> np.ndarray:
+        """
+        Row positions of one page of matches
+
+        Args:
+            page: Zero-based page number
+            page_size: Rows per page
+            descending: Riskiest members first (default: True)
+
+        Returns:
+            ndarray: Row positions into the snapshot frame (use with ``df.iloc``)
+        """
+        skip, parts = page * page_size, []
+        wanted = page_size
+        for start, stop in (reversed(self.ranges) if descending else self.ranges):
+            length = stop - start
+            if skip >= length:
+                skip -= length
+                continue
+            take = min(wanted, length - skip)
+            if descending:
+                parts.append(self._order[stop - skip - take:stop - skip][::-1])
+            else:
+                parts.append(self._order[start + skip:start + skip + take])
+            skip, wanted = 0, wanted - take
+            if not wanted:
+                break
+        return np.concatenate(parts) if parts else np.empty(0, dtype=self._order.dtype)
+
+
+def rows_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Short digest of which rows a frame holds (its index labels)
+
+    Filtered frames and report segments inherit their snapshot's attrs, so caches
+    keyed on the snapshot version also need this to tell them apart.
+
+    Args:
+        df: Member frame
+
+    Returns:
+        str: Range bounds for a RangeIndex, otherwise a hash of the labels
+    """
+    index = df.index
+    if isinstance(index, pd.RangeIndex):
+        return f"{index.start}:{index.stop}:{index.step}"
+    if index.dtype.kind in "iuf":
+        values = index.to_numpy()
+    else:
+        values = pd.util.hash_pandas_object(index, index=False).to_numpy()
+    return hashlib.sha1(np.ascontiguousarray(values).tobytes()).hexdigest()[:16]
+
+
+_indexes: "OrderedDict[Tuple[str, str], RiskIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_risk_index(df: pd.DataFrame) -> Optional[RiskIndex]:
+    """
+    Return the risk index for this frame's snapshot (built on first use), or None if it has no version
+
+    Args:
+        df: Member frame with a risk_ratio column, tagged with its snapshot version
+    """
+    version = df.attrs.get("snapshot_version")
+    if version is None or "risk_ratio" not in df.columns:
+        return None
+    # Rows are part of the key: filtered frames inherit attrs from the snapshot they came from
+    key = (version, rows_fingerprint(df))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+    index = RiskIndex(df["risk_ratio"].to_numpy())
+    with _indexes_lock:
+        index = _indexes.setdefault(key, index)
+        while len(_indexes) > MAX_INDEXED_SNAPSHOTS:
+            _indexes.popitem(last=False)
+    return index
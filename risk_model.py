@@ -0,0 +1,310 @@
+"""
+Online Risk Model for Smart Liquidity Monitor
+Incremental early-warning classifier updated with partial_fit on snapshot batches
+"""
+
+import os
+import copy
+import hashlib
+import glob
+import queue
+import threading
+from typing import List, Optional
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+FEATURES: List[str] = ["cash_buffer_usd", "credit_headroom_usd"]
+CLASSES = np.array(["HIGH", "LOW", "MEDIUM"])
+
+MODEL_DIR = os.environ.get(
+    "LR_MODEL_DIR", os.path.join(os.path.dirname(__file__), ".cache", "models")
+)
+
+
+def label_risk(risk_ratio: np.ndarray) -> np.ndarray:
+    """Map risk ratios to HIGH / MEDIUM / LOW labels (fixed default cut-offs, so training labels stay stable when Settings thresholds change)"""
+    return np.where(risk_ratio > 2, "HIGH", np.where(risk_ratio > 1, "MEDIUM", "LOW"))
+
+
+class OnlineRiskModel:
+    """
+    Early-warning classifier trained incrementally with SGDClassifier.partial_fit
+
+    Exposes the same ``predict_proba`` / ``classes_`` interface as the
+    scikit-learn estimator the Risk Analysis page used before, while new
+    snapshot batches are learned on a background thread. Every accepted update
+    is checkpointed to disk together with the validation reservoir; an update
+    that lowers validation accuracy by more than ``tolerance`` is rolled back.
+    """
+
+    def __init__(self, checkpoint_dir: str = MODEL_DIR, max_batch_rows: int = 5000,
+                 validation_size: int = 2000, tolerance: float = 0.02,
+                 keep_checkpoints: int = 3, random_state: int = 42):
+        self.checkpoint_dir = checkpoint_dir
+        self.max_batch_rows = max_batch_rows
+        self.validation_size = validation_size
+        self.tolerance = tolerance
+        self.keep_checkpoints = keep_checkpoints
+        self._rng = np.random.default_rng(random_state)
+        self._random_state = random_state
+
+        # Published state is swapped as a whole so readers never see a half-trained model
+        self._lock = threading.Lock()
+        self._state = None
+        self._val_X = np.empty((0, len(FEATURES)))
+        self._val_y = np.empty(0, dtype=CLASSES.dtype)
+
+        self._queue: "queue.Queue[pd.DataFrame]" = queue.Queue(maxsize=1)
+        self._worker: Optional[threading.Thread] = None
+        self._last_signature: Optional[str] = None
+        self.rollbacks = 0
+
+        if not self.load_checkpoint():
+            self._bootstrap()
+
+    # ---------- public interface ----------
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self._state["clf"].classes_
+
+    @property
+    def version(self) -> int:
+        return self._state["version"]
+
+    @property
+    def samples_seen(self) -> int:
+        return self._state["samples_seen"]
+
+    @property
+    def validation_score(self) -> Optional[float]:
+        return self._state["score"]
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        """Predict class probabilities with the currently published model"""
+        state = self._state
+        return state["clf"].predict_proba(self._transform(state["scaler"], X))
+
+    def submit_batch(self, df: pd.DataFrame) -> bool:
+        """
+        Queue a snapshot batch for training on the background worker
+
+        A snapshot that was already submitted is ignored, and only the most
+        recent pending batch is kept, so a burst of reruns never builds up a
+        backlog.
+
+        Args:
+            df: DataFrame with cash_buffer_usd and credit_headroom_usd columns
+
+        Returns:
+            bool: True if the batch was queued
+        """
+        if df is None or df.empty or not set(FEATURES).issubset(df.columns):
+            return False
+        batch = df[FEATURES].copy()
+        signature = hashlib.sha1(np.ascontiguousarray(batch.to_numpy(dtype=float)).tobytes()).hexdigest()
+        if signature == self._last_signature:
+            return False
+        self._last_signature = signature
+        try:
+            self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            return False
+        self._ensure_worker()
+        return True
+
+    def partial_fit(self, df: pd.DataFrame) -> bool:
+        """
+        Update the model on one snapshot batch (synchronously)
+
+        Args:
+            df: DataFrame with cash_buffer_usd and credit_headroom_usd columns
+
+        Returns:
+            bool: True if the update was accepted, False if it was rolled back or
+            only refilled an empty validation reservoir
+        """
+        X, y = self._prepare_batch(df)
+        if len(X) == 0:
+            return False
+
+        # Hold out part of every batch for validation (bounded reservoir)
+        n_val = max(1, len(X) // 5)
+        X_val, y_val = X[:n_val], y[:n_val]
+        X_fit, y_fit = X[n_val:], y[n_val:]
+        refilling = len(self._val_y) == 0
+        self._val_X = np.vstack([self._val_X, X_val])[-self.validation_size:]
+        self._val_y = np.concatenate([self._val_y, y_val])[-self.validation_size:]
+        if refilling:
+            # Nothing to judge this batch against but its own holdout; keep it and wait for the next one
+            self.save_checkpoint()
+            return False
+
+        current = self._state
+        candidate = copy.deepcopy(current)
+        if len(X_fit):
+            candidate["scaler"].partial_fit(self._raw_features(X_fit))
+            candidate["clf"].partial_fit(self._transform(candidate["scaler"], X_fit), y_fit, classes=CLASSES)
+            candidate["samples_seen"] += len(X_fit)
+
+        baseline = self._score(current)
+        score = self._score(candidate)
+        if baseline is not None and score < baseline - self.tolerance:
+            self.rollbacks += 1
+            return False
+
+        candidate["version"] += 1
+        candidate["score"] = score
+        self._publish(candidate)
+        self.save_checkpoint()
+        return True
+
+    def rollback(self, steps: int = 1) -> bool:
+        """
+        Restore an earlier checkpoint from disk
+
+        Args:
+            steps: How many checkpoints to go back (default: 1)
+
+        Returns:
+            bool: True if an earlier checkpoint was restored
+        """
+        paths = self._checkpoint_paths()
+        if len(paths) <= steps:
+            return False
+        target = paths[-1 - steps]
+        for path in paths[-steps:]:
+            os.remove(path)
+        state, _ = self._read_checkpoint(target)
+        self._publish(state)
+        self.rollbacks += 1
+        return True
+
+    # ---------- checkpointing ----------
+
+    def save_checkpoint(self) -> str:
+        """Write the published model and the validation reservoir to disk atomically and prune old checkpoints"""
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        state = self._state
+        path = os.path.join(self.checkpoint_dir, f"risk_model_v{state['version']:06d}.joblib")
+        tmp_path = path + ".tmp"
+        joblib.dump(dict(state, val_X=self._val_X, val_y=self._val_y), tmp_path)
+        os.replace(tmp_path, path)
+        for old in self._checkpoint_paths()[:-self.keep_checkpoints]:
+            os.remove(old)
+        return path
+
+    def load_checkpoint(self) -> bool:
+        """
+        Load the latest checkpoint, if any, with its validation reservoir
+
+        Checkpoints written before the reservoir was saved load with an empty
+        one, and the next batch only refills it (see partial_fit).
+        """
+        paths = self._checkpoint_paths()
+        if not paths:
+            return False
+        try:
+            state, (val_X, val_y) = self._read_checkpoint(paths[-1])
+        except Exception:
+            return False
+        self._val_X, self._val_y = val_X, val_y
+        self._publish(state)
+        return True
+
+    # ---------- internals ----------
+
+    def _checkpoint_paths(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.checkpoint_dir, "risk_model_v*.joblib")))
+
+    @staticmethod
+    def _read_checkpoint(path: str):
+        """(model state, (validation X, validation y)) stored in a checkpoint file"""
+        state = joblib.load(path)
+        val_X = state.pop("val_X", np.empty((0, len(FEATURES))))
+        val_y = state.pop("val_y", np.empty(0, dtype=CLASSES.dtype))
+        return state, (val_X, val_y)
+
+    def _publish(self, state: dict) -> None:
+        with self._lock:
+            self._state = state
+
+    def _bootstrap(self) -> None:
+        """Cold start on simulated history, matching the page's original training set"""
+        rng = np.random.default_rng(self._random_state)
+        historical_size = 500
+        cash = rng.uniform(1_000_000, 50_000_000, historical_size)
+        credit = rng.uniform(5_000_000, 100_000_000, historical_size)
+        X = np.column_stack([cash, credit])
+        y = label_risk(credit / cash)
+
+        scaler = StandardScaler().fit(self._raw_features(X))
+        clf = SGDClassifier(loss="log_loss", alpha=1e-4, random_state=self._random_state)
+        Xt = self._transform(scaler, X)
+        for _ in range(20):
+            clf.partial_fit(Xt, y, classes=CLASSES)
+
+        self._val_X, self._val_y = X[:100], y[:100]
+        state = {"clf": clf, "scaler": scaler, "version": 0, "samples_seen": historical_size, "score": None}
+        state["score"] = self._score(state)
+        self._publish(state)
+
+    def _prepare_batch(self, df: pd.DataFrame):
+        """Drop unusable rows and subsample to max_batch_rows so each update is bounded"""
+        X = df[FEATURES].to_numpy(dtype=float)
+        X = X[np.isfinite(X).all(axis=1) & (X[:, 0] > 0)]
+        if len(X) > self.max_batch_rows:
+            X = X[self._rng.choice(len(X), self.max_batch_rows, replace=False)]
+        else:
+            X = X[self._rng.permutation(len(X))]
+        return X, label_risk(X[:, 1] / X[:, 0])
+
+    def _score(self, state: dict) -> Optional[float]:
+        if len(self._val_y) == 0:
+            return None
+        return float(state["clf"].score(self._transform(state["scaler"], self._val_X), self._val_y))
+
+    @staticmethod
+    def _raw_features(X) -> np.ndarray:
+        # Log scale keeps the HIGH/MEDIUM/LOW boundaries (ratio cut-offs) linear
+        return np.log1p(np.clip(np.asarray(X, dtype=float), 0, None))
+
+    def _transform(self, scaler: StandardScaler, X) -> np.ndarray:
+        if isinstance(X, pd.DataFrame):
+            X = X[FEATURES].to_numpy(dtype=float)
+        return scaler.transform(self._raw_features(X))
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_worker, name="risk-model-trainer", daemon=True)
+            self._worker.start()
+
+    def _run_worker(self) -> None:
+        while True:
+            batch = self._queue.get()
+            try:
+                self.partial_fit(batch)
+            except Exception:
+                # A bad batch must never take down the trainer; the published model stays in place
+                pass
+
+
+_model: Optional[OnlineRiskModel] = None
+_model_lock = threading.Lock()
+
+
+def get_risk_model() -> OnlineRiskModel:
+    """Return the process-wide online risk model, loading or bootstrapping it once"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = OnlineRiskModel()
+        return _model
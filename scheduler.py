@@ -0,0 +1,231 @@
+"""
+Report Scheduler for Smart Liquidity Monitor
+Headless batch job that renders the liquidity PDF report for many member
+segments in parallel, e.g. every morning from cron or a scheduled deployment
+
+Usage:
+    python scheduler.py --output-dir reports/daily
+    python scheduler.py --segments segments.json --workers 4 --full-book
+    python scheduler.py --input members.parquet --segment-by region --at 06:30
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from liquidityradar import calculate_risk_metrics, compute_snapshot_version
+from liquidityradar.ingest import load_members as load_book
+from query_engine import QueryEngineError, member_schema, validate_expression
+
+MANIFEST_NAME = "manifest.json"
+
+DEFAULT_SEGMENTS: List[Dict[str, str]] = [
+    {"name": "all-members", "filter": ""},
+    {"name": "high-risk", "filter": "risk_level == 'HIGH'"},
+    {"name": "medium-risk", "filter": "risk_level == 'MEDIUM'"},
+    {"name": "low-risk", "filter": "risk_level == 'LOW'"},
+]
+
+
+def _atomic_write(path: str, payload: bytes) -> None:
+    """Write to a temporary file in the same directory and rename it into place"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _safe_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "-", name).strip("-") or "segment"
+
+
+def load_members(input_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Load the member book from a CSV/Parquet/Arrow file or, by default, from Snowflake
+
+    Args:
+        input_path: Optional member file with the MEMBERS_NEW columns
+
+    Returns:
+        DataFrame: Member data with risk metrics
+    """
+    return calculate_risk_metrics(load_book(input_path))
+
+
+def build_segments(df: pd.DataFrame, specs: List[Dict[str, str]], segment_by: Optional[str] = None) -> Dict[str, pd.DataFrame]:
+    """
+    Split the member book into named segments
+
+    Args:
+        df: Member data with risk metrics
+        specs: [{"name": ..., "filter": DataFrame.query expression or ""}]; filters
+            are checked against the member schema like natural-language filters
+        segment_by: Optional column; adds one segment per distinct value
+
+    Returns:
+        dict: Segment name -> member frame
+
+    Raises:
+        QueryEngineError: If a segment filter is not a valid member filter
+    """
+    schema = member_schema(df)
+    segments: Dict[str, pd.DataFrame] = {}
+    for spec in specs:
+        expression = spec.get("filter", "").strip()
+        if expression:
+            validate_expression(expression, schema)
+            segments[_safe_name(spec["name"])] = df.query(expression)
+        else:
+            segments[_safe_name(spec["name"])] = df
+    if segment_by:
+        for value, group in df.groupby(segment_by, sort=True):
+            segments[_safe_name(f"{segment_by}-{value}")] = group
+    return segments
+
+
+def _render_segment(name: str, segment: pd.DataFrame, output_dir: str, full_book: bool, top_n: int) -> Dict:
+    """Process-pool worker: render one segment's report and write it atomically"""
+    from chart_cache import get_chart_cache
+    from reports import build_pdf_report
+
+    # Already inside a pool worker: render missing charts inline instead of nesting another pool
+    get_chart_cache().workers = 1
+    started = time.perf_counter()
+    pdf_bytes = build_pdf_report(segment, full_book=full_book, top_n=top_n)
+    file_name = f"{name}.pdf"
+    _atomic_write(os.path.join(output_dir, file_name), pdf_bytes)
+    return {
+        "file": file_name,
+        "sha256": hashlib.sha256(pdf_bytes).hexdigest(),
+        "bytes": len(pdf_bytes),
+        "render_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def load_manifest(output_dir: str) -> Dict:
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"segments": {}}
+
+
+def run_batch(df: pd.DataFrame, output_dir: str, specs: List[Dict[str, str]] = DEFAULT_SEGMENTS,
+              segment_by: Optional[str] = None, workers: Optional[int] = None,
+              full_book: bool = False, top_n: int = 10, force: bool = False) -> Dict:
+    """
+    Render every segment whose input changed since the last run and update the manifest
+
+    A segment is skipped when its snapshot version (content hash of its members)
+    and the report options match the previous manifest and its PDF still exists.
+
+    Args:
+        df: Member data with risk metrics
+        output_dir: Directory for the PDFs and manifest.json
+        specs: Segment definitions (default: all members plus one per risk level)
+        segment_by: Optional column to add one segment per distinct value
+        workers: Process pool size (default: CPU count)
+        full_book: Include the full multi-page member table (default: False)
+        top_n: Members in the top-risk table (default: 10)
+        force: Re-render every segment (default: False)
+
+    Returns:
+        dict: The new manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    previous = load_manifest(output_dir).get("segments", {})
+    options = {"full_book": full_book, "top_n": top_n}
+    run_started = time.perf_counter()
+
+    entries: Dict[str, Dict] = {}
+    pending = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for name, segment in build_segments(df, specs, segment_by).items():
+            entry = {"members": len(segment), "snapshot_version": compute_snapshot_version(segment), "options": options}
+            old = previous.get(name, {})
+            unchanged = (old.get("status") in ("rendered", "skipped")
+                         and old.get("snapshot_version") == entry["snapshot_version"]
+                         and old.get("options") == options
+                         and os.path.exists(os.path.join(output_dir, old.get("file", ""))))
+            if unchanged and not force:
+                entries[name] = dict(old, status="skipped", checked_at=datetime.now().isoformat(timespec="seconds"))
+                continue
+            entries[name] = entry
+            pending[pool.submit(_render_segment, name, segment, output_dir, full_book, top_n)] = name
+
+        for future in as_completed(pending):
+            name = pending[future]
+            try:
+                entries[name].update(future.result(), status="rendered",
+                                     rendered_at=datetime.now().isoformat(timespec="seconds"))
+            except Exception as e:
+                entries[name].update(status="failed", error=str(e))
+
+    manifest = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "elapsed_seconds": round(time.perf_counter() - run_started, 3),
+        "source_snapshot_version": compute_snapshot_version(df),
+        "segments": dict(sorted(entries.items())),
+    }
+    _atomic_write(os.path.join(output_dir, MANIFEST_NAME), json.dumps(manifest, indent=2).encode("utf-8"))
+    return manifest
+
+
+def _seconds_until(hhmm: str) -> float:
+    hour, minute = (int(part) for part in hhmm.split(":"))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Render liquidity reports for member segments")
+    parser.add_argument("--output-dir", default=os.environ.get("LR_REPORT_OUTPUT_DIR", "reports"))
+    parser.add_argument("--input", help="CSV/Parquet/Arrow member file instead of Snowflake")
+    parser.add_argument("--segments", help="JSON file with [{\"name\": ..., \"filter\": ...}]")
+    parser.add_argument("--segment-by", help="Column to split into one segment per value")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--full-book", action="store_true")
+    parser.add_argument("--top-n", type=int, default=10)
+    parser.add_argument("--force", action="store_true", help="Re-render unchanged segments too")
+    parser.add_argument("--at", help="Keep running and render daily at HH:MM (local time)")
+    args = parser.parse_args(argv)
+
+    specs = DEFAULT_SEGMENTS
+    if args.segments:
+        with open(args.segments, "r", encoding="utf-8") as f:
+            specs = json.load(f)
+
+    while True:
+        if args.at:
+            time.sleep(_seconds_until(args.at))
+        try:
+            manifest = run_batch(load_members(args.input), args.output_dir, specs, args.segment_by,
+                                 args.workers, args.full_book, args.top_n, args.force)
+        except QueryEngineError as e:
+            print(f"Invalid segment filter: {e}", file=sys.stderr)
+            return 2
+        statuses = [entry["status"] for entry in manifest["segments"].values()]
+        print(f"{manifest['generated_at']}: {statuses.count('rendered')} rendered, "
+              f"{statuses.count('skipped')} unchanged, {statuses.count('failed')} failed "
+              f"in {manifest['elapsed_seconds']:.1f}s -> {args.output_dir}")
+        if not args.at:
+            return 1 if "failed" in statuses else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
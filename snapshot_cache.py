@@ -0,0 +1,236 @@
+"""
+Shared Snapshot Cache for Smart Liquidity Monitor
+Keeps the processed member frame in Redis as compressed Arrow IPC so that, across
+all replicas, only one refreshes it from Snowflake per TTL and the rest load it
+with a single GET
+"""
+
+import os
+import time
+import uuid
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+
+from redis_cache import get_redis_client
+from tracing import span
+
+SNAPSHOT_KEY = os.environ.get("LR_SNAPSHOT_KEY", "members:snapshot")
+SNAPSHOT_TTL = int(os.environ.get("LR_SNAPSHOT_TTL", 300))  # seconds a snapshot counts as fresh
+SNAPSHOT_LEASE = int(os.environ.get("LR_SNAPSHOT_LEASE", 120))  # max seconds one refresh may hold the lease
+SNAPSHOT_COMPRESSION = os.environ.get("LR_SNAPSHOT_COMPRESSION", "zstd")
+
+_VERSION_META = b"snapshot_version"
+_FETCHED_AT_META = b"fetched_at"
+
+
+def encode_snapshot(df: pd.DataFrame, version: str, fetched_at: float) -> bytes:
+    """Serialize a member frame to compressed Arrow IPC, with its version and fetch time in the schema metadata"""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[_VERSION_META] = version.encode("utf-8")
+    metadata[_FETCHED_AT_META] = repr(fetched_at).encode("utf-8")
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=SNAPSHOT_COMPRESSION)
+    with pa.ipc.new_stream(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_snapshot(payload: bytes) -> Tuple[pd.DataFrame, str, float]:
+    """
+    Deserialize a payload written by encode_snapshot
+
+    The Redis reply is wrapped without copying; the only copies are the
+    decompression of each buffer and the conversion to pandas.
+
+    Returns:
+        tuple: (member frame tagged with its snapshot version, version, fetch time)
+    """
+    table = pa.ipc.open_stream(pa.py_buffer(payload)).read_all()
+    metadata = table.schema.metadata or {}
+    version = metadata.get(_VERSION_META, b"").decode("utf-8")
+    fetched_at = float(metadata.get(_FETCHED_AT_META, b"0"))
+    df = table.to_pandas()
+    df.attrs["snapshot_version"] = version
+    return df, version, fetched_at
+
+
+def _stamp(version: str, fetched_at: float) -> bytes:
+    """Version stamp stored next to a payload (fetched_at round-trips exactly through repr)"""
+    return f"{version}@{fetched_at!r}".encode("utf-8")
+
+
+class SnapshotCache:
+    """
+    Member snapshot shared by every replica through Redis
+
+    Keys (under ``key``):
+        ``<key>:data``     compressed Arrow IPC payload (kept for 2 x TTL so it can be served stale)
+        ``<key>:version``  version stamp of the payload (snapshot version and fetch time); a
+                           replica only GETs and decodes the payload when the stamp differs
+                           from the one it decoded last
+        ``<key>:lease``    refresh lease; SET NX with an expiry so a crashed holder cannot wedge it
+
+    When the payload is older than ``ttl`` the replica that wins the lease reloads
+    from the source while the others keep serving the previous snapshot; with no
+    payload at all they wait for the winner (up to the lease) instead of all
+    hitting Snowflake. Without Redis, or on any Redis error, the loader is called
+    directly.
+    """
+
+    def __init__(self, key: str = SNAPSHOT_KEY, ttl: int = SNAPSHOT_TTL, lease: int = SNAPSHOT_LEASE,
+                 poll_interval: float = 0.2):
+        self.key = key
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "refreshes": 0, "waits": 0, "fallbacks": 0, "decodes": 0}
+        self._local: Optional[Tuple[bytes, Tuple[pd.DataFrame, str, float]]] = None  # (stamp, decoded payload)
+
+    @property
+    def data_key(self) -> str:
+        return f"{self.key}:data"
+
+    @property
+    def version_key(self) -> str:
+        return f"{self.key}:version"
+
+    @property
+    def lease_key(self) -> str:
+        return f"{self.key}:lease"
+
+    def load(self, loader: Callable[[], Optional[pd.DataFrame]]) -> Optional[pd.DataFrame]:
+        """
+        Return the shared member snapshot, refreshing it with ``loader`` if this replica wins the lease
+
+        Args:
+            loader: Loads the member frame from the source (returns None if unavailable)
+
+        Returns:
+            DataFrame: Member data tagged with its snapshot version, or None
+        """
+        client = get_redis_client()
+        if client is None:
+            return loader()
+        with span("snapshot_cache.load") as s:
+            df = self._load_shared(client, loader, s)
+            s.set(rows=len(df) if df is not None else 0)
+        return df
+
+    def _load_shared(self, client, loader, s):
+        loader_called = False
+
+        def tracked_loader():
+            nonlocal loader_called
+            loader_called = True
+            return loader()
+
+        try:
+            return self._load(client, tracked_loader, s)
+        except Exception:
+            if loader_called:
+                raise  # A source error, not a Redis one: do not query the source twice
+            self._count("fallbacks")
+            return loader()
+
+    def stats(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    # ---------- internals ----------
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def _load(self, client, loader, s):
+        deadline = time.monotonic() + self.lease
+        while True:
+            cached = self._read(client, s)
+            if cached is not None and time.time() - cached[2] < self.ttl:
+                self._count("hits")
+                s.set(cache_hit=True)
+                return cached[0]
+            s.set(cache_hit=False)
+
+            token = uuid.uuid4().hex
+            if client.set(self.lease_key, token, nx=True, ex=self.lease):
+                try:
+                    return self._refresh(client, loader, cached)
+                finally:
+                    self._release(client, token)
+
+            if cached is not None:
+                # Someone else is refreshing: serve the previous snapshot meanwhile
+                self._count("stale_hits")
+                return cached[0]
+            if time.monotonic() >= deadline:
+                self._count("fallbacks")
+                return loader()
+            self._count("waits")
+            time.sleep(self.poll_interval)
+
+    def _read(self, client, s) -> Optional[Tuple[pd.DataFrame, str, float]]:
+        """The shared snapshot, reusing this replica's last decoded frame while the version stamp is unchanged"""
+        stamp = client.get(self.version_key)
+        local = self._local
+        if stamp is not None and local is not None and stamp == local[0]:
+            s.set(bytes=0)
+            df, version, fetched_at = local[1]
+            return df.copy(deep=False), version, fetched_at
+        payload = client.get(self.data_key)
+        s.set(bytes=len(payload) if payload is not None else 0)
+        if payload is None:
+            return None
+        cached = decode_snapshot(payload)
+        self._count("decodes")
+        self._local = (_stamp(cached[1], cached[2]), cached)
+        return cached[0].copy(deep=False), cached[1], cached[2]
+
+    def _refresh(self, client, loader, cached):
+        df = loader()
+        if df is None:
+            return cached[0] if cached is not None else None
+        self._count("refreshes")
+        version = df.attrs.get("snapshot_version") or ""
+        fetched_at = time.time()
+        try:
+            payload = encode_snapshot(df, version, fetched_at)
+            pipe = client.pipeline()
+            pipe.set(self.data_key, payload, ex=2 * self.ttl)
+            pipe.set(self.version_key, _stamp(version, fetched_at), ex=2 * self.ttl)
+            pipe.execute()
+        except Exception:
+            return df  # Still serve the fresh frame; the next replica will retry the refresh
+        self._local = (_stamp(version, fetched_at), (df.copy(deep=False), version, fetched_at))
+        return df
+
+    def _release(self, client, token: str) -> None:
+        # Delete the lease only if it is still ours (it may have expired and been re-taken)
+        with client.pipeline() as pipe:
+            try:
+                pipe.watch(self.lease_key)
+                if pipe.get(self.lease_key) == token.encode("utf-8"):
+                    pipe.multi()
+                    pipe.delete(self.lease_key)
+                    pipe.execute()
+            except Exception:
+                pass  # Expires on its own
+
+
+_snapshot_cache: Optional[SnapshotCache] = None
+_snapshot_cache_lock = threading.Lock()
+
+
+def get_snapshot_cache() -> SnapshotCache:
+    """Return the process-wide snapshot cache"""
+    global _snapshot_cache
+    with _snapshot_cache_lock:
+        if _snapshot_cache is None:
+            _snapshot_cache = SnapshotCache()
+        return _snapshot_cache
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Spans from the modules under test are not exported to the repo's .cache
+os.environ.setdefault("LR_TRACING", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
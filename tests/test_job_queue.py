@@ -0,0 +1,123 @@
+"""Background job queue: failures, cancellation and the Redis store"""
+
+import json
+import pickle
+import threading
+import time
+
+import fakeredis
+import numpy as np
+import pandas as pd
+
+from ai_utils import stream_ai_response
+from job_queue import Job, JobQueue, RedisJobStore
+from visualizations import render_liquidity_forecast
+
+
+def wait(queue: JobQueue, job_id: str, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while not queue.get(job_id).done:
+        assert time.monotonic() < deadline, "job did not finish"
+        time.sleep(0.01)
+    return queue.get(job_id)
+
+
+def test_streaming_ai_job_without_api_key_fails_with_the_reason(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    queue = JobQueue(workers=1)
+
+    job = wait(queue, queue.submit(stream_ai_response, "hello", use_cache=False, raise_errors=True))
+    assert job.status == "failed"
+    assert "GEMINI_API_KEY" in job.error
+
+
+def test_running_job_that_cannot_stop_is_not_reported_cancelled():
+    release = threading.Event()
+    queue = JobQueue(workers=1)
+    job_id = queue.submit(release.wait, 5)
+    while queue.get(job_id).status != "running":
+        time.sleep(0.01)
+
+    assert queue.cancel(job_id) is False
+    release.set()
+    job = wait(queue, job_id)
+    assert job.status == "done" and job.result is True
+
+
+def test_streaming_and_queued_jobs_are_cancelled():
+    release = threading.Event()
+
+    def chunks():
+        yield "first"
+        release.wait(5)
+        yield "second"
+
+    queue = JobQueue(workers=1)
+    streaming_id = queue.submit(chunks)
+    queued_id = queue.submit(time.sleep, 0)
+    while not queue.get(streaming_id).partial:
+        time.sleep(0.01)
+
+    assert queue.cancel(queued_id) is True
+    assert queue.cancel(streaming_id) is True
+    release.set()
+    assert wait(queue, streaming_id).status == "cancelled"
+    assert wait(queue, queued_id).status == "cancelled"
+
+
+def test_cancel_after_the_last_chunk_still_cancels():
+    queue = JobQueue(workers=1)
+    release = threading.Event()
+
+    def one_chunk():
+        yield "only"
+        release.wait(5)
+
+    job_id = queue.submit(one_chunk)
+    while not queue.get(job_id).partial:
+        time.sleep(0.01)
+    assert queue.cancel(job_id) is True
+    release.set()
+    assert wait(queue, job_id).status == "cancelled"
+
+
+def test_redis_store_keeps_results_as_json():
+    client = fakeredis.FakeRedis()
+    store = RedisJobStore(client)
+    scored = pd.DataFrame({"name": ["A", "B"], "AI_Confidence": [0.5, np.nan]})
+    job = Job("scoring", "ai_scoring.score_members", ttl=60)
+    job.status, job.result, job.finished_at = "done", (scored, {"scored": np.int64(1)}), time.time()
+    store.save(job)
+
+    raw = client.get("jobs:scoring")
+    assert json.loads(raw)["status"] == "done"
+    frame, stats = store.load("scoring").result
+    pd.testing.assert_frame_equal(frame, scored)
+    assert stats == {"scored": 1}
+
+
+def test_redis_store_round_trips_resumable_specs():
+    client = fakeredis.FakeRedis()
+    store = RedisJobStore(client)
+    member = pd.Series({"name": "Member 1", "cash_buffer_usd": 1.5e6}, name=7)
+
+    store.save_spec("forecast", render_liquidity_forecast, (member, "Member 1"), {}, 60)
+    store.save_spec("adhoc", time.sleep, (1,), {}, 60)
+
+    specs = dict(store.orphaned_specs())
+    assert list(specs) == ["forecast"]
+    resumed_member, name = specs["forecast"]["args"]
+    pd.testing.assert_series_equal(resumed_member, member.astype(object))
+    assert name == "Member 1"
+
+
+def test_resume_ignores_functions_outside_the_allow_list():
+    client = fakeredis.FakeRedis()
+    client.set("jobs:evil:spec", json.dumps({"fn": "os.system", "args": ["true"], "kwargs": {}, "ttl": 60}))
+    client.set("jobs:legacy:spec", pickle.dumps({"fn": "os.system", "args": ("true",), "kwargs": {}, "ttl": 60}))
+    client.sadd("jobs:pending", "evil", "legacy")
+    queue = JobQueue(workers=1, store=RedisJobStore(client))
+
+    assert queue.resume_pending() == []
+    assert client.smembers("jobs:pending") == set()
+    assert not client.exists("jobs:evil:spec") and not client.exists("jobs:legacy:spec")
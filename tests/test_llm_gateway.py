@@ -0,0 +1,197 @@
+"""LLM gateway behaviour against the local stub Gemini server"""
+
+import time
+import threading
+
+import pytest
+from google import genai
+from google.genai import types
+
+import llm_gateway
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+from llm_stub import StubGeminiServer
+
+
+@pytest.fixture
+def stub():
+    with StubGeminiServer(seed=1) as server:
+        yield server
+
+
+def make_gateway(server: StubGeminiServer, **kwargs) -> LLMGateway:
+    options = dict(rate_per_sec=1000, burst=1000, base_backoff=0.01, max_backoff=0.05, deadline=10)
+    options.update(kwargs)
+    return LLMGateway(
+        client_factory=lambda: genai.Client(api_key="test", http_options=types.HttpOptions(base_url=server.base_url)),
+        **options,
+    )
+
+
+def run_concurrently(fn, count: int) -> list:
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_identical_concurrent_calls_are_coalesced(stub):
+    stub.latency = 0.3
+    gateway = make_gateway(stub)
+
+    results = run_concurrently(lambda i: gateway.generate("gemini-2.5-flash", "same prompt"), 8)
+
+    assert stub.requests == 1
+    assert len(set(results)) == 1 and results[0].startswith("[stub:gemini-2.5-flash]")
+    stats = gateway.stats()
+    assert stats["upstream_calls"] == 1
+    assert stats["coalesced"] == 7
+
+
+def test_distinct_calls_are_not_coalesced(stub):
+    gateway = make_gateway(stub)
+
+    run_concurrently(lambda i: gateway.generate("gemini-2.5-flash", f"prompt {i}"), 4)
+
+    assert stub.requests == 4
+    assert gateway.stats()["coalesced"] == 0
+
+
+def test_token_bucket_limits_the_request_rate(stub):
+    gateway = make_gateway(stub, rate_per_sec=10, burst=2)
+
+    started = time.monotonic()
+    run_concurrently(lambda i: gateway.generate("gemini-2.5-flash", f"prompt {i}"), 7)
+    elapsed = time.monotonic() - started
+
+    # 2 calls pass on the burst, the other 5 wait for tokens refilled at 10 per second
+    assert stub.requests == 7
+    assert elapsed >= 0.45
+
+
+def test_circuit_breaker_opens_after_repeated_failures(stub):
+    stub.error_rate = 1.0
+    gateway = make_gateway(stub, max_retries=1, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    for i in range(3):
+        with pytest.raises(Exception) as raised:
+            gateway.generate("gemini-2.5-flash", f"prompt {i}")
+        assert not isinstance(raised.value, CircuitOpenError)
+    assert gateway.breaker_state == CircuitBreaker.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        gateway.generate("gemini-2.5-flash", "shed")
+    assert stub.requests == 3
+    assert gateway.stats()["shed"] == 1
+
+
+def test_half_open_probe_closes_the_circuit(stub):
+    stub.error_rate = 1.0
+    gateway = make_gateway(stub, max_retries=1, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+    for i in range(2):
+        with pytest.raises(Exception):
+            gateway.generate("gemini-2.5-flash", f"prompt {i}")
+    assert gateway.breaker_state == CircuitBreaker.OPEN
+
+    stub.error_rate = 0.0
+    time.sleep(0.25)
+    assert gateway.generate("gemini-2.5-flash", "probe")
+    assert gateway.breaker_state == CircuitBreaker.CLOSED
+
+
+def test_hedged_request_is_sent_when_the_first_is_slow(stub):
+    calls = []
+
+    def first_call_slow(model, prompt):
+        calls.append(prompt)
+        if len(calls) == 1:
+            time.sleep(2.0)
+        return f"answer {len(calls)}"
+
+    stub.responder = first_call_slow
+    gateway = make_gateway(stub)
+
+    started = time.monotonic()
+    text = gateway.generate("gemini-2.5-flash", "hedge me", hedge_after=0.2)
+    elapsed = time.monotonic() - started
+
+    assert text == "answer 2"
+    assert elapsed < 1.5
+    stats = gateway.stats()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+
+def test_fast_response_sends_no_hedge(stub):
+    gateway = make_gateway(stub)
+
+    gateway.generate("gemini-2.5-flash", "quick", hedge_after=0.5)
+    time.sleep(0.6)
+
+    assert stub.requests == 1
+    assert gateway.stats()["hedges"] == 0
+
+
+def test_retry_backoff_does_not_hold_a_concurrency_slot(stub, monkeypatch):
+    monkeypatch.setattr(llm_gateway.random, "uniform", lambda low, high: high)
+    stub.error_rate = 1.0
+    gateway = make_gateway(stub, max_concurrency=1, max_retries=2, base_backoff=1.5, max_backoff=1.5)
+
+    retried = []
+    failing = threading.Thread(target=lambda: retried.append(gateway.generate("gemini-2.5-flash", "retried")))
+    failing.start()
+    while stub.errors == 0:
+        time.sleep(0.01)
+    stub.error_rate = 0.0
+
+    # The retrying call is sleeping in its backoff; the single slot must be free meanwhile
+    started = time.monotonic()
+    assert gateway.generate("gemini-2.5-flash", "other caller")
+    assert time.monotonic() - started < 1.0
+    failing.join()
+    assert retried and gateway.stats()["retries"] == 1
+
+
+def test_stream_yields_chunks_in_order(stub):
+    gateway = make_gateway(stub)
+    stub.responder = lambda model, prompt: "alpha beta gamma"
+
+    assert "".join(gateway.stream("gemini-2.5-flash", "stream me")) == "alpha beta gamma"
+
+
+def test_stream_deadline_applies_per_chunk_not_to_the_whole_stream(stub):
+    gateway = make_gateway(stub, deadline=0.6)
+    stub.responder = lambda model, prompt: "one two three four five six"
+    stub.chunk_delay = 0.25
+
+    started = time.monotonic()
+    assert "".join(gateway.stream("gemini-2.5-flash", "long report")) == "one two three four five six"
+    assert time.monotonic() - started > 0.6
+
+
+def test_stream_stalled_between_chunks_exceeds_the_deadline(stub):
+    gateway = make_gateway(stub, deadline=0.3)
+    stub.responder = lambda model, prompt: "one two"
+    stub.chunk_delay = 1.0
+
+    received = []
+    with pytest.raises(llm_gateway.DeadlineExceededError, match="next chunk"):
+        for chunk in gateway.stream("gemini-2.5-flash", "stalls"):
+            received.append(chunk)
+    assert received == ["one "]
+
+
+def test_stream_without_a_first_chunk_exceeds_the_deadline(stub):
+    gateway = make_gateway(stub, deadline=0.3)
+    stub.latency = 1.0
+
+    with pytest.raises(llm_gateway.DeadlineExceededError, match="first chunk"):
+        list(gateway.stream("gemini-2.5-flash", "slow start"))
@@ -0,0 +1,75 @@
+"""Latency-aware model routing: demotion, probes and recovery"""
+
+import time
+
+import pytest
+
+from llm_gateway import LatencyHistogram
+from llm_router import FEATURE_TIERS, LATENCY_BUDGETS, MODEL_TIERS, TIER_MAX_PROMPT_TOKENS, ModelRouter
+
+
+class HistogramGateway:
+    """Only the latency histograms of an LLMGateway, which is all the router reads"""
+
+    def __init__(self, half_life: float):
+        self.half_life = half_life
+        self._histograms = {}
+
+    def latency_histogram(self, model, kind="generate"):
+        return self._histograms.setdefault((model, kind), LatencyHistogram(half_life=self.half_life))
+
+
+def record(gateway, tier, seconds, count):
+    for _ in range(count):
+        gateway.latency_histogram(MODEL_TIERS[tier]).record(seconds)
+
+
+@pytest.fixture
+def deep_aquamind(monkeypatch):
+    """AquaMind opted into the deep tier, as with LR_LLM_AQUAMIND_TIER=deep"""
+    monkeypatch.setitem(FEATURE_TIERS, "aquamind", "deep")
+
+
+def test_aquamind_stays_on_standard_unless_the_prompt_outgrows_it():
+    router = ModelRouter(HistogramGateway(half_life=300), probe_share=0.0)
+
+    assert router.route("report", "aquamind").tier == "standard"
+    long_prompt = "liquidity " * (TIER_MAX_PROMPT_TOKENS["standard"] * 2)
+    route = router.route(long_prompt, "aquamind")
+    assert route.tier == "deep" and route.reason.startswith("prompt ~")
+
+
+def test_slow_tier_is_demoted_and_probed(deep_aquamind):
+    gateway = HistogramGateway(half_life=300)
+    record(gateway, "deep", LATENCY_BUDGETS["aquamind"] * 2, 30)
+
+    assert ModelRouter(gateway, probe_share=0.0).route("report", "aquamind").tier == "standard"
+    probe = ModelRouter(gateway, probe_share=1.0).route("report", "aquamind")
+    assert probe.tier == "deep" and probe.reason.startswith("latency probe")
+    assert ModelRouter(gateway, probe_share=1.0).route("report", "aquamind", probe=False).tier == "standard"
+
+
+def test_demoted_tier_recovers_when_its_samples_age_out(deep_aquamind):
+    gateway = HistogramGateway(half_life=0.05)
+    record(gateway, "deep", LATENCY_BUDGETS["aquamind"] * 2, 30)
+    router = ModelRouter(gateway, probe_share=0.0)
+    assert router.route("report", "aquamind").tier == "standard"
+
+    time.sleep(0.5)
+
+    route = router.route("report", "aquamind")
+    assert route.tier == "deep" and route.reason == "feature default"
+
+
+def test_demoted_tier_recovers_from_fast_probe_samples(deep_aquamind):
+    gateway = HistogramGateway(half_life=0.2)
+    record(gateway, "deep", LATENCY_BUDGETS["aquamind"] * 2, 30)
+    router = ModelRouter(gateway, probe_share=0.0)
+    assert router.route("report", "aquamind").tier == "standard"
+
+    # Probes keep measuring the slow model; its old samples decay while the fast ones accumulate
+    for _ in range(10):
+        time.sleep(0.1)
+        record(gateway, "deep", 1.0, 10)
+
+    assert router.route("report", "aquamind").tier == "deep"
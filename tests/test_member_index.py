@@ -0,0 +1,51 @@
+"""Member retrieval: fuzzy name matching and filters on named members"""
+
+import numpy as np
+import pandas as pd
+
+from liquidityradar.ingest import normalize_members
+from liquidityradar.metrics import calculate_risk_metrics
+from member_index import MemberIndex
+
+
+def book(count: int = 2000) -> MemberIndex:
+    rng = np.random.default_rng(3)
+    names = [f"Member {i}" for i in range(count)]
+    names[7] = "Northwind Clearing"
+    df = pd.DataFrame({
+        "NAME": names,
+        "CASH_BUFFER_USD": rng.uniform(1e5, 1e7, count),
+        "EXPOSURE_USD": rng.uniform(1e5, 2e7, count),
+    })
+    index = MemberIndex()
+    index.refresh(calculate_risk_metrics(normalize_members(df), thresholds=(0.5, 1.5)), "v1")
+    return index
+
+
+def test_misspelled_common_word_with_number_finds_the_member():
+    index = book()
+
+    assert index.match_names("Membr 1234 status") == [1234]
+    assert list(index.search("Membr 1234 status")["name"])[0] == "Member 1234"
+
+
+def test_misspelled_common_word_alone_does_not_match_every_member():
+    index = book()
+
+    assert index.match_names("how is membr doing") == []
+    riskiest = index._frame["risk_ratio"].nlargest(5).index
+    assert list(index.search("how is membr doing").index) == list(riskiest)
+
+
+def test_rare_name_token_matches_fuzzily():
+    assert book().match_names("any news on northwnd") == [7]
+
+
+def test_named_members_go_through_the_filters():
+    index = book()
+    frame = index._frame
+    low = frame.index[frame["risk_level"] == "LOW"][0]
+
+    result = index.search(f"high risk {frame.at[low, 'name']} with cash below 5m")
+    assert low not in result.index
+    assert (result["risk_level"] == "HIGH").all() and (result["cash_buffer_usd"] < 5e6).all()
@@ -0,0 +1,93 @@
+"""PDF reports: _ReportPDF against stock FPDF 1.7.2 and full-book output structure"""
+
+import re
+import zlib
+
+import numpy as np
+import pandas as pd
+from fpdf import FPDF
+
+import reports
+from liquidityradar.ingest import normalize_members
+from liquidityradar.metrics import calculate_risk_metrics
+
+
+def objects(pdf: bytes) -> dict:
+    """Object number -> body, after checking every xref offset points at its object"""
+    start = int(re.search(rb"startxref\s+(\d+)", pdf).group(1))
+    xref = pdf[start:]
+    assert xref.startswith(b"xref")
+    count = int(re.match(rb"xref\s+0 (\d+)", xref).group(1))
+    offsets = [int(m) for m in re.findall(rb"(\d{10}) 00000 n ", xref)]
+    assert len(offsets) == count - 1
+    found = {}
+    for number, offset in enumerate(offsets, start=1):
+        assert pdf[offset:].startswith(b"%d 0 obj" % number)
+        found[number] = pdf[offset:pdf.index(b"endobj", offset)]
+    return found
+
+
+def pages(pdf: bytes) -> list:
+    """(page dict, inflated content stream) for each page, in /Kids order"""
+    objs = objects(pdf)
+    kids = [int(k) for k in re.findall(rb"(\d+) 0 R", re.search(rb"/Kids \[([^\]]*)\]", objs[1]).group(1))]
+    count = int(re.search(rb"/Count (\d+)", objs[1]).group(1))
+    assert len(kids) == count
+    result = []
+    for kid in kids:
+        contents = int(re.search(rb"/Contents (\d+) 0 R", objs[kid]).group(1))
+        body = objs[contents]
+        stream = body[body.index(b"stream") + len(b"stream\n"):body.rindex(b"endstream")].rstrip(b"\n")
+        result.append((objs[kid], zlib.decompress(stream)))
+    return result
+
+
+class StockPDF(FPDF):
+    """Stock FPDF 1.7.2 page handling with the report's page footer"""
+
+    footer = reports._ReportPDF.footer
+
+
+def write_document(pdf: FPDF) -> bytes:
+    pdf.alias_nb_pages()
+    pdf.set_font("Arial", "", 12)
+    pdf.add_page()
+    target = pdf.add_link()
+    pdf.cell(0, 10, "Page {nb} total", ln=True, link="https://example.com")
+    pdf.cell(0, 10, "Jump to the landscape page", ln=True, link=target)
+    pdf.add_page("L")
+    pdf.set_link(target, y=20)
+    pdf.cell(0, 10, "Landscape of {nb}", ln=True)
+    pdf.add_page()
+    pdf.cell(0, 10, "No alias here", ln=True)
+    return pdf.to_bytes() if isinstance(pdf, reports._ReportPDF) else pdf.output(dest="S").encode("latin1")
+
+
+def members(count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "NAME": [f"Member {i}" for i in range(count)],
+        "CASH_BUFFER_USD": rng.uniform(1e5, 1e7, count),
+        "EXPOSURE_USD": rng.uniform(1e5, 2e7, count),
+    })
+    return calculate_risk_metrics(normalize_members(df), thresholds=(0.5, 1.5))
+
+
+def test_report_pdf_matches_stock_fpdf_pages():
+    stock, packed = pages(write_document(StockPDF())), pages(write_document(reports._ReportPDF()))
+
+    assert packed == stock and len(packed) == 3
+    assert b"/Annots" in packed[0][0] and b"/URI" in packed[0][0] and b"/Dest" in packed[0][0]
+    assert b"/MediaBox" in packed[1][0]
+    assert b"(Page 3 total)" in packed[0][1] and b"(Landscape of 3)" in packed[1][1]
+    assert b"{nb}" not in packed[0][1] + packed[1][1]
+
+
+def test_full_book_report_opens_with_every_page():
+    pdf = reports.build_pdf_report(members(600), full_book=True, charts=False)
+
+    assert pdf.startswith(b"%PDF-") and pdf.rstrip().endswith(b"%%EOF")
+    report_pages = pages(pdf)
+    assert len(report_pages) > 10
+    for number, (_, content) in enumerate(report_pages, start=1):
+        assert b"(Page %d)" % number in content
@@ -0,0 +1,45 @@
+"""Online risk model: checkpoints keep the validation reservoir across restarts"""
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from risk_model import OnlineRiskModel
+
+
+def batch(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "cash_buffer_usd": rng.uniform(1e6, 5e7, rows),
+        "credit_headroom_usd": rng.uniform(5e6, 1e8, rows),
+    })
+
+
+def test_restart_restores_the_validation_reservoir(tmp_path):
+    model = OnlineRiskModel(checkpoint_dir=str(tmp_path))
+    assert model.partial_fit(batch(1000, seed=1))
+
+    restarted = OnlineRiskModel(checkpoint_dir=str(tmp_path))
+    assert restarted.version == model.version
+    np.testing.assert_array_equal(restarted._val_X, model._val_X)
+    np.testing.assert_array_equal(restarted._val_y, model._val_y)
+    assert restarted._score(restarted._state) == model.validation_score
+
+
+def test_checkpoint_without_reservoir_refills_before_updating(tmp_path):
+    model = OnlineRiskModel(checkpoint_dir=str(tmp_path))
+    assert model.partial_fit(batch(1000, seed=1))
+    path = model._checkpoint_paths()[-1]
+    legacy = joblib.load(path)
+    del legacy["val_X"], legacy["val_y"]
+    joblib.dump(legacy, path)
+
+    restarted = OnlineRiskModel(checkpoint_dir=str(tmp_path))
+    assert len(restarted._val_y) == 0
+    assert not restarted.partial_fit(batch(1000, seed=2))
+    assert restarted.version == model.version and len(restarted._val_y) == 200
+
+    # The refilled reservoir is checkpointed, so the next batch is judged against it
+    reloaded = OnlineRiskModel(checkpoint_dir=str(tmp_path))
+    np.testing.assert_array_equal(reloaded._val_X, restarted._val_X)
+    assert reloaded.partial_fit(batch(1000, seed=3)) or reloaded.rollbacks == 1
@@ -0,0 +1,209 @@
+"""Shared member snapshot across replicas, against fakeredis"""
+
+import time
+import threading
+
+import fakeredis
+import pandas as pd
+import pytest
+
+import snapshot_cache
+from snapshot_cache import SnapshotCache, encode_snapshot
+
+
+def member_frame(version: str = "v1", rows: int = 100) -> pd.DataFrame:
+    df = pd.DataFrame({
+        "member_id": range(rows),
+        "name": [f"Member {i}" for i in range(rows)],
+        "cash_buffer_usd": [1e6 + i for i in range(rows)],
+        "credit_headroom_usd": [2e6 + i for i in range(rows)],
+    })
+    df.attrs["snapshot_version"] = version
+    return df
+
+
+class CountingLoader:
+    """Stands in for the Snowflake query: counts calls and can be slow"""
+
+    def __init__(self, delay: float = 0.0, version: str = "v1"):
+        self.delay = delay
+        self.version = version
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self) -> pd.DataFrame:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return member_frame(self.version)
+
+
+class Replica:
+    """One app replica: its own Redis connection and snapshot cache"""
+
+    def __init__(self, server: fakeredis.FakeServer, **kwargs):
+        self.client = fakeredis.FakeRedis(server=server)
+        options = dict(key="test:snapshot", ttl=60, lease=5, poll_interval=0.02)
+        options.update(kwargs)
+        self.cache = SnapshotCache(**options)
+
+    def load(self, loader):
+        return self.cache._load_shared(self.client, loader, _NoSpan())
+
+
+class _NoSpan:
+    def set(self, **attrs):
+        pass
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+def test_concurrent_replicas_load_from_the_source_once(server):
+    loader = CountingLoader(delay=0.3)
+    replicas = [Replica(server) for _ in range(8)]
+    results = [None] * len(replicas)
+    barrier = threading.Barrier(len(replicas))
+
+    def run(i):
+        barrier.wait()
+        results[i] = replicas[i].load(loader)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(replicas))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert loader.calls == 1
+    for df in results:
+        pd.testing.assert_frame_equal(df, member_frame())
+        assert df.attrs["snapshot_version"] == "v1"
+    assert sum(r.cache.stats()["refreshes"] for r in replicas) == 1
+    assert sum(r.cache.stats()["waits"] for r in replicas) > 0
+    assert sum(r.cache.stats()["fallbacks"] for r in replicas) == 0
+
+
+def test_fresh_snapshot_is_served_without_the_source(server):
+    Replica(server).load(CountingLoader())
+    loader = CountingLoader()
+    replica = Replica(server)
+
+    df = replica.load(loader)
+
+    assert loader.calls == 0
+    assert replica.cache.stats()["hits"] == 1
+    pd.testing.assert_frame_equal(df, member_frame())
+
+
+def test_stale_snapshot_is_served_while_another_replica_holds_the_lease(server):
+    replica = Replica(server)
+    replica.client.set(replica.cache.data_key, encode_snapshot(member_frame("old"), "old", time.time() - 3600))
+    replica.client.set(replica.cache.lease_key, "other-replica", ex=30)
+    loader = CountingLoader(version="new")
+
+    df = replica.load(loader)
+
+    assert loader.calls == 0
+    assert df.attrs["snapshot_version"] == "old"
+    assert replica.cache.stats()["stale_hits"] == 1
+
+
+def test_stale_snapshot_is_refreshed_by_the_lease_winner(server):
+    replica = Replica(server)
+    replica.client.set(replica.cache.data_key, encode_snapshot(member_frame("old"), "old", time.time() - 3600))
+    loader = CountingLoader(version="new")
+
+    df = replica.load(loader)
+
+    assert loader.calls == 1
+    assert df.attrs["snapshot_version"] == "new"
+    assert Replica(server).load(CountingLoader()).attrs["snapshot_version"] == "new"
+
+
+def test_expired_lease_of_a_crashed_holder_is_taken_over(server):
+    replica = Replica(server, lease=3)
+    replica.client.set(replica.cache.lease_key, "crashed-replica", px=300)
+    loader = CountingLoader()
+
+    started = time.monotonic()
+    df = replica.load(loader)
+
+    # Waited for the abandoned lease to expire, then refreshed instead of falling back
+    assert 0.25 <= time.monotonic() - started < 3
+    assert loader.calls == 1
+    assert replica.cache.stats()["refreshes"] == 1
+    assert replica.cache.stats()["fallbacks"] == 0
+    assert df.attrs["snapshot_version"] == "v1"
+
+
+def test_lease_is_released_after_a_refresh(server):
+    replica = Replica(server)
+
+    replica.load(CountingLoader())
+
+    assert not replica.client.exists(replica.cache.lease_key)
+
+
+def test_release_leaves_a_lease_taken_over_by_another_replica(server):
+    replica = Replica(server)
+    replica.client.set(replica.cache.lease_key, "other-replica", ex=30)
+
+    replica.cache._release(replica.client, "expired-token")
+
+    assert replica.client.get(replica.cache.lease_key) == b"other-replica"
+
+
+def test_unchanged_version_stamp_skips_the_payload_download(server):
+    Replica(server).load(CountingLoader())
+    replica = Replica(server)
+
+    first = replica.load(CountingLoader())
+    second = replica.load(CountingLoader())
+
+    assert replica.cache.stats()["decodes"] == 1
+    pd.testing.assert_frame_equal(first, second)
+
+    # Another replica publishes a new snapshot: the changed stamp triggers one more download
+    other = Replica(server)
+    other.cache._refresh(other.client, CountingLoader(version="v2"), None)
+    assert replica.load(CountingLoader()).attrs["snapshot_version"] == "v2"
+    assert replica.cache.stats()["decodes"] == 2
+
+
+def test_without_redis_the_loader_is_called_directly(monkeypatch):
+    monkeypatch.setattr(snapshot_cache, "get_redis_client", lambda: None)
+    loader = CountingLoader()
+
+    df = SnapshotCache(key="test:snapshot").load(loader)
+
+    assert loader.calls == 1
+    assert df.attrs["snapshot_version"] == "v1"
+
+
+def test_redis_errors_fall_back_to_the_loader(server, monkeypatch):
+    replica = Replica(server)
+    server.connected = False
+    monkeypatch.setattr(snapshot_cache, "get_redis_client", lambda: replica.client)
+    loader = CountingLoader()
+
+    df = replica.cache.load(loader)
+
+    assert loader.calls == 1
+    assert replica.cache.stats()["fallbacks"] == 1
+    pd.testing.assert_frame_equal(df, member_frame())
+
+
+def test_source_errors_are_not_retried_as_redis_failures(server):
+    replica = Replica(server)
+    calls = []
+
+    def failing_loader():
+        calls.append(1)
+        raise RuntimeError("snowflake down")
+
+    with pytest.raises(RuntimeError):
+        replica.load(failing_loader)
+    assert len(calls) == 1
@@ -0,0 +1,243 @@
+"""
+Top Risk Index for Smart Liquidity Monitor
+Riskiest members overall and per risk level, kept by argpartition and updated
+incrementally as member rows change, so "top K by risk_ratio" is an O(K) lookup
+"""
+
+import os
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from risk_index import rows_fingerprint
+
+TOPK_CAP = int(os.environ.get("LR_TOPK_CAP", 1000))
+MAX_INDEXED_FRAMES = 4
+
+ALL = "ALL"
+# Rebuild from scratch instead of patching when more than this share of the book changed
+_REBUILD_SHARE = 0.1
+
+
+class _TopList:
+    """
+    Member keys of one group, riskiest first, with the invariant that every
+    group member left out is no riskier than the last one kept
+
+    Holds up to 2 x cap keys so removals rarely force a rebuild; a rebuild
+    (argpartition over the group) happens only when fewer than cap remain.
+    """
+
+    def __init__(self, keys: np.ndarray, ratios: np.ndarray, cap: int):
+        self.cap = cap
+        self.group_size = len(keys)
+        limit = min(2 * cap, len(keys))
+        if limit < len(keys):
+            picked = np.argpartition(-ratios, limit - 1)[:limit]
+        else:
+            picked = np.arange(len(keys))
+        order = picked[np.argsort(-ratios[picked], kind="stable")]
+        self.keys = keys[order]
+        self.ratios = ratios[order]
+
+    @property
+    def complete(self) -> bool:
+        return len(self.keys) == self.group_size
+
+    @property
+    def floor(self) -> float:
+        return self.ratios[-1] if len(self.ratios) else -np.inf
+
+    def patch(self, dropped: set, added_keys: np.ndarray, added_ratios: np.ndarray, group_size: int) -> bool:
+        """Apply removed/changed members; returns False when the list must be rebuilt"""
+        complete, floor = self.complete, self.floor
+        keep = np.fromiter((k not in dropped for k in self.keys), dtype=bool, count=len(self.keys))
+        if not complete:
+            # Outsiders are all <= floor, so only newcomers above it can enter
+            enter = added_ratios >= floor
+            added_keys, added_ratios = added_keys[enter], added_ratios[enter]
+        keys = np.concatenate([self.keys[keep], added_keys])
+        ratios = np.concatenate([self.ratios[keep], added_ratios])
+        order = np.argsort(-ratios, kind="stable")[:2 * self.cap]
+        self.keys, self.ratios, self.group_size = keys[order], ratios[order], group_size
+        return self.complete or len(self.keys) >= self.cap
+
+
+class TopRiskIndex:
+    """
+    Riskiest members of one member frame, overall and per risk level
+
+    ``refresh`` diffs a frame against the indexed one by member id (risk_ratio
+    and risk_level) and patches only the lists the changed members touch;
+    ``top_positions`` answers any K up to ``cap`` without sorting the book.
+    Indexes are built privately and then only read (see get_top_risk_index), so
+    a lookup always answers for the frame the index was refreshed to.
+    """
+
+    def __init__(self, cap: int = TOPK_CAP):
+        self.cap = cap
+        self._lock = threading.RLock()
+        self._positions = pd.Series(dtype=np.int64)
+        self._ratio = pd.Series(dtype=float)
+        self._level = pd.Series(dtype="category")
+        self._lists: Dict[str, _TopList] = {}
+
+    def fork(self) -> "TopRiskIndex":
+        """Copy to refresh against another frame (top lists and series are replaced, never mutated)"""
+        with self._lock:
+            clone = TopRiskIndex(self.cap)
+            clone._positions, clone._ratio, clone._level = self._positions, self._ratio, self._level
+            clone._lists = {name: copy.copy(top) for name, top in self._lists.items()}
+            return clone
+
+    def refresh(self, df: pd.DataFrame) -> int:
+        """
+        Bring the index up to date with a frame
+
+        Args:
+            df: DataFrame with member data and risk metrics
+
+        Returns:
+            int: Number of members added, changed or removed
+        """
+        with self._lock:
+            keys = pd.Index(df["member_id"].to_numpy() if "member_id" in df.columns else df.index)
+            unique = ~keys.duplicated(keep="last")
+            keys = keys[unique]
+            positions = pd.Series(np.flatnonzero(unique), index=keys)
+            ratio = pd.Series(df["risk_ratio"].to_numpy(dtype=float)[unique], index=keys).fillna(-np.inf)
+            if "risk_level" in df.columns:
+                level = df["risk_level"][unique].set_axis(keys)
+            else:
+                level = pd.Series("", index=keys)
+            level = level.astype("category")  # no-op for calculate_risk_metrics output; compare codes, not strings
+
+            if level.dtype != self._level.dtype:
+                changed, removed = ratio.index, self._ratio.index.difference(ratio.index)
+            elif self._ratio.index.equals(ratio.index):
+                changed_mask = ((ratio.to_numpy() != self._ratio.to_numpy())
+                                | (level.cat.codes.to_numpy() != self._level.cat.codes.to_numpy()))
+                changed = ratio.index[changed_mask]
+                removed = pd.Index([])
+            else:
+                old_ratio = self._ratio.reindex(ratio.index)
+                old_codes = self._level.cat.codes.reindex(ratio.index)
+                changed = ratio.index[(ratio != old_ratio).to_numpy() | (level.cat.codes != old_codes).to_numpy()]
+                removed = self._ratio.index.difference(ratio.index)
+
+            touched = len(changed) + len(removed)
+            if not self._lists or touched > _REBUILD_SHARE * max(len(ratio), 1):
+                self._rebuild(ratio, level)
+            elif touched:
+                self._patch(ratio, level, changed, removed)
+
+            self._positions, self._ratio, self._level = positions, ratio, level
+            return touched
+
+    def _rebuild(self, ratio: pd.Series, level: pd.Series) -> None:
+        self._lists = {ALL: _TopList(ratio.index.to_numpy(), ratio.to_numpy(), self.cap)}
+        codes = level.cat.codes.to_numpy()
+        for code, name in enumerate(level.cat.categories):
+            group = ratio[codes == code]
+            self._lists[str(name)] = _TopList(group.index.to_numpy(), group.to_numpy(), self.cap)
+
+    def _patch(self, ratio: pd.Series, level: pd.Series, changed: pd.Index, removed: pd.Index) -> None:
+        dropped = set(changed) | set(removed)
+        codes = level.cat.codes.to_numpy()
+        changed_codes = level.cat.codes.loc[changed].to_numpy()
+        new_ratio = ratio.loc[changed]
+        sizes = np.bincount(codes[codes >= 0], minlength=len(level.cat.categories))
+        groups = {ALL: (new_ratio, len(ratio), None)}
+        for code, name in enumerate(level.cat.categories):
+            groups[str(name)] = (new_ratio[changed_codes == code], int(sizes[code]), code)
+        for name, (added, size, code) in groups.items():
+            top = self._lists.get(name)
+            if top is None or not top.patch(dropped, added.index.to_numpy(), added.to_numpy(), size):
+                members = ratio if code is None else ratio[codes == code]
+                self._lists[name] = _TopList(members.index.to_numpy(), members.to_numpy(), self.cap)
+
+    def top_positions(self, k: int, level: Optional[str] = None) -> np.ndarray:
+        """
+        Row positions of the k riskiest members, overall or within one risk level
+
+        Args:
+            k: Number of members (O(k) up to ``cap``; larger k falls back to nlargest)
+            level: Optional risk level (HIGH / MEDIUM / LOW)
+
+        Returns:
+            ndarray: Positions in the refreshed frame, highest risk_ratio first
+        """
+        with self._lock:
+            if k > self.cap:
+                ratio = self._ratio if level is None else self._ratio[(self._level == level).to_numpy()]
+                keys = ratio[ratio > -np.inf].nlargest(k).index
+            else:
+                keys = self.top_ids(k, level)
+            return self._positions.loc[keys].to_numpy()
+
+    def top_ids(self, k: int, level: Optional[str] = None) -> List[object]:
+        """Member keys of the k riskiest members (k <= cap; members without a ratio are left out)"""
+        with self._lock:
+            top = self._lists.get(level or ALL)
+            if top is None:
+                return []
+            k = min(k, self.cap)
+            return top.keys[:k][top.ratios[:k] > -np.inf].tolist()
+
+
+_indexes: "OrderedDict[Tuple[str, object, str], TopRiskIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_top_risk_index(df: pd.DataFrame) -> TopRiskIndex:
+    """
+    Return the top risk index for this frame, building it on first use
+
+    Indexes are kept per snapshot version, risk thresholds and row fingerprint
+    (filtered frames and segments inherit their snapshot's attrs, so the version
+    alone does not identify them). A new frame starts from a copy of the most
+    recently used index and is patched by member id, so a reloaded snapshot
+    with few changed members costs O(changes); frames without a version get a
+    fresh, uncached index.
+    """
+    version = df.attrs.get("snapshot_version")
+    if version is None:
+        index = TopRiskIndex()
+        index.refresh(df)
+        return index
+    key = (version, df.attrs.get("risk_thresholds"), rows_fingerprint(df))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+        base = next(reversed(_indexes.values()), None)
+    index = base.fork() if base is not None else TopRiskIndex()
+    index.refresh(df)
+    with _indexes_lock:
+        index = _indexes.setdefault(key, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXED_FRAMES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def top_risk_members(df: pd.DataFrame, k: int, level: Optional[str] = None) -> pd.DataFrame:
+    """
+    The k riskiest members of a frame with risk metrics (overall or within one risk level)
+
+    Args:
+        df: DataFrame with member data and risk metrics
+        k: Number of members
+        level: Optional risk level (HIGH / MEDIUM / LOW)
+
+    Returns:
+        DataFrame: Member rows of ``df``, highest risk_ratio first
+    """
+    if df.empty or "risk_ratio" not in df.columns:
+        return df.iloc[:0]
+    return df.iloc[get_top_risk_index(df).top_positions(k, level)]
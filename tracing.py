@@ -0,0 +1,345 @@
+"""
+Tracing for Smart Liquidity Monitor
+Lightweight spans (context manager / decorator) around data loading, metrics,
+forecasting, simulation, rendering and AI calls, aggregated into in-process
+histograms and exported as Prometheus text and a JSONL trace file
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+TRACE_FILE = os.environ.get(
+    "LR_TRACE_FILE", os.path.join(os.path.dirname(__file__), ".cache", "traces", "spans.jsonl")
+)
+TRACE_FILE_MAX_BYTES = int(os.environ.get("LR_TRACE_FILE_MAX_BYTES", 50 * 1024 * 1024))
+PROMETHEUS_TEXTFILE = os.environ.get("LR_PROMETHEUS_TEXTFILE")  # e.g. for node_exporter's textfile collector
+TRACING_ENABLED = os.environ.get("LR_TRACING", "1") != "0"
+
+# Numeric span attributes summed into counters (everything else is only kept in the trace)
+COUNTED_ATTRIBUTES = ("rows", "bytes")
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("lr_current_span", default=None)
+
+
+class SpanHistogram:
+    """
+    Cumulative duration histogram (Prometheus semantics: buckets only ever grow)
+
+    Buckets double from 1 ms to ~2 min, fine enough for both in-memory metric
+    updates and LLM calls.
+    """
+
+    BOUNDS: List[float] = [0.001 * 2 ** i for i in range(18)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = next((i for i, bound in enumerate(self.BOUNDS) if seconds <= bound), len(self.BOUNDS))
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Estimate the q-th percentile (0-100) by interpolating inside the bucket; None when empty"""
+        if not self.count:
+            return None
+        target, seen = self.count * q / 100, 0
+        for i, c in enumerate(self.counts):
+            if c and seen + c >= target:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.BOUNDS[-1] * 2
+                return lower + (upper - lower) * (target - seen) / c
+            seen += c
+        return self.BOUNDS[-1]
+
+
+class Span:
+    """One timed operation; set attributes (rows, bytes, cache_hit, ...) with ``set``"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start", "duration", "attributes", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.start = time.time()
+        self.duration = 0.0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, **attributes) -> "Span":
+        self.attributes.update(attributes)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "start": self.start, "duration_s": self.duration,
+                "error": self.error, **{"attr." + k: v for k, v in self.attributes.items()}}
+
+
+class _SpanStats:
+    __slots__ = ("histogram", "errors", "cache_hits", "cache_misses", "totals")
+
+    def __init__(self):
+        self.histogram = SpanHistogram()
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.totals = {name: 0.0 for name in COUNTED_ATTRIBUTES}
+
+
+class Tracer:
+    """
+    Aggregates finished spans per name and ships them to the JSONL trace file
+
+    File and Prometheus textfile writes happen on a daemon thread, so finishing
+    a span only costs a lock, a histogram update and a queue put.
+
+    Args:
+        trace_file: JSONL file spans are appended to (None disables it)
+        recent: Finished spans kept in memory for the Performance page (default: 500)
+    """
+
+    def __init__(self, trace_file: Optional[str] = TRACE_FILE, recent: int = 500,
+                 prometheus_textfile: Optional[str] = PROMETHEUS_TEXTFILE):
+        self.trace_file = trace_file
+        self.prometheus_textfile = prometheus_textfile
+        self.started_at = time.time()
+        self._stats: Dict[str, _SpanStats] = {}
+        self._recent: deque = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue" = queue.Queue(maxsize=10000)
+        self._dropped = 0
+        if trace_file or prometheus_textfile:
+            threading.Thread(target=self._writer, name="trace-writer", daemon=True).start()
+
+    def finish(self, span: Span) -> None:
+        """Record a finished span in the aggregates, the recent list and the trace file"""
+        with self._lock:
+            stats = self._stats.get(span.name)
+            if stats is None:
+                stats = self._stats[span.name] = _SpanStats()
+            stats.histogram.record(span.duration)
+            if span.error:
+                stats.errors += 1
+            cache_hit = span.attributes.get("cache_hit")
+            if cache_hit is not None:
+                if cache_hit:
+                    stats.cache_hits += 1
+                else:
+                    stats.cache_misses += 1
+            for name in COUNTED_ATTRIBUTES:
+                value = span.attributes.get(name)
+                if isinstance(value, (int, float)):
+                    stats.totals[name] += value
+            self._recent.append(span)
+        if self.trace_file:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self._dropped += 1  # never block a page on trace I/O
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per span name: count, errors, mean/p50/p95/p99 seconds, cache hit rate, rows and bytes"""
+        with self._lock:
+            items = [(name, stats) for name, stats in sorted(self._stats.items())]
+            rows = []
+            for name, stats in items:
+                h = stats.histogram
+                lookups = stats.cache_hits + stats.cache_misses
+                rows.append({
+                    "span": name,
+                    "count": h.count,
+                    "errors": stats.errors,
+                    "mean_s": h.sum / h.count if h.count else None,
+                    "p50_s": h.percentile(50),
+                    "p95_s": h.percentile(95),
+                    "p99_s": h.percentile(99),
+                    "total_s": h.sum,
+                    "cache_hit_rate": stats.cache_hits / lookups if lookups else None,
+                    "rows": stats.totals["rows"],
+                    "bytes": stats.totals["bytes"],
+                })
+        return rows
+
+    def recent(self, limit: int = 200) -> List[Dict[str, Any]]:
+        """The most recent finished spans, newest first"""
+        with self._lock:
+            spans = list(self._recent)[-limit:]
+        return [span.to_dict() for span in reversed(spans)]
+
+    def prometheus_text(self) -> str:
+        """All span aggregates in the Prometheus text exposition format"""
+        lines = [
+            "# HELP lr_span_duration_seconds Duration of traced operations",
+            "# TYPE lr_span_duration_seconds histogram",
+        ]
+        counters = {
+            "lr_span_errors_total": ("Traced operations that raised", lambda s: s.errors),
+            "lr_span_cache_hits_total": ("Traced operations served from a cache", lambda s: s.cache_hits),
+            "lr_span_cache_misses_total": ("Traced cache lookups that missed", lambda s: s.cache_misses),
+            "lr_span_rows_total": ("Rows processed by traced operations", lambda s: s.totals["rows"]),
+            "lr_span_bytes_total": ("Bytes produced or transferred by traced operations", lambda s: s.totals["bytes"]),
+        }
+        with self._lock:
+            items = sorted(self._stats.items())
+            for name, stats in items:
+                label = _label(name)
+                cumulative = 0
+                for bound, count in zip(SpanHistogram.BOUNDS + [float("inf")], stats.histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f'lr_span_duration_seconds_bucket{{span="{label}",le="{le}"}} {cumulative}')
+                lines.append(f'lr_span_duration_seconds_sum{{span="{label}"}} {stats.histogram.sum:.6f}')
+                lines.append(f'lr_span_duration_seconds_count{{span="{label}"}} {stats.histogram.count}')
+            for metric, (help_text, value) in counters.items():
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for name, stats in items:
+                    lines.append(f'{metric}{{span="{_label(name)}"}} {value(stats):g}')
+        lines += ["# HELP lr_trace_spans_dropped_total Spans not written to the trace file (queue full)",
+                  "# TYPE lr_trace_spans_dropped_total counter",
+                  f"lr_trace_spans_dropped_total {self._dropped}"]
+        return "\n".join(lines) + "\n"
+
+    def _writer(self) -> None:
+        last_textfile = 0.0
+        while True:
+            spans: List[Span] = []
+            try:
+                spans.append(self._queue.get(timeout=5))
+                while len(spans) < 1000:
+                    spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                if spans and self.trace_file:
+                    self._append(spans)
+                if self.prometheus_textfile and time.monotonic() - last_textfile >= 15:
+                    _atomic_write_text(self.prometheus_textfile, self.prometheus_text())
+                    last_textfile = time.monotonic()
+            except OSError:
+                pass
+
+    def _append(self, spans: List[Span]) -> None:
+        os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+        try:
+            if os.path.getsize(self.trace_file) > TRACE_FILE_MAX_BYTES:
+                os.replace(self.trace_file, self.trace_file + ".1")  # keep one rotated file
+        except OSError:
+            pass
+        with open(self.trace_file, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _atomic_write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+class _NoopSpan:
+    def set(self, **attributes) -> "_NoopSpan":
+        return self
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time a block as a span nested under the current one
+
+    Args:
+        name: Span name, e.g. "report.pdf"
+        **attributes: Initial attributes (rows, bytes, cache_hit, model, ...)
+
+    Yields:
+        Span: Call ``.set(...)`` to add attributes discovered inside the block
+    """
+    if not TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    started = time.perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"[:300]
+        raise
+    finally:
+        current.duration = time.perf_counter() - started
+        _current_span.reset(token)
+        get_tracer().finish(current)
+
+
+def traced(name: Optional[str] = None, result_attributes: Optional[Callable[[Any], Dict[str, Any]]] = None):
+    """
+    Decorator form of ``span``
+
+    Args:
+        name: Span name (default: module.function)
+        result_attributes: Optional function mapping the return value to span attributes,
+            e.g. ``lambda df: {"rows": len(df)}``
+    """
+    def decorate(fn):
+        span_name = name or f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name) as s:
+                result = fn(*args, **kwargs)
+                if result_attributes is not None and result is not None:
+                    try:
+                        s.set(**result_attributes(result))
+                    except Exception:
+                        pass
+                return result
+        return wrapper
+    return decorate
+
+
+def record_span(name: str, seconds: float, error: Optional[str] = None, **attributes) -> None:
+    """Record an operation timed elsewhere (e.g. a streamed response) as a finished span"""
+    if not TRACING_ENABLED:
+        return
+    finished = Span(name, _current_span.get(), attributes)
+    finished.start = time.time() - seconds
+    finished.duration = seconds
+    finished.error = error
+    get_tracer().finish(finished)
@@ -0,0 +1,169 @@
+"""
+UI Helpers for Smart Liquidity Monitor
+Reusable Streamlit widgets shared by the pages
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from job_queue import Job, get_job_queue
+from risk_index import FilterResult, rows_fingerprint
+from top_risk import TOPK_CAP, top_risk_members
+
+PAGE_SIZES: List[int] = [25, 50, 100, 250]
+
+# Same palette as data.color_risk, applied by the frontend instead of per-cell CSS
+RISK_COLORS: Dict[str, str] = {"HIGH": "#ff6666", "MEDIUM": "#ffc107", "LOW": "#4ade80"}
+
+_MAX_SORT_CACHE = 16
+_sort_cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+_sort_cache_lock = threading.Lock()
+
+
+def wait_for_job(state_key: str, label: str) -> Optional[Job]:
+    """
+    Return the finished background job whose id is stored in session state
+
+    While the job is still queued or running, a self-refreshing status panel
+    (with streamed partial output and a Cancel button) is shown instead and
+    None is returned; the page reruns automatically once the job finishes.
+
+    Args:
+        state_key: st.session_state key holding the job id
+        label: Text shown while the job runs
+
+    Returns:
+        Job: The finished job, or None if there is no job or it is still running
+    """
+    job = get_job_queue().get(st.session_state.get(state_key))
+    if job is None:
+        return None
+    if job.done:
+        return job
+    _job_status(state_key, label)
+    return None
+
+
+@st.fragment(run_every=1.0)
+def _job_status(state_key: str, label: str) -> None:
+    job_queue = get_job_queue()
+    job = job_queue.get(st.session_state.get(state_key))
+    if job is None or job.done:
+        st.rerun()
+    st.info(f"⏳ {label} ({job.elapsed:.0f}s, {job.status})")
+    if job.partial:
+        st.markdown("".join(str(chunk) for chunk in job.partial))
+    if job.cancel_requested:
+        st.caption("Cancelling after the current chunk...")
+    elif st.button("Cancel", key=f"{state_key}_cancel", disabled=not job.streaming and job.status != "queued",
+                   help=None if job.streaming else "Only queued jobs and streaming jobs can be cancelled"):
+        if not job_queue.cancel(job.id):
+            st.caption("This job is already running and cannot be interrupted; it will finish shortly.")
+
+
+def member_column_config(columns: List[str]) -> Dict[str, object]:
+    """
+    Column configuration for member tables: colored risk level pills and formatted numbers
+
+    Args:
+        columns: Columns that will be displayed
+
+    Returns:
+        dict: ``column_config`` for st.dataframe
+    """
+    config: Dict[str, object] = {}
+    for column in columns:
+        if column == "risk_level":
+            config[column] = st.column_config.MultiselectColumn(
+                "risk_level", options=list(RISK_COLORS), color=list(RISK_COLORS.values()), disabled=True)
+        elif column == "risk_ratio":
+            config[column] = st.column_config.NumberColumn("risk_ratio", format="%.2f")
+        elif column.endswith("_usd"):
+            config[column] = st.column_config.NumberColumn(column, format="dollar")
+    return config
+
+
+def _sort_permutation(df: pd.DataFrame, column: str, descending: bool) -> np.ndarray:
+    """Row positions of ``df`` sorted by ``column`` (NaN last), cached per snapshot"""
+    version = df.attrs.get("snapshot_version")
+    key = (version, rows_fingerprint(df), df.attrs.get("risk_thresholds"), column, descending)
+    if version is not None:
+        with _sort_cache_lock:
+            if key in _sort_cache:
+                _sort_cache.move_to_end(key)
+                return _sort_cache[key]
+    values = df[column].reset_index(drop=True)
+    permutation = values.sort_values(ascending=not descending, kind="stable", na_position="last").index.to_numpy()
+    if version is not None:
+        with _sort_cache_lock:
+            _sort_cache[key] = permutation
+            while len(_sort_cache) > _MAX_SORT_CACHE:
+                _sort_cache.popitem(last=False)
+    return permutation
+
+
+def paginated_table(df: pd.DataFrame, key: str, rows: Optional[Union[FilterResult, np.ndarray]] = None,
+                    page_size: int = 50, default_sort: str = "risk_ratio",
+                    columns: Optional[List[str]] = None) -> None:
+    """
+    Member table that sorts and slices on the server and sends only the visible page
+
+    Sort order per column is computed once per snapshot and reused, so paging
+    and re-sorting cost O(page size) after the first use; the riskiest-first
+    pages come from the top-K index, and sorting a RiskIndex.filter result by
+    risk_ratio never touches the rest of the book.
+
+    Args:
+        df: Member frame (ideally tagged with its snapshot version)
+        key: Unique widget key prefix
+        rows: Optional selection, as a RiskIndex FilterResult or row positions (default: all rows)
+        page_size: Initial rows per page (default: 50)
+        default_sort: Initial sort column (default: risk_ratio, riskiest first)
+        columns: Columns to display (default: all)
+    """
+    columns = columns or df.columns.tolist()
+    total = len(rows) if rows is not None else len(df)
+
+    sort_col, dir_col, size_col, page_col = st.columns([3, 2, 2, 2])
+    sortable = [c for c in columns if c in df.columns]
+    sort_by = sort_col.selectbox("Sort by", sortable, key=f"{key}_sort",
+                                 index=sortable.index(default_sort) if default_sort in sortable else 0)
+    descending = dir_col.radio("Order", ["Descending", "Ascending"], key=f"{key}_order",
+                               horizontal=True) == "Descending"
+    size_options = sorted(set(PAGE_SIZES + [int(page_size)]))
+    size = size_col.selectbox("Rows per page", size_options, key=f"{key}_size",
+                              index=size_options.index(int(page_size)))
+    pages = max(1, -(-total // size))
+    if st.session_state.get(f"{key}_page", 1) > pages:
+        st.session_state[f"{key}_page"] = pages  # the selection shrank under the current page
+    page = page_col.number_input(f"Page (of {pages:,})", min_value=1, max_value=pages, step=1,
+                                 key=f"{key}_page") - 1
+
+    view = None
+    if rows is None and sort_by == "risk_ratio" and descending and (page + 1) * size <= TOPK_CAP:
+        # First pages of the riskiest-first view come from the top-K index, without sorting the book
+        riskiest = top_risk_members(df, (page + 1) * size)
+        if len(riskiest) == min((page + 1) * size, total):
+            view = riskiest.iloc[page * size:][columns]
+    if view is None:
+        if isinstance(rows, FilterResult) and sort_by == "risk_ratio":
+            positions = rows.page(page, size, descending)
+        else:
+            permutation = _sort_permutation(df, sort_by, descending)
+            if rows is not None:
+                selected = np.zeros(len(df), dtype=bool)
+                selected[rows.positions() if isinstance(rows, FilterResult) else rows] = True
+                permutation = permutation[selected[permutation]]
+            positions = permutation[page * size:(page + 1) * size]
+        view = df.iloc[positions][columns]
+
+    if "risk_level" in view.columns:
+        view = view.assign(risk_level=[[level] for level in view["risk_level"].astype(str)])
+    st.dataframe(view, width="stretch", hide_index=True, column_config=member_column_config(columns))
+    first = page * size + 1 if total else 0
+    st.caption(f"Showing {first:,}–{page * size + len(view):,} of {total:,} members")
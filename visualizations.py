@@ -1,18 +1,54 @@
 """
 Visualization Functions for Smart Liquidity Monitor
-Chart and plot generation utilities
+Chart and plot generation utilities (the numbers come from the liquidityradar core)
 """
 
-import matplotlib.pyplot as plt
-import numpy as np
+import io
 import pandas as pd
-from statsmodels.tsa.arima.model import ARIMA
 import warnings
 from typing import Tuple
+from matplotlib import colormaps
+from matplotlib.axes import Axes
 from matplotlib.figure import Figure
 
+from liquidityradar.forecast import forecast_liquidity
+from liquidityradar.simulation import simulate_portfolio
+
 warnings.filterwarnings("ignore")  # Suppress ARIMA warnings
 
+def _dark_figure(figsize: Tuple[float, float]) -> Tuple[Figure, Axes]:
+    """
+    Dark-themed figure built with the object-oriented API
+
+    Charts are drawn on job worker threads and chart cache processes, so they use
+    neither pyplot's global figure registry nor rcParams.
+    """
+    fig = Figure(figsize=figsize, facecolor='#0a0e1a')
+    ax = fig.subplots()
+    ax.set_facecolor('#0a1520')
+    for spine in ax.spines.values():
+        spine.set_edgecolor('#00f5ff')
+    ax.tick_params(colors='#e0e5ea')
+    ax.xaxis.label.set_color('#e0e5ea')
+    ax.yaxis.label.set_color('#e0e5ea')
+    return fig, ax
+
+def figure_png(fig: Figure, dpi: int = 100) -> bytes:
+    """
+    Render a figure to PNG bytes and release its artists
+    
+    Args:
+        fig: Figure to render
+        dpi: Resolution (default: 100)
+    
+    Returns:
+        bytes: PNG image
+    """
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=dpi, facecolor=fig.get_facecolor(), bbox_inches='tight')
+    fig.clear()
+    return buf.getvalue()
+
 def create_liquidity_forecast(selected_member_data: pd.Series, member_name: str) -> Figure:
     """
     Create ARIMA-based liquidity forecast chart with dark theme
@@ -24,43 +60,15 @@ def create_liquidity_forecast(selected_member_data: pd.Series, member_name: str)
     Returns:
         matplotlib.figure.Figure: Forecast chart figure
     """
-    # Set dark theme for matplotlib
-    import matplotlib
-    matplotlib.rcParams.update({
-        'figure.facecolor': '#0a0e1a',
-        'axes.facecolor': '#0a1520',
-        'axes.edgecolor': '#00f5ff',
-        'axes.labelcolor': '#e0e5ea',
-        'text.color': '#e0e5ea',
-        'xtick.color': '#e0e5ea',
-        'ytick.color': '#e0e5ea',
-        'grid.color': '#1a2530',
-        'grid.alpha': 0.3
-    })
-    # Simulate Historical Data for the Selected Member
-    np.random.seed(42)
-    historical_months = 12
-    base_cash = selected_member_data['cash_buffer_usd']
-    base_credit = selected_member_data['credit_headroom_usd']
-    
-    # Generate a series with some trend and noise
-    cash_history = pd.Series([base_cash * (1 + 0.01 * i + np.random.normal(0, 0.05)) for i in range(-historical_months, 0)])
-    credit_history = pd.Series([base_credit * (1 + 0.008 * i + np.random.normal(0, 0.04)) for i in range(-historical_months, 0)])
-    
-    # Train ARIMA models and Forecast
-    cash_model = ARIMA(cash_history, order=(2, 1, 1)).fit()
-    cash_forecast_values = cash_model.forecast(steps=3)
-    
-    credit_model = ARIMA(credit_history, order=(2, 1, 1)).fit()
-    credit_forecast_values = credit_model.forecast(steps=3)
-    
-    # Combine Current and Forecasted Data for Plotting
+    # ARIMA forecast over the member's simulated history (current value first)
+    forecast = forecast_liquidity(float(selected_member_data['cash_buffer_usd']),
+                                  float(selected_member_data['credit_headroom_usd']), steps=3)
     months = ['Current', 'Month 1', 'Month 2', 'Month 3']
-    cash_forecast = [base_cash] + list(cash_forecast_values)
-    credit_forecast = [base_credit] + list(credit_forecast_values)
+    cash_forecast = forecast['cash_buffer_usd']
+    credit_forecast = forecast['credit_headroom_usd']
     
     # Display the Chart with dark theme
-    fig, ax = plt.subplots(figsize=(10, 5))
+    fig, ax = _dark_figure(figsize=(10, 5))
     ax.plot(months, cash_forecast, marker='o', label='Cash Buffer Forecast', color='#00f5ff', linewidth=2, markersize=8)
     ax.plot(months, credit_forecast, marker='s', label='Credit Headroom Forecast', color='#ffc107', linewidth=2, markersize=8)
     ax.set_ylabel('USD', color='#e0e5ea', fontsize=11)
@@ -70,6 +78,19 @@ def create_liquidity_forecast(selected_member_data: pd.Series, member_name: str)
     
     return fig
 
+def render_liquidity_forecast(selected_member_data: pd.Series, member_name: str) -> bytes:
+    """
+    ARIMA liquidity forecast chart as PNG bytes (for background jobs: small, picklable, nothing left open)
+    
+    Args:
+        selected_member_data: Series with member data (cash_buffer_usd, credit_headroom_usd)
+        member_name: Name of the selected member
+    
+    Returns:
+        bytes: PNG image of create_liquidity_forecast
+    """
+    return figure_png(create_liquidity_forecast(selected_member_data, member_name))
+
 def create_confidence_heatmap(df: pd.DataFrame) -> Figure:
     """
     Create AI confidence heatmap with dark theme
@@ -80,12 +101,10 @@ def create_confidence_heatmap(df: pd.DataFrame) -> Figure:
     Returns:
         matplotlib.figure.Figure: Heatmap figure
     """
-    fig, ax = plt.subplots(figsize=(6, 2 + len(df) * 0.3))
-    fig.patch.set_facecolor('#0a0e1a')
-    ax.set_facecolor('#0a1520')
+    fig, ax = _dark_figure(figsize=(6, 2 + len(df) * 0.3))
     ax.barh(df["name"],
             df["AI_Confidence"],
-            color=plt.cm.coolwarm(df["AI_Confidence"] / 100))
+            color=colormaps["coolwarm"](df["AI_Confidence"] / 100))
     ax.set_xlim(0, 100)
     ax.set_xlabel("AI Confidence (%)", color='#e0e5ea')
     ax.set_title("Model Certainty in Liquidity Risk Assessment", color='#00f5ff', fontsize=12)
@@ -104,10 +123,8 @@ def create_monte_carlo_simulation(df: pd.DataFrame, shock_multiplier: float = 1.
     Returns:
         matplotlib.figure.Figure: Monte Carlo simulation figure
     """
-    sims = np.random.normal(df["risk_ratio"].mean() * shock_multiplier, 0.5, 5000)
-    fig, ax = plt.subplots(figsize=(10, 5))
-    fig.patch.set_facecolor('#0a0e1a')
-    ax.set_facecolor('#0a1520')
+    sims = simulate_portfolio(df, shock_multiplier)
+    fig, ax = _dark_figure(figsize=(10, 5))
     ax.hist(sims, bins=40, color="#00f5ff", edgecolor="#0077ff", alpha=0.7)
     ax.axvline(2,
                color="#ff6666",